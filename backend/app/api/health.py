@@ -0,0 +1,77 @@
+"""
+Liveness and readiness probes.
+
+Liveness never touches the database. Readiness runs ``SELECT 1`` on a pooled
+connection and reuses the result for HEALTH_CACHE_SECONDS, so frequent
+probes from several orchestrators cost at most one query per interval per
+worker.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import async_engine, engine, pool_stats
+
+router = APIRouter()
+
+# A probe gives up after this long rather than queueing behind a saturated pool.
+READY_TIMEOUT_SECONDS = 2.0
+
+_lock = asyncio.Lock()
+_last_check: Optional[Dict[str, Any]] = None
+_last_checked_at = 0.0
+
+
+def _ping_database() -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def _check_database() -> Dict[str, Any]:
+    global _last_check, _last_checked_at
+    async with _lock:
+        # Concurrent probes share one check.
+        if _last_check is not None and time.monotonic() - _last_checked_at < settings.health_cache_seconds:
+            return _last_check
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(run_in_threadpool(_ping_database), READY_TIMEOUT_SECONDS)
+            result = {"database": "connected", "latency_ms": round(1000 * (time.perf_counter() - started), 3)}
+        except asyncio.TimeoutError:
+            result = {"database": "unavailable", "error": f"no connection within {READY_TIMEOUT_SECONDS}s"}
+        except Exception as e:
+            result = {"database": "unavailable", "error": str(e)}
+        _last_check, _last_checked_at = result, time.monotonic()
+        return result
+
+
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """The database is reachable through the pool; 503 otherwise. Includes both pools' statistics."""
+    check = await _check_database()
+    healthy = check["database"] == "connected"
+    body = {
+        "status": "healthy" if healthy else "unhealthy",
+        **check,
+        "pool": pool_stats(),
+        "async_pool": pool_stats(async_engine.pool),
+    }
+    return JSONResponse(body, status_code=200 if healthy else 503)
+
+
+@router.get("/health", include_in_schema=False)
+async def health_check():
+    """Alias of /health/ready for existing probes."""
+    return await readiness()
@@ -7,19 +7,28 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
-import requests
+from starlette.concurrency import run_in_threadpool
+import httpx
 
+from app.core import http
 from app.core.config import settings
-from app.core.database import get_db
-from app.crud.user import get_user_by_x_id, create_user_from_x, get_user_by_id
+from app.core.database import AsyncSessionLocal, get_db
+from app.core.query_audit import query_budget
+from app.core.security import create_session_token, verify_session_token
+from app.core.state_store import create_state_store
+from app.crud import async_user
+from app.crud.user import get_user_by_x_id, create_user_from_x, get_user_by_id, user_cache
 from app.schemas.auth import XAuthInitiate, XAuthCallback, UserToken
 from models.models import User, XAuthorization
 
 router = APIRouter()
 
-# In-memory storage for PKCE codes (use Redis in production)
-_auth_states = {}
+# Pending logins: state -> PKCE verifier, expired after OAUTH_STATE_TTL_SECONDS
+auth_state_store = create_state_store()
+
+bearer_scheme = HTTPBearer(auto_error=False)
 
 
 def generate_pkce_challenge():
@@ -44,11 +53,8 @@ def initiate_x_login():
     code_verifier, code_challenge = generate_pkce_challenge()
     state = secrets.token_urlsafe(32)
     
-    # Store PKCE parameters temporarily (use Redis in production)
-    _auth_states[state] = {
-        'code_verifier': code_verifier,
-        'timestamp': datetime.utcnow()
-    }
+    # Store PKCE parameters until the callback (or the TTL) consumes them
+    auth_state_store.put(state, {'code_verifier': code_verifier})
     
     # Build X.com OAuth authorization URL
     auth_params = {
@@ -66,15 +72,49 @@ def initiate_x_login():
     return XAuthInitiate(auth_url=auth_url, state=state)
 
 
+def _store_x_login(db: Session, user_data: dict, token_info: dict) -> User:
+    """Create or fetch the user for an X login and store their tokens."""
+    access_token = token_info['access_token']
+
+    # Create or get existing user
+    user = get_user_by_x_id(db, user_data['id'])
+    
+    if not user:
+        # Create new user
+        user = create_user_from_x(db, user_data)
+    
+    # Store/update X authorization tokens
+    x_auth = user.x_authorization
+    if not x_auth:
+        x_auth = XAuthorization(
+            user_id=user.id,
+            access_token=access_token,  # In production, encrypt this
+            refresh_token=token_info.get('refresh_token'),
+            token_expires_at=datetime.utcnow() + timedelta(seconds=token_info.get('expires_in', 7200)),
+            scopes=token_info.get('scope', 'tweet.read users.read')
+        )
+        db.add(x_auth)
+    else:
+        x_auth.access_token = access_token
+        x_auth.refresh_token = token_info.get('refresh_token')
+        x_auth.token_expires_at = datetime.utcnow() + timedelta(seconds=token_info.get('expires_in', 7200))
+        x_auth.scopes = token_info.get('scope', 'tweet.read users.read')
+        x_auth.updated_at = datetime.utcnow()
+    
+    db.commit()
+    return user
+
+
 @router.post("/x/callback")
-def handle_x_callback(callback_data: XAuthCallback, db: Session = Depends(get_db)):
+@query_budget(6)
+async def handle_x_callback(callback_data: XAuthCallback, db: Session = Depends(get_db)):
     """Handle X.com OAuth callback and create/login user"""
     
-    # Validate state parameter
-    if callback_data.state not in _auth_states:
+    # Validate state parameter; popping makes each state single-use
+    stored_data = await run_in_threadpool(auth_state_store.pop, callback_data.state)
+    if stored_data is None:
         raise HTTPException(status_code=400, detail="Invalid or expired state parameter")
     
-    stored_data = _auth_states.pop(callback_data.state)
     code_verifier = stored_data['code_verifier']
     
     # Check for errors in callback
@@ -94,8 +134,12 @@ def handle_x_callback(callback_data: XAuthCallback, db: Session = Depends(get_db
         'code_verifier': code_verifier
     }
     
+    # Both upstream calls are awaited on the shared pooled client, so a slow X
+    # API holds no threadpool worker.
     try:
-        token_response = requests.post(
+        token_response = await http.request(
+            http.X,
+            'POST',
             'https://api.twitter.com/2/oauth2/token',
             data=token_data,
             headers={'Content-Type': 'application/x-www-form-urlencoded'}
@@ -103,14 +147,16 @@ def handle_x_callback(callback_data: XAuthCallback, db: Session = Depends(get_db
         token_response.raise_for_status()
         token_info = token_response.json()
         
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=400, detail=f"Failed to exchange code for token: {str(e)}")
     
     # Get user info from X API
     access_token = token_info['access_token']
     
     try:
-        user_response = requests.get(
+        user_response = await http.request(
+            http.X,
+            'GET',
             'https://api.twitter.com/2/users/me',
             headers={'Authorization': f'Bearer {access_token}'},
             params={'user.fields': 'id,username,name,profile_image_url,verified'}
@@ -118,62 +164,55 @@ def handle_x_callback(callback_data: XAuthCallback, db: Session = Depends(get_db
         user_response.raise_for_status()
         user_data = user_response.json()['data']
         
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=400, detail=f"Failed to get user info from X: {str(e)}")
     
-    # Create or get existing user
-    user = get_user_by_x_id(db, user_data['id'])
-    
-    if not user:
-        # Create new user
-        user = create_user_from_x(db, user_data)
-    
-    # Store/update X authorization tokens
-    x_auth = user.x_authorization
-    if not x_auth:
-        x_auth = XAuthorization(
-            user_id=user.id,
-            access_token=access_token,  # In production, encrypt this
-            refresh_token=token_info.get('refresh_token'),
-            token_expires_at=datetime.utcnow() + timedelta(seconds=token_info.get('expires_in', 7200)),
-            scopes=token_info.get('scope', 'tweet.read users.read')
-        )
-        db.add(x_auth)
-    else:
-        x_auth.access_token = access_token
-        x_auth.refresh_token = token_info.get('refresh_token')
-        x_auth.token_expires_at = datetime.utcnow() + timedelta(seconds=token_info.get('expires_in', 7200))
-        x_auth.scopes = token_info.get('scope', 'tweet.read users.read')
-        x_auth.updated_at = datetime.utcnow()
-    
-    db.commit()
-    
-    # Create session token (simplified - use JWT or secure sessions in production)
-    session_token = secrets.token_urlsafe(32)
+    user = await run_in_threadpool(_store_x_login, db, user_data, token_info)
     
     return UserToken(
-        access_token=session_token,
+        access_token=create_session_token(user.id),
         token_type="bearer",
+        expires_in=settings.session_ttl_seconds,
         user_id=user.id,
         x_username=user.x_username,
         x_display_name=user.x_display_name
     )
 
 
-# Placeholder for session-based authentication
-# In production, implement proper JWT or session management
-async def get_current_user(db: Session = Depends(get_db)):
-    """Get current authenticated user from session"""
-    # This is a placeholder - implement proper session/JWT validation
-    # For now, this will need to be implemented based on your session strategy
-    raise HTTPException(
-        status_code=401,
-        detail="Authentication required. Please implement session management."
-    )
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> User:
+    """
+    Get current authenticated user from the bearer session token.
+
+    The token is verified without I/O and the user usually comes from the user
+    cache, so no database session is opened unless the user is not cached.
+    The returned user is a shared, detached row: read-only.
+    """
+    user_id = verify_session_token(credentials.credentials) if credentials else None
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired session token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user = user_cache.get(user_id)
+    if user is None:
+        async with AsyncSessionLocal() as db:
+            user = await async_user.get_cached_user(db, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User no longer exists",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
 
 
 @router.get("/me")
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+@query_budget(1)
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return {
         "id": current_user.id,
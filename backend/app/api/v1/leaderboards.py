@@ -0,0 +1,162 @@
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.conditional import Validators
+from app.core.pagination import decode_cursor, encode_cursor, split_page
+from app.core.database import get_async_db, get_db
+from app.core.query_audit import query_budget
+from app.core.response_cache import CachedResponse, acached, cached
+from app.core.serialization import ndjson_response, to_dicts
+from app.crud import async_leaderboard
+from app.crud.leaderboard import leaderboard_page_query
+from app.crud.period_best_effort import get_period_board_version, get_period_leaderboard_page, period_start
+from app.schemas.leaderboard import LeaderboardEntryResponse, LeaderboardResponse, LeaderboardSummary
+from models.models import PRDistance, RollupPeriod
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[LeaderboardSummary])
+@query_budget(1)
+async def list_leaderboards(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """List the available leaderboards and when each was last refreshed. Cached; supports conditional GET."""
+    async def load() -> CachedResponse:
+        snapshots = await async_leaderboard.get_snapshots(db)
+        validators = Validators.of(
+            "leaderboards", sorted((s.distance.name, s.entry_count, s.refreshed_at) for s in snapshots),
+            last_modified=max((s.refreshed_at for s in snapshots), default=None),
+        )
+        return CachedResponse.of(to_dicts(snapshots, LeaderboardSummary), validators)
+
+    return (await acached(("leaderboards",), load, tags=["leaderboards"])).respond(request)
+
+
+@router.get("/{distance}", response_model=LeaderboardResponse)
+@query_budget(2)
+async def read_leaderboard(
+    distance: PRDistance,
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; overrides offset"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get a page of the all-time leaderboard for a distance. Cached; supports conditional GET.
+
+    Pages only change when the board is refreshed, so the snapshot's refresh
+    time is the version. A changed display name or avatar is only re-sent to
+    revalidating clients after the next refresh.
+    """
+    kind = f"leaderboard:{distance.name}"
+    if cursor:
+        (offset,) = decode_cursor(cursor, kind, (int,))
+
+    async def load() -> CachedResponse:
+        snapshot = await async_leaderboard.get_snapshot(db, distance)
+        rows, next_cursor = split_page(
+            await async_leaderboard.get_leaderboard_page(db, distance, offset=offset, limit=limit + 1), limit,
+            lambda row: encode_cursor(kind, row.position),
+        )
+        validators = None
+        if snapshot is not None:
+            validators = Validators.of("leaderboard", distance.name, snapshot.refreshed_at,
+                                       last_modified=snapshot.refreshed_at)
+        return CachedResponse.of({
+            "distance": distance,
+            "period": None,
+            "period_start": None,
+            "total_entries": snapshot.entry_count if snapshot else 0,
+            "refreshed_at": snapshot.refreshed_at if snapshot else None,
+            "entries": to_dicts(rows, LeaderboardEntryResponse),
+            "next_cursor": next_cursor,
+        }, validators)
+
+    key = ("leaderboard", distance, offset, limit)
+    return (await acached(key, load, tags=[f"leaderboard:{distance.name}"])).respond(request)
+
+
+@router.get("/{distance}/export", response_model=List[LeaderboardEntryResponse],
+            responses={200: {"content": {"application/x-ndjson": {}}}})
+@query_budget(1)
+def export_leaderboard(distance: PRDistance):
+    """Stream the whole all-time leaderboard for a distance as NDJSON (one entry per line)."""
+    return ndjson_response(leaderboard_page_query(distance, offset=0, limit=None), LeaderboardEntryResponse)
+
+
+def _ranked(rows, offset: int, previous: Optional[Tuple[int, int]] = None) -> List[LeaderboardEntryResponse]:
+    """
+    Competition ranks for a page read in time order; ties share the first position.
+
+    ``previous`` is the (elapsed_time_seconds, rank) of the entry just before
+    the page, so a tie across the page boundary keeps its rank.
+    """
+    entries: List[LeaderboardEntryResponse] = []
+    last_time, last_rank = previous or (None, None)
+    for position, row in enumerate(rows, start=offset + 1):
+        rank = last_rank if row.elapsed_time_seconds == last_time else position
+        entries.append(LeaderboardEntryResponse(
+            rank=rank,
+            user_id=row.user_id,
+            x_username=row.x_username,
+            x_display_name=row.x_display_name,
+            profile_picture_url=row.profile_picture_url,
+            elapsed_time_seconds=row.elapsed_time_seconds,
+            achieved_on=row.achieved_on,
+        ))
+        last_time, last_rank = row.elapsed_time_seconds, rank
+    return entries
+
+
+@router.get("/{distance}/{period}", response_model=LeaderboardResponse)
+@query_budget(2)
+def read_period_leaderboard(
+    distance: PRDistance,
+    period: RollupPeriod,
+    request: Request,
+    on: Optional[date] = Query(None, description="Any day in the window; defaults to today (UTC)"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; overrides offset"),
+    db: Session = Depends(get_db),
+):
+    """
+    Get a page of the weekly, monthly or yearly leaderboard for a distance. Cached; supports conditional GET.
+
+    The cursor carries the last entry's sort key, position and rank, so the
+    next page seeks on the board index instead of skipping rows and still
+    numbers its entries correctly.
+    """
+    start = period_start(period, on or datetime.utcnow().date())
+    kind = f"period-leaderboard:{distance.name}:{period.name}:{start.isoformat()}"
+    after = previous = None
+    if cursor:
+        elapsed, user_id, offset, rank = decode_cursor(cursor, kind, (int, int, int, int))
+        after, previous = (elapsed, user_id), (elapsed, rank)
+
+    def load() -> CachedResponse:
+        total_entries, updated_at = get_period_board_version(db, period, start, distance)
+        validators = Validators.of("period-leaderboard", distance.name, period.name, start, total_entries,
+                                   updated_at, last_modified=updated_at)
+        rows = get_period_leaderboard_page(db, period, start, distance, offset=offset, limit=limit + 1, after=after)
+        entries = _ranked(rows[:limit], offset, previous)
+        next_cursor = None
+        if len(rows) > limit:
+            last = entries[-1]
+            next_cursor = encode_cursor(kind, last.elapsed_time_seconds, last.user_id, offset + limit, last.rank)
+        page = LeaderboardResponse(
+            distance=distance,
+            period=period,
+            period_start=start,
+            total_entries=total_entries,
+            entries=entries,
+            next_cursor=next_cursor,
+        )
+        return CachedResponse.of(page.model_dump(), validators)
+
+    key = ("period-leaderboard", distance, period, start, offset, limit, after)
+    return cached(key, load, tags=[f"leaderboard:{distance.name}"]).respond(request)
@@ -1,17 +1,157 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.crud.user import get_user_by_id
-from app.schemas.user import UserResponse
+from app.core.conditional import Validators
+from app.core.pagination import Page, decode_cursor, encode_cursor, split_page
+from app.core.database import get_async_db, get_db
+from app.core.query_audit import query_budget
+from app.core.response_cache import CachedResponse, acached, cached
+from app.core.serialization import ORJSONResponse, ndjson_response, to_dict, to_dicts
+from app.crud import async_user
+from app.crud.activity import activities_query, get_activities_page, get_best_efforts_page
+from app.crud.personal_record import get_personal_record_rows, get_personal_records_version
+from app.crud.training_rollup import get_training_totals
+from app.crud.user import UserLoader, get_user_by_id
+from app.schemas.activity import ActivityResponse, BestEffortResponse
+from app.schemas.user import PersonalRecordResponse, TrainingTotalsResponse, UserRanksResponse, UserResponse
+from app.services.rank_index import rank_index
+from models.models import PRDistance, RollupPeriod
 
 router = APIRouter()
 
+# Most users one batch request may ask for.
+MAX_BATCH_IDS = 200
+
+
+def get_user_loader(db: Session = Depends(get_db)) -> UserLoader:
+    """Dependency: one UserLoader per request, shared by everything in it that depends on this."""
+    return UserLoader(db)
+
+
+def _parse_ids(values: List[str]) -> List[int]:
+    # Accepts ?ids=1,2,3 and ?ids=1&ids=2 alike; duplicates keep their first position.
+    try:
+        ids = [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return list(dict.fromkeys(ids))
+
+
+@router.get("", response_model=List[UserResponse])
+@query_budget(1)
+def read_users(ids: List[str] = Query(..., description="User IDs, comma-separated"),
+               loader: UserLoader = Depends(get_user_loader)):
+    """Get many users by ID in one request, in the order asked. Unknown IDs are left out."""
+    users = loader.get_many(_parse_ids(ids))
+    return ORJSONResponse(to_dicts((user for user in users if user is not None), UserResponse))
+
 
 @router.get("/{user_id}", response_model=UserResponse)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    """Get user by ID."""
-    db_user = get_user_by_id(db, user_id=user_id)
-    if db_user is None:
+@query_budget(1)
+async def read_user(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get user by ID. Cached; supports conditional GET."""
+    async def load() -> CachedResponse:
+        db_user = await async_user.get_user_by_id(db, user_id=user_id)
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        validators = Validators.of("user", db_user.id, db_user.updated_at, last_modified=db_user.updated_at)
+        return CachedResponse.of(to_dict(db_user, UserResponse), validators)
+
+    return (await acached(("user", user_id), load, tags=[f"user:{user_id}"])).respond(request)
+
+
+@router.get("/{user_id}/records", response_model=List[PersonalRecordResponse])
+@query_budget(2)
+def read_user_records(user_id: int, request: Request, db: Session = Depends(get_db)):
+    """Get the user's personal record at every distance they have run. Cached; supports conditional GET."""
+    def load() -> CachedResponse:
+        count, updated_at = get_personal_records_version(db, user_id)
+        if not count:
+            if get_user_by_id(db, user_id=user_id) is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            return CachedResponse.of([])
+        validators = Validators.of("records", user_id, count, updated_at, last_modified=updated_at)
+        return CachedResponse.of(to_dicts(get_personal_record_rows(db, user_id), PersonalRecordResponse), validators)
+
+    return cached(("records", user_id), load, tags=[f"records:{user_id}"]).respond(request)
+
+
+@router.get("/{user_id}/activities", response_model=Page[ActivityResponse])
+@query_budget(2)
+def list_user_activities(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: Session = Depends(get_db),
+):
+    """Get a page of the user's activities, newest first."""
+    after = decode_cursor(cursor, "activities", (datetime, int)) if cursor else None
+    rows, next_cursor = split_page(
+        get_activities_page(db, user_id, limit + 1, after=after), limit,
+        lambda row: encode_cursor("activities", row.activity_start_date, row.id),
+    )
+    if not rows and after is None and get_user_by_id(db, user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return ORJSONResponse({"items": to_dicts(rows, ActivityResponse), "next_cursor": next_cursor})
+
+
+@router.get("/{user_id}/best-efforts", response_model=Page[BestEffortResponse])
+@query_budget(2)
+def list_user_best_efforts(
+    user_id: int,
+    distance: PRDistance,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: Session = Depends(get_db),
+):
+    """Get a page of the user's best efforts at one distance, fastest first."""
+    kind = f"best-efforts:{distance.name}"
+    after = decode_cursor(cursor, kind, (int, int)) if cursor else None
+    rows, next_cursor = split_page(
+        get_best_efforts_page(db, user_id, distance, limit + 1, after=after), limit,
+        lambda row: encode_cursor(kind, row.elapsed_time_seconds, row.id),
+    )
+    if not rows and after is None and get_user_by_id(db, user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return ORJSONResponse({"items": to_dicts(rows, BestEffortResponse), "next_cursor": next_cursor})
+
+
+@router.get("/{user_id}/activities/export", response_model=List[ActivityResponse],
+            responses={200: {"content": {"application/x-ndjson": {}}}})
+@query_budget(2)
+async def export_user_activities(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Stream every activity of the user, newest first, as NDJSON (one activity per line)."""
+    if await async_user.get_user_by_id(db, user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return ndjson_response(activities_query(user_id), ActivityResponse)
+
+
+@router.get("/{user_id}/training", response_model=List[TrainingTotalsResponse])
+@query_budget(2)
+def read_user_training(
+    user_id: int,
+    period: RollupPeriod = RollupPeriod.WEEK,
+    limit: int = Query(12, ge=1, le=104),
+    db: Session = Depends(get_db),
+):
+    """Get the user's distance, time and elevation totals per week, month or year."""
+    totals = get_training_totals(db, user_id, period, limit)
+    if not totals and get_user_by_id(db, user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return totals
+
+
+@router.get("/{user_id}/ranks", response_model=UserRanksResponse)
+@query_budget(1)
+def read_user_ranks(user_id: int, db: Session = Depends(get_db)):
+    """Get the user's rank and percentile on every leaderboard."""
+    positions = rank_index.positions(user_id)
+    if not positions and get_user_by_id(db, user_id=user_id) is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
\ No newline at end of file
+    return UserRanksResponse(user_id=user_id, ranks=positions)
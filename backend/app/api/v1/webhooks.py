@@ -0,0 +1,48 @@
+import hmac
+from datetime import timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.metrics import STRAVA_WEBHOOK_EVENTS
+from app.core.query_audit import query_budget
+from app.core.serialization import ORJSONResponse
+from app.crud.strava_event import enqueue_event
+from app.schemas.webhook import StravaWebhookEvent
+
+router = APIRouter()
+
+
+@router.get("/strava")
+def verify_strava_subscription(
+    mode: str = Query(..., alias="hub.mode"),
+    challenge: str = Query(..., alias="hub.challenge"),
+    verify_token: str = Query(..., alias="hub.verify_token"),
+):
+    """Answer Strava's validation request when the push subscription is created."""
+    expected = settings.strava_webhook_verify_token
+    if mode != "subscribe" or not expected or not hmac.compare_digest(verify_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid verify token")
+    return ORJSONResponse({"hub.challenge": challenge})
+
+
+@router.post("/strava", status_code=200)
+@query_budget(1)
+async def receive_strava_event(event: StravaWebhookEvent, db: AsyncSession = Depends(get_async_db)):
+    """
+    Accept a Strava push event.
+
+    Only queues the event (one upsert) and returns; ``app.cli process-strava-events``
+    fetches and applies the changes. Strava expects an answer within two
+    seconds and retries otherwise, so nothing here may wait on Strava or on
+    the workers.
+    """
+    subscription_id = settings.strava_webhook_subscription_id
+    if subscription_id and str(event.subscription_id) != subscription_id:
+        raise HTTPException(status_code=403, detail="Unknown subscription")
+    await enqueue_event(db, event.model_dump(), timedelta(seconds=settings.strava_event_coalesce_seconds))
+    await db.commit()
+    STRAVA_WEBHOOK_EVENTS.inc((event.object_type, event.aspect_type))
+    return Response(status_code=200)
@@ -0,0 +1,154 @@
+"""
+Operational commands for the backend.
+
+Usage (from the backend directory):
+    python -m app.cli backfill [--workers N] [--watch] [--best-efforts strava|streams]
+    python -m app.cli process-strava-events [--workers N] [--watch]
+    python -m app.cli rebuild-prs [--user-id ID]
+    python -m app.cli reprocess-streams [--user-id ID] [--batch-size N]
+    python -m app.cli refresh-leaderboards [--force] [--watch]
+    python -m app.cli profile-token [--ttl SECONDS]
+"""
+import argparse
+import logging
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _backfill(args: argparse.Namespace) -> None:
+    from app.services.backfill import BackfillEngine
+
+    engine = BackfillEngine(workers=args.workers, best_effort_source=args.best_efforts)
+    results = engine.run(stop_when_idle=not args.watch)
+    for user_id, status in sorted(results.items()):
+        print(f"user {user_id}: {status.value}")
+
+
+def _process_strava_events(args: argparse.Namespace) -> None:
+    from app.services.strava_events import StravaEventWorker
+
+    worker = StravaEventWorker(workers=args.workers)
+    handled = worker.run(stop_when_idle=not args.watch)
+    print(f"handled {handled} Strava events")
+
+
+def _rebuild_prs(args: argparse.Namespace) -> None:
+    from app.core.database import SessionLocal
+    from app.crud.period_best_effort import rebuild_period_bests
+    from app.crud.personal_record import rebuild_personal_records
+
+    db = SessionLocal()
+    try:
+        records = rebuild_personal_records(db, user_id=args.user_id)
+        period_bests = rebuild_period_bests(db, user_id=args.user_id)
+        db.commit()
+    finally:
+        db.close()
+    print(f"rebuilt {records} personal records and {period_bests} period bests")
+
+
+def _reprocess_streams(args: argparse.Namespace) -> None:
+    from app.core.database import SessionLocal
+    from app.services.best_efforts import batch_best_efforts, stream_best_effort_rows
+    from app.services.ingest import replace_best_efforts
+    from app.services.stream_store import StreamStore
+    from models.models import Activity
+
+    store = StreamStore()
+    db = SessionLocal()
+    try:
+        query = db.query(Activity.user_id, Activity.strava_activity_id).order_by(Activity.user_id)
+        if args.user_id is not None:
+            query = query.filter(Activity.user_id == args.user_id)
+        by_user = {}
+        for user_id, strava_id in query:
+            by_user.setdefault(user_id, []).append(strava_id)
+        db.rollback()
+
+        total = 0
+        for user_id, strava_ids in by_user.items():
+            stored = [(strava_id, store.get(strava_id)) for strava_id in strava_ids if strava_id in store]
+            efforts = []
+            for start in range(0, len(stored), args.batch_size):
+                batch = stored[start:start + args.batch_size]
+                computed = batch_best_efforts([(streams.distance, streams.time) for _, streams in batch])
+                for (strava_id, _), best in zip(batch, computed):
+                    efforts.extend(stream_best_effort_rows(strava_id, best))
+            if efforts:
+                total += replace_best_efforts(db, user_id, efforts)
+                print(f"user {user_id}: {len(stored)} activities, {len(efforts)} best efforts")
+    finally:
+        db.close()
+    print(f"rewrote {total} best efforts from stored streams")
+
+
+def _refresh_leaderboards(args: argparse.Namespace) -> None:
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.crud.leaderboard import refresh_leaderboards
+
+    while True:
+        db = SessionLocal()
+        try:
+            refreshed = refresh_leaderboards(db, force=args.force)
+        finally:
+            db.close()
+        if refreshed:
+            print("refreshed " + ", ".join(distance.value for distance in refreshed))
+        if not args.watch:
+            break
+        time.sleep(settings.leaderboard_refresh_interval_seconds)
+
+
+def _profile_token(args: argparse.Namespace) -> None:
+    from app.core.security import create_profile_token
+
+    print(create_profile_token(args.ttl))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser("backfill", help="Import Strava history for QUEUED users")
+    backfill.add_argument("--workers", type=int, default=None, help="Concurrent users to import")
+    backfill.add_argument("--watch", action="store_true", help="Keep polling the queue instead of exiting when idle")
+    backfill.add_argument("--best-efforts", choices=("strava", "streams"), default=None,
+                          help="Use Strava's best efforts or compute them from raw streams")
+    backfill.set_defaults(func=_backfill)
+
+    strava_events = subparsers.add_parser("process-strava-events", help="Apply queued Strava webhook events")
+    strava_events.add_argument("--workers", type=int, default=None, help="Athletes handled concurrently")
+    strava_events.add_argument("--watch", action="store_true",
+                               help="Keep polling the queue instead of exiting when idle")
+    strava_events.set_defaults(func=_process_strava_events)
+
+    rebuild_prs = subparsers.add_parser("rebuild-prs", help="Repair: recompute personal records and period bests from all best efforts")
+    rebuild_prs.add_argument("--user-id", type=int, default=None, help="Only this user (default: everyone)")
+    rebuild_prs.set_defaults(func=_rebuild_prs)
+
+    reprocess = subparsers.add_parser("reprocess-streams",
+                                      help="Recompute best efforts and records from the local stream store")
+    reprocess.add_argument("--user-id", type=int, default=None, help="Only this user (default: everyone)")
+    reprocess.add_argument("--batch-size", type=int, default=500, help="Activities per vectorized batch")
+    reprocess.set_defaults(func=_reprocess_streams)
+
+    refresh = subparsers.add_parser("refresh-leaderboards", help="Re-rank leaderboards whose records changed")
+    refresh.add_argument("--force", action="store_true", help="Refresh every distance, stale or not")
+    refresh.add_argument("--watch", action="store_true", help="Keep refreshing on an interval")
+    refresh.set_defaults(func=_refresh_leaderboards)
+
+    profile_token = subparsers.add_parser("profile-token", help="Mint an X-Profile-Token header value")
+    profile_token.add_argument("--ttl", type=int, default=900, help="Seconds until the token expires")
+    profile_token.set_defaults(func=_profile_token)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Small in-process caches.
+
+Each API worker keeps its own copy, so anything cached here can be stale
+for up to its TTL after a change made by another process.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, Optional, Set, Tuple, TypeVar
+
+from app.core import metrics
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Thread-safe LRU cache whose entries also expire ``ttl_seconds`` after being set.
+
+    Lookups and writes are O(1); at ``maxsize`` the least recently used entry
+    is evicted.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """The cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        """Drop an entry, returning its value if it was cached."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlightCache(Generic[V]):
+    """
+    LRU + TTL cache with tag invalidation and single-flight loading.
+
+    ``load`` (threads) and ``aload`` (asyncio) return the cached value or run
+    the loader; concurrent misses for one key wait for the first caller's
+    load instead of repeating it. Entries carry tags, and ``invalidate``
+    drops every entry with any of the given tags. A load that overlaps an
+    invalidation is returned to its callers but not cached, since it may
+    have read the old data.
+
+    Hits, misses, coalesced waits, evictions, expirations and invalidations
+    are counted in the ``cache_events_total`` metric under ``name``.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl_seconds: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, V, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._flights: Dict[Hashable, Future] = {}
+        self._async_flights: Dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        metrics.CallbackGauge(f"{name}_cache_entries", f"Entries in the {name} cache.", lambda: len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _count(self, event: str, amount: int = 1) -> None:
+        metrics.CACHE_EVENTS.inc((self.name, event), amount)
+
+    def _drop(self, key: Hashable) -> None:
+        # Caller holds the lock.
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _lookup(self, key: Hashable) -> Optional[V]:
+        # Caller holds the lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(key)
+            self._count("expiration")
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """The cached value, or None if missing or expired. Counts a hit or a miss."""
+        with self._lock:
+            value = self._lookup(key)
+        self._count("hit" if value is not None else "miss")
+        return value
+
+    def set(self, key: Hashable, value: V, tags: Iterable[str] = ()) -> None:
+        with self._lock:
+            self._set(key, value, tuple(tags))
+
+    def _set(self, key: Hashable, value: V, tags: Tuple[str, ...]) -> None:
+        # Caller holds the lock.
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        evicted = 0
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+            evicted += 1
+        if evicted:
+            self._count("eviction", evicted)
+
+    def _set_if_current(self, key: Hashable, value: V, tags: Tuple[str, ...], generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._set(key, value, tags)
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of ``tags``. Returns the number dropped."""
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                self._drop(key)
+        if keys:
+            self._count("invalidation", len(keys))
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def load(self, key: Hashable, loader: Callable[[], V], tags: Iterable[str] = ()) -> V:
+        """The cached value for ``key``, calling ``loader`` at most once across concurrent threads."""
+        with self._lock:
+            value = self._lookup(key)
+            flight = self._flights.get(key) if value is None else None
+            leader = value is None and flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+                generation = self._generation
+        if value is not None:
+            self._count("hit")
+            return value
+        if not leader:
+            self._count("coalesced")
+            return flight.result()
+
+        self._count("miss")
+        try:
+            value = loader()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            self._set_if_current(key, value, tuple(tags), generation)
+            flight.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    async def aload(self, key: Hashable, loader: Callable[[], Awaitable[V]], tags: Iterable[str] = ()) -> V:
+        """The cached value for ``key``, awaiting ``loader`` at most once across concurrent tasks."""
+        # Async flights are only touched from the event loop thread, so need no lock.
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                generation = self._generation
+            if value is not None:
+                self._count("hit")
+                return value
+            flight = self._async_flights.get(key)
+            if flight is None:
+                break
+            self._count("coalesced")
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The loading task was cancelled, not this one: try again, perhaps as the loader.
+
+        self._count("miss")
+        flight = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark it retrieved so a flight nobody waited on does not log "exception was never retrieved".
+            flight.exception()
+            raise
+        else:
+            self._set_if_current(key, value, tuple(tags), generation)
+            flight.set_result(value)
+            return value
+        finally:
+            del self._async_flights[key]
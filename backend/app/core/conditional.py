@@ -0,0 +1,77 @@
+"""
+Conditional GET support: ETag / Last-Modified validators and 304 responses.
+
+An endpoint first reads a cheap version stamp for the resource (a row's
+``updated_at``, a count and max(updated_at), a snapshot's refresh time),
+builds Validators from it and asks ``not_modified`` whether the client's
+copy is current. Only when it is not does the endpoint run the full query
+and serialize, then ``attach`` the same validators to the response.
+
+ETags are weak: they identify a version of the data, not the exact bytes.
+``Cache-Control: no-cache`` lets clients store responses but makes them
+revalidate every time, which costs one stamp query and an empty 304.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = "no-cache"
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime] = None  # naive UTC
+
+    @classmethod
+    def of(cls, *version: Any, last_modified: Optional[datetime] = None) -> "Validators":
+        """Validators for the resource version identified by ``version``."""
+        digest = hashlib.blake2b(repr(version).encode(), digest_size=12).hexdigest()
+        return cls(f'W/"{digest}"', last_modified)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+        return headers
+
+
+def _opaque(etag: str) -> str:
+    # Weak comparison: W/"x" and "x" match.
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _is_current(request: Request, validators: Validators) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence; If-Modified-Since is then ignored.
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque(validators.etag) in {_opaque(tag.strip()) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or validators.last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    # HTTP dates have whole-second precision.
+    return validators.last_modified.replace(microsecond=0) <= since
+
+
+def not_modified(request: Request, validators: Validators) -> Optional[Response]:
+    """A 304 response if the client already has this version, else None."""
+    if request.method not in ("GET", "HEAD") or not _is_current(request, validators):
+        return None
+    return Response(status_code=304, headers=validators.headers())
+
+
+def attach(response: Response, validators: Validators) -> Response:
+    """Add the validators to a full response."""
+    response.headers.update(validators.headers())
+    return response
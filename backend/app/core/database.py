@@ -1,9 +1,103 @@
-from sqlalchemy import create_engine
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from . import metrics
 from .config import settings
 
-engine = create_engine(settings.database_url)
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long checkouts take.
+
+    A checkout waits when every pooled connection is in use, so a growing wait
+    time is the first sign of pool saturation. The counters are updated
+    without a lock; they are for monitoring and may drop the odd update under
+    contention.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            metrics.DB_POOL_WAIT.observe(waited)
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            if waited > self.max_wait_seconds:
+                self.max_wait_seconds = waited
+
+    def recreate(self):
+        # QueuePool.recreate builds a new pool from __init__ arguments; keep the counters going.
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.wait_seconds_total = self.wait_seconds_total
+        pool.max_wait_seconds = self.max_wait_seconds
+        return pool
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool for the asyncio engine; waiting for a connection yields to the event loop."""
+
+
+engine = create_engine(
+    settings.database_url,
+    poolclass=TimedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+metrics.instrument_engine(engine)
+metrics.CallbackGauge("db_pool_checked_out", "Pooled connections currently in use.", lambda: engine.pool.checkedout())
+metrics.CallbackGauge("db_pool_overflow", "Connections open beyond pool_size.", lambda: max(engine.pool.overflow(), 0))
+
+# The same database through asyncpg, for endpoints that opt into ``get_async_db``.
+# Waiting on PostgreSQL there does not hold a threadpool thread, so one worker
+# can serve many more concurrent reads. It has its own pool of the same size.
+async_engine: AsyncEngine = create_async_engine(
+    settings.async_database_url or make_url(settings.database_url).set(drivername="postgresql+asyncpg"),
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+metrics.instrument_engine(async_engine.sync_engine)
+metrics.CallbackGauge("db_async_pool_checked_out", "Async engine connections currently in use.",
+                      lambda: async_engine.pool.checkedout())
+
+
+def pool_stats(pool: Optional[Pool] = None) -> Dict[str, Any]:
+    """A snapshot of a connection pool's usage; the sync engine's by default."""
+    pool = pool or engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Connections open beyond pool_size; negative while the pool is still filling.
+        "overflow": pool.overflow(),
+        "max_overflow": settings.db_max_overflow,
+    }
+    if isinstance(pool, TimedQueuePool):
+        stats.update(
+            checkouts=pool.checkouts,
+            avg_wait_ms=round(1000 * pool.wait_seconds_total / pool.checkouts, 3) if pool.checkouts else 0.0,
+            max_wait_ms=round(1000 * pool.max_wait_seconds, 3),
+        )
+    return stats
 
 
 def get_db():
@@ -12,4 +106,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency that provides an asyncio database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,153 @@
+"""
+Shared, pooled HTTP clients for upstream APIs (X and Strava).
+
+Each upstream gets its own client, so its connection limit applies per host
+and one slow upstream cannot take connections from the other. Clients are
+created lazily and reused for the life of the process; the async ones are
+closed from the app lifespan.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import AbstractSet, Dict, Optional
+
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+
+X = "x"
+STRAVA = "strava"
+
+SERVER_ERROR_STATUSES = frozenset({500, 502, 503, 504})
+RETRY_STATUSES = SERVER_ERROR_STATUSES | {429}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Failures where the request never reached the server, so even a POST is safe to resend.
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_sync_clients: Dict[str, httpx.Client] = {}
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.http_max_connections_per_host,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=30.0,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.http_timeout_seconds, connect=settings.http_connect_timeout_seconds)
+
+
+def get_async_client(upstream: str) -> httpx.AsyncClient:
+    """The shared async client for an upstream."""
+    client = _async_clients.get(upstream)
+    if client is None:
+        with _lock:
+            client = _async_clients.get(upstream)
+            if client is None:
+                client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+                _async_clients[upstream] = client
+    return client
+
+
+def get_sync_client(upstream: str) -> httpx.Client:
+    """The shared blocking client for an upstream, for worker threads. Thread-safe."""
+    client = _sync_clients.get(upstream)
+    if client is None:
+        with _lock:
+            client = _sync_clients.get(upstream)
+            if client is None:
+                client = httpx.Client(limits=_limits(), timeout=_timeout())
+                _sync_clients[upstream] = client
+    return client
+
+
+async def aclose_clients() -> None:
+    """Close every pooled client."""
+    with _lock:
+        async_clients = list(_async_clients.values())
+        sync_clients = list(_sync_clients.values())
+        _async_clients.clear()
+        _sync_clients.clear()
+    for client in async_clients:
+        await client.aclose()
+    for client in sync_clients:
+        client.close()
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Exponential backoff with full jitter, deferring to Retry-After when given."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), settings.http_max_backoff_seconds)
+    ceiling = min(settings.http_max_backoff_seconds, settings.http_backoff_base_seconds * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def _can_retry(method: str, error: Optional[Exception], response: Optional[httpx.Response],
+               retry_statuses: AbstractSet[int]) -> bool:
+    if error is not None:
+        return isinstance(error, UNSENT_ERRORS) or (
+            method in IDEMPOTENT_METHODS and isinstance(error, httpx.TransportError)
+        )
+    return method in IDEMPOTENT_METHODS and response.status_code in retry_statuses
+
+
+def _observe(upstream: str, method: str, started: float, response: Optional[httpx.Response]) -> None:
+    # Each attempt is timed separately; transport failures are labelled "error".
+    status = response.status_code if response is not None else "error"
+    metrics.HTTP_CLIENT_DURATION.observe(time.perf_counter() - started, (upstream, method, status))
+
+
+async def request(upstream: str, method: str, url: str, max_retries: Optional[int] = None,
+                  retry_statuses: AbstractSet[int] = RETRY_STATUSES, **kwargs) -> httpx.Response:
+    """
+    Send a request through the upstream's pooled async client, retrying with backoff.
+
+    Idempotent methods are retried on transport errors and ``retry_statuses``;
+    other methods only when the request was never sent. The final response is
+    returned whatever its status.
+    """
+    method = method.upper()
+    max_retries = settings.http_max_retries if max_retries is None else max_retries
+    client = get_async_client(upstream)
+    for attempt in range(max_retries + 1):
+        error, response = None, None
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            error = e
+        _observe(upstream, method, started, response)
+        if attempt == max_retries or not _can_retry(method, error, response, retry_statuses):
+            if error is not None:
+                raise error
+            return response
+        await asyncio.sleep(_retry_delay(attempt, response))
+
+
+def request_sync(upstream: str, method: str, url: str, max_retries: Optional[int] = None,
+                 retry_statuses: AbstractSet[int] = RETRY_STATUSES, **kwargs) -> httpx.Response:
+    """Blocking counterpart of ``request`` for worker threads."""
+    method = method.upper()
+    max_retries = settings.http_max_retries if max_retries is None else max_retries
+    client = get_sync_client(upstream)
+    for attempt in range(max_retries + 1):
+        error, response = None, None
+        started = time.perf_counter()
+        try:
+            response = client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            error = e
+        _observe(upstream, method, started, response)
+        if attempt == max_retries or not _can_retry(method, error, response, retry_statuses):
+            if error is not None:
+                raise error
+            return response
+        time.sleep(_retry_delay(attempt, response))
@@ -0,0 +1,274 @@
+"""
+In-process metrics, exposed in the Prometheus text format at /metrics.
+
+Counters and histograms keep one shard per thread, so recording a value is
+a thread-local lookup plus a few in-place list updates: no locks, and no
+allocation once a label set has been seen. Shards are merged only when
+/metrics is scraped. Each worker process reports its own values.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+LabelValues = Tuple
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, list]] = []
+        self._shards_lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self) -> Dict[LabelValues, list]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _label_text(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up (or, used as a gauge, is incremented and decremented)."""
+    type = "counter"
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = [0]
+        cell[0] += amount
+
+    def dec(self, labels: LabelValues = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def _merged(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in list(self._shards):
+            for labels, cell in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + cell[0]
+        return totals
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self._merged().items()):
+            lines.append(f"{self.name}{self._label_text(labels)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """A value that goes up and down, summed across threads."""
+    type = "gauge"
+
+
+class CallbackGauge(_Metric):
+    """A gauge read from a callback at scrape time."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return self._header() + [f"{self.name} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets, plus their sum and count."""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: one slot per bucket, one for +Inf, then sum and count.
+        self._width = len(self.buckets) + 3
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = [0] * self._width
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def render(self) -> List[str]:
+        merged: Dict[LabelValues, list] = {}
+        for shard in list(self._shards):
+            for labels, cell in list(shard.items()):
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(cell)
+                else:
+                    for i, value in enumerate(cell):
+                        total[i] += value
+
+        lines = self._header()
+        for labels, cell in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), cell):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = self._label_text(labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(cell[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {cell[-1]}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Requests handled, by route template and status.", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency, by route template.", ("method", "route")
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests currently being handled.")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per request.", ("route",), buckets=COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_query_seconds_per_request", "Time spent executing SQL per request.", ("route",)
+)
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Latency of individual SQL statements.")
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "Time spent checking a connection out of the pool.")
+HTTP_CLIENT_DURATION = Histogram(
+    "http_client_request_duration_seconds", "Outbound HTTP call latency, by upstream.",
+    ("upstream", "method", "status"),
+)
+CACHE_EVENTS = Counter(
+    "cache_events_total", "In-process cache hits, misses, coalesced waits and removals, by cache.", ("cache", "event")
+)
+STRAVA_QUOTA_WAITS = Counter(
+    "strava_quota_waits_total", "Strava calls held back because their share of the quota was spent.", ("priority",)
+)
+STRAVA_WEBHOOK_EVENTS = Counter(
+    "strava_webhook_events_total", "Strava webhook events queued, by object and aspect.", ("object_type", "aspect_type")
+)
+
+
+class RequestStats:
+    """SQL work done on behalf of the current request."""
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+# Set by MetricsMiddleware. Threadpool calls run in a copy of the request's
+# context, so sync endpoints and dependencies update the same object.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run on ``engine`` and attribute it to the current request."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and SQL usage per route.
+
+    Routes are labelled by their template (``/api/v1/users/{user_id}``), read
+    from the matched route FastAPI leaves in the scope, so label cardinality
+    stays bounded. Requests that match no route share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "<unmatched>"
+            method = scope["method"]
+            HTTP_REQUESTS.inc((method, path, status))
+            HTTP_REQUEST_DURATION.observe(elapsed, (method, path))
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, (path,))
+            DB_TIME_PER_REQUEST.observe(stats.query_seconds, (path,))
@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination.
+
+A page is read with ``WHERE (sort key) > (last row's sort key) ORDER BY sort
+key LIMIT n + 1`` over an index on exactly that key, so page 1000 costs the
+same index seek as page 1. The extra row only tells whether there is a next
+page.
+
+Cursors are opaque to clients: the last row's sort key, JSON-encoded and
+base64url'd, with a kind tag so a cursor from one listing is rejected by
+another. Clients pass ``next_cursor`` back unchanged.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+def _datetime(value: Any) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def _date(value: Any) -> date:
+    return date.fromisoformat(value)
+
+
+def _int(value: Any) -> int:
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError("not an integer")
+    return value
+
+
+FIELD_TYPES = {int: _int, datetime: _datetime, date: _date}
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # Pass as ``cursor`` to get the next page; null on the last page.
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(kind: str, *values: Any) -> str:
+    payload = [kind] + [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str, types: Sequence[type]) -> Tuple:
+    """The sort key in ``cursor``; 400 if it is malformed or belongs to another listing."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(types) + 1 or payload[0] != kind:
+            raise ValueError("wrong shape")
+        return tuple(FIELD_TYPES[t](value) for t, value in zip(types, payload[1:]))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def split_page(rows: Sequence[Any], limit: int, next_key: Callable[[Any], str]) -> Tuple[Sequence[Any], Optional[str]]:
+    """Trim the ``limit + 1`` rows of a keyset query to the page and the cursor for the next one."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, next_key(rows[-1])
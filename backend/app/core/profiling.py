@@ -0,0 +1,222 @@
+"""
+Opt-in profiling of individual requests.
+
+ProfilingMiddleware is only added to the app when PROFILING_ENABLED is set,
+so it costs nothing otherwise. Once added, it profiles a request when:
+
+- it carries a valid ``X-Profile-Token`` header (see ``python -m app.cli
+  profile-token``), or
+- it matches PROFILING_ROUTES (route templates; empty means all) and is
+  picked at PROFILING_SAMPLE_RATE.
+
+A profiled request is sampled by a background thread that reads the stacks
+of the threads serving it every PROFILING_INTERVAL_MS: the event loop
+thread, any threadpool thread that runs SQL for the request, and any thread
+currently inside the matched endpoint function. Concurrent requests sharing
+those threads (or the same endpoint) can show up in the samples.
+The call tree, timing and SQL statements are written as JSON to
+PROFILING_OUTPUT_DIR, and the file name is returned in ``X-Profile-Id``.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import BaseRoute, Match
+
+from app.core.config import settings
+from app.core.security import verify_profile_token
+
+PROFILE_HEADER = b"x-profile-token"
+MAX_STACK_DEPTH = 128
+
+
+class RequestProfile:
+    """Stack samples and SQL statements collected for one request."""
+
+    def __init__(self, scope, interval_seconds: float):
+        self.scope = scope  # routing fills in scope["route"] after the profile starts
+        self.interval_seconds = interval_seconds
+        self.threads = {threading.get_ident()}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.statements: List[Dict[str, Any]] = []
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            endpoint = getattr(self.scope.get("route"), "endpoint", None)
+            endpoint_code = getattr(endpoint, "__code__", None)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                if thread_id in self.threads or (endpoint_code is not None and _runs(frame, endpoint_code)):
+                    self.stacks[_folded(frame)] += 1
+            self.samples += 1
+
+    def call_tree(self) -> Dict[str, Any]:
+        """The folded stacks merged into a tree of {name, samples, children}."""
+        root: Dict[str, Any] = {"name": "<root>", "samples": 0, "children": {}}
+        for stack, count in self.stacks.items():
+            node = root
+            node["samples"] += count
+            for name in stack.split(";"):
+                node = node["children"].setdefault(name, {"name": name, "samples": 0, "children": {}})
+                node["samples"] += count
+
+        def finish(node: Dict[str, Any]) -> Dict[str, Any]:
+            children = sorted(node["children"].values(), key=lambda child: -child["samples"])
+            return {"name": node["name"], "samples": node["samples"], "children": [finish(c) for c in children]}
+
+        return finish(root)
+
+
+def _runs(frame, code) -> bool:
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _folded(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_request_profile", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None:
+        # Sync endpoints and dependencies run SQL on threadpool threads; sample those too.
+        profile.threads.add(threading.get_ident())
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None and hasattr(context, "_profile_started"):
+        profile.statements.append({
+            "statement": statement,
+            "duration_ms": round(1000 * (time.perf_counter() - context._profile_started), 3),
+        })
+
+
+def install(engine: Engine) -> None:
+    """Record statements run on ``engine`` into the active profile, if any."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling selected requests. See the module docstring."""
+
+    def __init__(self, app, routes: Sequence[BaseRoute], sample_rate: Optional[float] = None,
+                 route_paths: Optional[Sequence[str]] = None, output_dir: Optional[str] = None,
+                 interval_ms: Optional[float] = None):
+        self.app = app
+        self.routes = routes  # the app's live route list, used to resolve templates before routing
+        self.sample_rate = settings.profiling_sample_rate if sample_rate is None else sample_rate
+        if route_paths is None:
+            route_paths = [path.strip() for path in settings.profiling_routes.split(",") if path.strip()]
+        self.route_paths = set(route_paths)
+        self.output_dir = output_dir or settings.profiling_output_dir
+        self.interval_seconds = (interval_ms or settings.profiling_interval_ms) / 1000
+
+    def _route_path(self, scope) -> Optional[str]:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", None)
+        return None
+
+    def _trigger(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                # A junk header just means no profiling; it must never fail the request.
+                try:
+                    token = value.decode("ascii")
+                except UnicodeDecodeError:
+                    return None
+                return "header" if verify_profile_token(token) else None
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if self.route_paths and self._route_path(scope) not in self.route_paths:
+            return None
+        return "sample"
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profile = RequestProfile(scope, self.interval_seconds)
+        token = _current_profile.set(profile)
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            profile.stop()
+            _current_profile.reset(token)
+            route = scope.get("route")
+            dump = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status,
+                "started_at": started_at.isoformat() + "Z",
+                "duration_ms": round(1000 * duration, 3),
+                "interval_ms": round(1000 * self.interval_seconds, 3),
+                "samples": profile.samples,
+                "sql": profile.statements,
+                "sql_total_ms": round(sum(s["duration_ms"] for s in profile.statements), 3),
+                "call_tree": profile.call_tree(),
+                "folded_stacks": dict(profile.stacks.most_common()),
+            }
+            await run_in_threadpool(self._write, profile_id, dump)
+
+    def _write(self, profile_id: str, dump: Dict[str, Any]) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, f"{profile_id}.json"), "w") as f:
+            json.dump(dump, f, indent=1)
@@ -0,0 +1,142 @@
+"""
+Development and test tooling for catching N+1 queries and query-count regressions.
+
+When QUERY_AUDIT_ENABLED is set, QueryAuditMiddleware counts the statements
+each request runs. A statement that repeats QUERY_AUDIT_REPEAT_THRESHOLD
+times (the signature of a lazy load in a loop) is logged with the stack
+that triggered it. Endpoints can declare a budget with ``@query_budget(n)``;
+going over it is logged, or raised as QueryBudgetExceeded when
+QUERY_AUDIT_STRICT is set so tests fail.
+
+In tests, ``assert_max_queries`` checks a block of code directly.
+"""
+import logging
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+# Stack frames from these paths are dropped from reports as noise.
+_LIBRARY_MARKERS = ("site-packages", "dist-packages", "/lib/python")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or block ran more statements than it is allowed."""
+
+
+class QueryAudit:
+    """Statements run within one request or ``assert_max_queries`` block."""
+
+    def __init__(self, repeat_threshold: int):
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.statements: Counter = Counter()
+        self.repeat_stacks: Dict[str, List[str]] = {}
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.statements[statement] += 1
+        if self.statements[statement] == self.repeat_threshold:
+            self.repeat_stacks[statement] = _app_stack()
+
+    def repeated(self) -> Dict[str, int]:
+        """Statements that ran at least ``repeat_threshold`` times, with their counts."""
+        return {statement: self.statements[statement] for statement in self.repeat_stacks}
+
+    def report(self) -> str:
+        lines = [f"{self.count} statements"]
+        for statement, times in self.repeated().items():
+            lines.append(f"\n{times}x {statement}\nfirst repeated at:\n" + "".join(self.repeat_stacks[statement]))
+        return "\n".join(lines)
+
+
+_current_audit: ContextVar[Optional[QueryAudit]] = ContextVar("current_query_audit", default=None)
+
+
+def _app_stack() -> List[str]:
+    frames = traceback.extract_stack()[:-3]  # drop _app_stack, record and _after_cursor_execute
+    return traceback.format_list(
+        [frame for frame in frames if not any(marker in frame.filename for marker in _LIBRARY_MARKERS)]
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    audit = _current_audit.get()
+    if audit is not None:
+        audit.record(statement)
+
+
+def install(engine: Engine) -> None:
+    """Feed statements run on ``engine`` to the active audit, if any."""
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def query_budget(max_queries: int) -> Callable[[F], F]:
+    """Declare the most statements an endpoint may run. Place below the route decorator."""
+    def decorator(endpoint: F) -> F:
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorator
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, repeat_threshold: Optional[int] = None) -> Iterator[QueryAudit]:
+    """
+    Fail with QueryBudgetExceeded if the block runs more than ``max_queries`` statements.
+
+    The engine must have been passed to ``install`` (the app engine is).
+    """
+    audit = QueryAudit(repeat_threshold or settings.query_audit_repeat_threshold)
+    token = _current_audit.set(audit)
+    try:
+        yield audit
+    finally:
+        _current_audit.reset(token)
+    if audit.count > max_queries:
+        raise QueryBudgetExceeded(f"Expected at most {max_queries} statements, got {audit.report()}")
+
+
+class QueryAuditMiddleware:
+    """Pure ASGI middleware auditing the statements of each HTTP request."""
+
+    def __init__(self, app, strict: Optional[bool] = None):
+        self.app = app
+        self.strict = settings.query_audit_strict if strict is None else strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        audit = QueryAudit(settings.query_audit_repeat_threshold)
+        token = _current_audit.set(audit)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_audit.reset(token)
+
+        route = scope.get("route")
+        path = route.path if route is not None else scope["path"]
+        for statement, times in audit.repeated().items():
+            logger.warning(
+                "Possible N+1 in %s %s: statement ran %d times\n%s\nfirst repeated at:\n%s",
+                scope["method"], path, times, statement, "".join(audit.repeat_stacks[statement]),
+            )
+
+        budget = getattr(getattr(route, "endpoint", None), "__query_budget__", None)
+        if budget is not None and audit.count > budget:
+            message = f"{scope['method']} {path} exceeded its query budget of {budget}: {audit.report()}"
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.error(message)
@@ -0,0 +1,68 @@
+"""
+Cached, serialized responses for hot read endpoints.
+
+An endpoint builds its response once with ``CachedResponse.of`` inside a
+loader, and ``cached`` / ``acached`` share it: a burst of identical requests
+(everyone refreshing a leaderboard after a race) runs the queries once per
+worker and TTL, and concurrent misses wait for the first one. The response
+keeps its validators, so a cached response still answers conditional GETs
+with 304.
+
+Entries are tagged with what they were built from (``user:<id>``,
+``records:<user id>``, ``leaderboard:<distance>``) and dropped through
+``invalidate`` when that changes: on User row updates flushed in this
+process, and when the rank index picks up personal record changes made by
+any process. Everything else, such as leaderboard refreshes by the
+refresher process, is bounded by RESPONSE_CACHE_TTL_SECONDS.
+"""
+from typing import Awaitable, Callable, Hashable, Iterable, NamedTuple, Optional
+
+import orjson
+from fastapi import Request, Response
+
+from app.core.cache import SingleFlightCache
+from app.core.conditional import Validators, not_modified
+from app.core.config import settings
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    validators: Optional[Validators] = None
+
+    @classmethod
+    def of(cls, content, validators: Optional[Validators] = None) -> "CachedResponse":
+        return cls(orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS), validators)
+
+    def respond(self, request: Request) -> Response:
+        """A 304 if the client's copy is current, else the full JSON response."""
+        if self.validators is not None:
+            response = not_modified(request, self.validators)
+            if response is not None:
+                return response
+        return Response(self.body, media_type="application/json",
+                        headers=self.validators.headers() if self.validators else None)
+
+
+response_cache: SingleFlightCache[CachedResponse] = SingleFlightCache(
+    "response", settings.response_cache_max_entries, settings.response_cache_ttl_seconds
+)
+
+
+def cached(key: Hashable, loader: Callable[[], CachedResponse], tags: Iterable[str] = ()) -> CachedResponse:
+    """The cached response for ``key``, built by ``loader`` on a miss. For sync endpoints."""
+    if not settings.response_cache_enabled:
+        return loader()
+    return response_cache.load(key, loader, tags)
+
+
+async def acached(key: Hashable, loader: Callable[[], Awaitable[CachedResponse]],
+                  tags: Iterable[str] = ()) -> CachedResponse:
+    """The cached response for ``key``, built by ``loader`` on a miss. For async endpoints."""
+    if not settings.response_cache_enabled:
+        return await loader()
+    return await response_cache.aload(key, loader, tags)
+
+
+def invalidate(*tags: str) -> int:
+    """Drop cached responses built from any of ``tags``."""
+    return response_cache.invalidate(*tags)
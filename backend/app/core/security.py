@@ -0,0 +1,80 @@
+"""
+Stateless signed tokens.
+
+A session token is ``<user_id>.<expires_at>.<signature>``, where the
+signature is an HMAC-SHA256 of the first two parts under SECRET_KEY.
+Verifying one needs no database or shared store, so any worker can check
+any token. Profiling tokens are ``profile.<expires_at>.<signature>``.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_dev_key: Optional[bytes] = None
+
+
+def _key() -> bytes:
+    global _dev_key
+    if settings.secret_key:
+        return settings.secret_key.encode("utf-8")
+    if settings.environment == "production":
+        raise RuntimeError("SECRET_KEY must be set in production")
+    if _dev_key is None:
+        # Tokens signed with this key die with the process and are not valid on other workers.
+        logger.warning("SECRET_KEY is not set; using a random per-process key")
+        _dev_key = secrets.token_bytes(32)
+    return _dev_key
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(_key(), payload.encode("ascii"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def create_session_token(user_id: int, ttl_seconds: Optional[int] = None) -> str:
+    """Issue a signed token for ``user_id`` that expires after ``ttl_seconds``."""
+    ttl_seconds = settings.session_ttl_seconds if ttl_seconds is None else ttl_seconds
+    payload = f"{user_id}.{int(time.time()) + ttl_seconds}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_session_token(token: str) -> Optional[int]:
+    """The user id a token was issued for, or None if it is malformed, forged or expired."""
+    # Signatures are ASCII and compare_digest rejects non-ASCII str, so anything else is malformed.
+    if not token.isascii():
+        return None
+    payload, _, signature = token.rpartition(".")
+    user_id, _, expires_at = payload.partition(".")
+    if not (user_id.isdecimal() and expires_at.isdecimal()):
+        return None
+    if not hmac.compare_digest(signature.encode("ascii"), _sign(payload).encode("ascii")):
+        return None
+    if int(expires_at) <= time.time():
+        return None
+    return int(user_id)
+
+
+def create_profile_token(ttl_seconds: int = 900) -> str:
+    """Issue a token that makes the profiling middleware profile requests carrying it."""
+    payload = f"profile.{int(time.time()) + ttl_seconds}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_profile_token(token: str) -> bool:
+    """Whether a profiling token is genuine and unexpired. Never raises, whatever the client sent."""
+    if not token.isascii():
+        return False
+    payload, _, signature = token.rpartition(".")
+    purpose, _, expires_at = payload.partition(".")
+    if purpose != "profile" or not expires_at.isdecimal():
+        return False
+    return (hmac.compare_digest(signature.encode("ascii"), _sign(payload).encode("ascii"))
+            and int(expires_at) > time.time())
@@ -0,0 +1,70 @@
+"""
+Fast JSON for read-only endpoints.
+
+The app's default response class is ORJSONResponse, so every endpoint is
+encoded by orjson. Hot list endpoints can go further and skip Pydantic
+entirely: ``to_dicts`` copies a response schema's fields straight off ORM
+objects or result rows with one ``attrgetter`` call per row, and the plain
+dicts are returned in an ORJSONResponse. FastAPI does not validate a
+Response it is handed, so the schema on the route is then documentation
+only; the serializers must produce exactly its fields.
+
+Results too large to hold in memory are streamed as NDJSON (one JSON object
+per line) from a server-side cursor with ``ndjson_response``.
+"""
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Executable
+
+from app.core.database import engine
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows fetched from the server-side cursor, and written to the client, at a time.
+STREAM_BATCH_SIZE = 1000
+
+__all__ = ["ORJSONResponse", "ndjson_response", "serializer", "to_dict", "to_dicts"]
+
+
+@lru_cache(maxsize=None)
+def serializer(schema: Type[BaseModel]) -> Callable[[Any], Dict[str, Any]]:
+    """A function copying ``schema``'s fields off an object or row into a dict."""
+    names = tuple(schema.model_fields)
+    if len(names) == 1:
+        getter = attrgetter(names[0])
+        return lambda obj: {names[0]: getter(obj)}
+    getter = attrgetter(*names)
+    return lambda obj: dict(zip(names, getter(obj)))
+
+
+def to_dict(obj: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """``schema``'s fields of one ORM object or result row, without validation."""
+    return serializer(schema)(obj)
+
+
+def to_dicts(objs: Iterable[Any], schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """``schema``'s fields of many ORM objects or result rows, without validation."""
+    return list(map(serializer(schema), objs))
+
+
+def _ndjson_lines(statement: Executable, row_to_dict: Callable[[Any], Dict[str, Any]]) -> Iterator[bytes]:
+    # The request's session is closed before the body is streamed, so this
+    # generator opens its own connection and holds it for the whole stream.
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE).execute(statement)
+        for rows in result.partitions(STREAM_BATCH_SIZE):
+            yield b"".join(orjson.dumps(row_to_dict(row)) + b"\n" for row in rows)
+
+
+def ndjson_response(statement: Executable, schema: Type[BaseModel]) -> StreamingResponse:
+    """
+    Stream every row of ``statement`` as NDJSON, shaped like ``schema``.
+
+    Rows are read in batches from a server-side cursor, so memory stays flat
+    however many rows there are.
+    """
+    return StreamingResponse(_ndjson_lines(statement, serializer(schema)), media_type=NDJSON_MEDIA_TYPE)
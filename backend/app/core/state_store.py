@@ -0,0 +1,156 @@
+"""
+Short-lived storage for OAuth ``state`` values and their PKCE verifiers.
+
+``memory`` keeps entries in-process and only works with a single worker;
+``postgres`` shares them through an unlogged table so a callback can land on
+any worker. Both expire entries after ``oauth_state_ttl_seconds``.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from models.models import OAuthState
+
+
+class StateStore:
+    """Interface for OAuth state storage."""
+
+    def put(self, state: str, data: Dict[str, Any]) -> None:
+        """Store ``data`` under ``state`` until the TTL passes."""
+        raise NotImplementedError
+
+    def pop(self, state: str) -> Optional[Dict[str, Any]]:
+        """Remove and return the data for ``state``, or None if unknown or expired."""
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    """
+    In-process store with TTL expiry and a size cap.
+
+    Every entry has the same TTL, so insertion order is expiry order: expired
+    entries are always at the front of the OrderedDict and each sweep step is
+    an O(1) pop. At the cap, the oldest entry is evicted.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sweep(self, now: float) -> None:
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+    def put(self, state: str, data: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            while len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+            self._entries[state] = (now + self.ttl_seconds, data)
+
+    def pop(self, state: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.pop(state, None)
+            self._sweep(now)
+        if entry is None or entry[0] <= now:
+            return None
+        return entry[1]
+
+
+class PostgresStateStore(StateStore):
+    """
+    Store shared by all workers, backed by the unlogged ``oauth_states`` table.
+
+    Unlogged tables skip the WAL, which suits data that is worthless after a
+    crash anyway. Expired rows are never returned and are swept at most once
+    per sweep interval, in bounded batches until none are left. Like the
+    memory store, the table is capped at ``max_entries``: an insert beyond it
+    evicts the entries closest to expiry, so a flood of logins cannot grow it
+    without bound.
+    """
+
+    SWEEP_BATCH = 1000
+
+    def __init__(self, engine: Engine, ttl_seconds: float, max_entries: int, sweep_interval_seconds: float = 5.0):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _sweep_due(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sweep:
+                return False
+            self._next_sweep = now + self.sweep_interval_seconds
+            return True
+
+    def _sweep(self) -> None:
+        # One short transaction per batch, so the sweep never holds many row locks at once.
+        while True:
+            expired = (
+                select(OAuthState.state)
+                .where(OAuthState.expires_at <= func.now())
+                .limit(self.SWEEP_BATCH)
+                .scalar_subquery()
+            )
+            with self.engine.begin() as conn:
+                deleted = conn.execute(delete(OAuthState).where(OAuthState.state.in_(expired))).rowcount
+            if deleted < self.SWEEP_BATCH:
+                return
+
+    def put(self, state: str, data: Dict[str, Any]) -> None:
+        with self.engine.begin() as conn:
+            # Every entry has the same TTL, so the rows past the newest max_entries - 1 are the oldest.
+            # Walks at most max_entries keys of ix_oauth_states_expires_at.
+            over_cap = (
+                select(OAuthState.state)
+                .order_by(OAuthState.expires_at.desc())
+                .offset(self.max_entries - 1)
+                .scalar_subquery()
+            )
+            conn.execute(delete(OAuthState).where(OAuthState.state.in_(over_cap)))
+            conn.execute(insert(OAuthState).values(
+                state=state,
+                data=data,
+                expires_at=func.now() + timedelta(seconds=self.ttl_seconds),
+            ))
+        if self._sweep_due():
+            self._sweep()
+
+    def pop(self, state: str) -> Optional[Dict[str, Any]]:
+        with self.engine.begin() as conn:
+            return conn.execute(
+                delete(OAuthState)
+                .where(OAuthState.state == state, OAuthState.expires_at > func.now())
+                .returning(OAuthState.data)
+            ).scalar()
+
+
+def create_state_store() -> StateStore:
+    """Build the store selected by ``oauth_state_backend``."""
+    if settings.oauth_state_backend == "postgres":
+        from app.core.database import engine
+
+        return PostgresStateStore(engine, settings.oauth_state_ttl_seconds, settings.oauth_state_max_entries)
+    if settings.oauth_state_backend == "memory":
+        return MemoryStateStore(settings.oauth_state_ttl_seconds, settings.oauth_state_max_entries)
+    raise ValueError(f"Unknown OAUTH_STATE_BACKEND: {settings.oauth_state_backend!r}")
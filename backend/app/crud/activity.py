@@ -0,0 +1,222 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.models import Activity, ActivityBestEffort, LeaderboardEntry, PeriodBestEffort, PersonalRecord, PRDistance
+
+# Rows per multi-row INSERT. Keeps each statement well under PostgreSQL's
+# 65535 bind parameter limit.
+ACTIVITY_CHUNK_SIZE = 1000
+BEST_EFFORT_CHUNK_SIZE = 2000
+
+
+class ActivityKey(NamedTuple):
+    """The parts of an activity its best efforts copy: the FK and the start date."""
+    id: int
+    activity_start_date: datetime
+
+
+ACTIVITY_UPDATE_COLUMNS = (
+    "name",
+    "total_distance_meters",
+    "moving_time_seconds",
+    "total_elevation_gain_meters",
+    "activity_start_date",
+)
+
+
+def _chunks(rows: Sequence[Dict[str, Any]], size: int) -> Iterable[Sequence[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _dedupe(rows: Iterable[Dict[str, Any]], *key: str) -> List[Dict[str, Any]]:
+    """Keep the last row per key; ON CONFLICT cannot touch one row twice per statement."""
+    return list({tuple(row[k] for k in key): row for row in rows}.values())
+
+
+def activities_query(user_id: int) -> Select:
+    """Select a user's activity summaries, newest first."""
+    return (
+        select(
+            Activity.strava_activity_id,
+            Activity.name,
+            Activity.total_distance_meters,
+            Activity.moving_time_seconds,
+            Activity.total_elevation_gain_meters,
+            Activity.activity_start_date,
+        )
+        .where(Activity.user_id == user_id)
+        .order_by(Activity.activity_start_date.desc(), Activity.id.desc())
+    )
+
+
+def get_activities_page(db: Session, user_id: int, limit: int, after: Optional[Tuple[datetime, int]] = None):
+    """
+    Get up to ``limit`` of a user's activities, newest first, past the sort key ``after``.
+
+    The sort key is (activity_start_date, id); rows carry ``id`` for the next
+    cursor. Seeks on ix_activities_user_start_date, so every page costs the same.
+    """
+    query = activities_query(user_id).add_columns(Activity.id)
+    if after is not None:
+        query = query.where(tuple_(Activity.activity_start_date, Activity.id) < tuple_(*after))
+    return db.execute(query.limit(limit)).all()
+
+
+def get_best_efforts_page(db: Session, user_id: int, distance: PRDistance, limit: int,
+                          after: Optional[Tuple[int, int]] = None):
+    """
+    Get up to ``limit`` of a user's best efforts at one distance, fastest first, past the sort key ``after``.
+
+    The sort key is (elapsed_time_seconds, id). Seeks on
+    ix_activity_best_efforts_user_distance_time, so every page costs the same.
+    """
+    query = (
+        select(
+            ActivityBestEffort.id,
+            ActivityBestEffort.distance,
+            ActivityBestEffort.elapsed_time_seconds,
+            ActivityBestEffort.activity_start_date,
+            Activity.strava_activity_id,
+        )
+        .join(Activity, Activity.id == ActivityBestEffort.activity_id)
+        .where(ActivityBestEffort.user_id == user_id, ActivityBestEffort.distance == distance)
+    )
+    if after is not None:
+        query = query.where(tuple_(ActivityBestEffort.elapsed_time_seconds, ActivityBestEffort.id) > tuple_(*after))
+    return db.execute(
+        query.order_by(ActivityBestEffort.elapsed_time_seconds, ActivityBestEffort.id).limit(limit)
+    ).all()
+
+
+def resolve_activities(db: Session, user_id: int, strava_activity_ids: Iterable[int]) -> Dict[int, ActivityKey]:
+    """Map Strava activity IDs to their stored activity for one user in a single query."""
+    strava_activity_ids = list(set(strava_activity_ids))
+    if not strava_activity_ids:
+        return {}
+    rows = db.query(Activity.strava_activity_id, Activity.id, Activity.activity_start_date).filter(
+        Activity.user_id == user_id, Activity.strava_activity_id.in_(strava_activity_ids)
+    )
+    return {strava_id: ActivityKey(activity_id, start_date) for strava_id, activity_id, start_date in rows}
+
+
+def bulk_upsert_activities(db: Session, user_id: int, rows: Sequence[Dict[str, Any]]) -> Dict[int, ActivityKey]:
+    """
+    Insert or update many activities for one user.
+
+    Uses multi-row ``INSERT ... ON CONFLICT`` on ``uq_user_strava_activity`` so
+    re-importing the same activities is a no-op apart from refreshing their
+    fields. Returns a map of Strava activity ID to the stored activity. Does not
+    commit.
+    """
+    activities: Dict[int, ActivityKey] = {}
+    rows = _dedupe(rows, "strava_activity_id")
+    for chunk in _chunks(rows, ACTIVITY_CHUNK_SIZE):
+        stmt = pg_insert(Activity).values([{**row, "user_id": user_id} for row in chunk])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_user_strava_activity",
+            set_={column: stmt.excluded[column] for column in ACTIVITY_UPDATE_COLUMNS},
+        ).returning(Activity.strava_activity_id, Activity.id, Activity.activity_start_date)
+        activities.update(
+            (strava_id, ActivityKey(activity_id, start_date))
+            for strava_id, activity_id, start_date in db.execute(stmt)
+        )
+    return activities
+
+
+def bulk_upsert_best_efforts(db: Session, user_id: int, rows: Sequence[Dict[str, Any]],
+                             activities: Optional[Dict[int, ActivityKey]] = None) -> int:
+    """
+    Insert or update many best efforts for one user.
+
+    Rows carry ``strava_activity_id`` rather than the activities.id foreign key;
+    activities missing from ``activities`` are resolved with one query. Rows
+    whose activity does not exist are skipped. Returns the number of rows
+    written. Does not commit.
+    """
+    activities = dict(activities or {})
+    missing = {row["strava_activity_id"] for row in rows} - activities.keys()
+    if missing:
+        activities.update(resolve_activities(db, user_id, missing))
+
+    values = _dedupe(
+        (
+            {
+                "activity_id": activities[row["strava_activity_id"]].id,
+                "user_id": user_id,
+                "distance": row["distance"],
+                "elapsed_time_seconds": row["elapsed_time_seconds"],
+                "activity_start_date": activities[row["strava_activity_id"]].activity_start_date,
+            }
+            for row in rows
+            if row["strava_activity_id"] in activities
+        ),
+        "activity_id",
+        "distance",
+    )
+
+    for chunk in _chunks(values, BEST_EFFORT_CHUNK_SIZE):
+        stmt = pg_insert(ActivityBestEffort).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_activity_distance_effort",
+            set_={
+                "elapsed_time_seconds": stmt.excluded.elapsed_time_seconds,
+                "activity_start_date": stmt.excluded.activity_start_date,
+            },
+        )
+        db.execute(stmt)
+    return len(values)
+
+
+def delete_other_best_efforts(db: Session, activity_ids: Iterable[int],
+                              keep: Iterable[Tuple[int, PRDistance]]) -> int:
+    """
+    Delete the best efforts of some activities except the (activity_id, distance) pairs in ``keep``.
+
+    For re-imports that carry an activity's complete set of efforts, so that
+    efforts it no longer has (after being cropped, or no longer being a run)
+    go away. Returns the number deleted. Does not commit.
+    """
+    activity_ids = list(set(activity_ids))
+    if not activity_ids:
+        return 0
+    stmt = delete(ActivityBestEffort).where(ActivityBestEffort.activity_id.in_(activity_ids))
+    keep = list(set(keep))
+    if keep:
+        stmt = stmt.where(tuple_(ActivityBestEffort.activity_id, ActivityBestEffort.distance).not_in(keep))
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def delete_activities(db: Session, user_id: int, strava_activity_ids: Iterable[int]) -> List[int]:
+    """
+    Delete some of a user's activities along with their best efforts.
+
+    Personal records, period bests and leaderboard entries sourced from them are
+    deleted too; the caller is responsible for recomputing them. Returns the
+    deleted activities.id values. Does not commit.
+    """
+    strava_activity_ids = list(set(strava_activity_ids))
+    if not strava_activity_ids:
+        return []
+    activity_ids = [
+        activity_id
+        for (activity_id,) in db.query(Activity.id).filter(
+            Activity.user_id == user_id, Activity.strava_activity_id.in_(strava_activity_ids)
+        )
+    ]
+    if not activity_ids:
+        return []
+
+    for column in (
+        LeaderboardEntry.source_activity_id,
+        PersonalRecord.source_activity_id,
+        PeriodBestEffort.activity_id,
+        ActivityBestEffort.activity_id,
+        Activity.id,
+    ):
+        db.query(column.class_).filter(column.in_(activity_ids)).delete(synchronize_session=False)
+    return activity_ids
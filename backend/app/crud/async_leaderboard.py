@@ -0,0 +1,23 @@
+"""Asyncio variants of the leaderboard reads in ``app.crud.leaderboard``."""
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.leaderboard import leaderboard_page_query
+from models.models import LeaderboardSnapshot, PRDistance
+
+
+async def get_snapshots(db: AsyncSession) -> List[LeaderboardSnapshot]:
+    """Get the current snapshot metadata for every distance."""
+    return list(await db.scalars(select(LeaderboardSnapshot)))
+
+
+async def get_snapshot(db: AsyncSession, distance: PRDistance) -> Optional[LeaderboardSnapshot]:
+    """Get the current snapshot metadata for one distance."""
+    return await db.scalar(select(LeaderboardSnapshot).where(LeaderboardSnapshot.distance == distance).limit(1))
+
+
+async def get_leaderboard_page(db: AsyncSession, distance: PRDistance, offset: int, limit: int):
+    """Get ``limit`` ranked entries after ``offset``; see ``leaderboard_page_query``."""
+    return (await db.execute(leaderboard_page_query(distance, offset, limit))).all()
@@ -0,0 +1,53 @@
+"""
+Asyncio variants of the user reads in ``app.crud.user``.
+
+For endpoints that take an ``AsyncSession`` from ``get_async_db``. They run
+the same statements; relationships are never lazy-loaded on an async session,
+so anything a caller needs must be loaded eagerly here.
+"""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.crud.user import user_cache
+from models.models import User
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """Get user by email address."""
+    return await db.scalar(select(User).where(User.email == email).limit(1))
+
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Get user by ID."""
+    return await db.scalar(select(User).where(User.id == user_id).limit(1))
+
+
+async def get_cached_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """
+    Get user by ID through the user cache shared with ``app.crud.user.get_cached_user``.
+
+    The returned row is detached from ``db`` and shared between requests:
+    treat it as read-only and do not touch its relationships.
+    """
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await get_user_by_id(db, user_id)
+        if user is not None:
+            db.expunge(user)
+            user_cache.set(user_id, user)
+    return user
+
+
+async def get_user_by_strava_id(db: AsyncSession, strava_id: int) -> Optional[User]:
+    """Get user by Strava athlete ID."""
+    return await db.scalar(select(User).where(User.strava_athlete_id == strava_id).limit(1))
+
+
+async def get_user_by_x_id(db: AsyncSession, x_user_id: str) -> Optional[User]:
+    """Get user by X.com user ID, with their X authorization loaded in the same query."""
+    return await db.scalar(
+        select(User).options(joinedload(User.x_authorization)).where(User.x_user_id == x_user_id).limit(1)
+    )
@@ -0,0 +1,148 @@
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Select, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.response_cache import invalidate
+from models.models import LeaderboardEntry, LeaderboardSnapshot, PersonalRecord, PRDistance, User
+
+# First key of the advisory lock taken while refreshing a distance ("LB").
+REFRESH_LOCK_KEY = 0x4C42
+
+DISTANCE_LOCK_IDS = {distance: index for index, distance in enumerate(PRDistance)}
+
+
+def get_snapshots(db: Session) -> List[LeaderboardSnapshot]:
+    """Get the current snapshot metadata for every distance."""
+    return db.query(LeaderboardSnapshot).all()
+
+
+def get_snapshot(db: Session, distance: PRDistance) -> Optional[LeaderboardSnapshot]:
+    """Get the current snapshot metadata for one distance."""
+    return db.query(LeaderboardSnapshot).filter(LeaderboardSnapshot.distance == distance).first()
+
+
+def leaderboard_page_query(distance: PRDistance, offset: int, limit: Optional[int]) -> Select:
+    """
+    Select ``limit`` ranked entries after ``offset`` with the users' display fields.
+
+    Seeks on the (distance, position) primary key, so deep pages cost the same
+    as the first one. A ``limit`` of None selects the rest of the board.
+    """
+    return (
+        select(
+            LeaderboardEntry.rank,
+            LeaderboardEntry.position,
+            LeaderboardEntry.user_id,
+            User.x_username,
+            User.x_display_name,
+            User.profile_picture_url,
+            LeaderboardEntry.elapsed_time_seconds,
+            LeaderboardEntry.achieved_on,
+        )
+        .join(User, User.id == LeaderboardEntry.user_id)
+        .where(LeaderboardEntry.distance == distance, LeaderboardEntry.position > offset)
+        .order_by(LeaderboardEntry.position)
+        .limit(limit)
+    )
+
+
+def get_leaderboard_page(db: Session, distance: PRDistance, offset: int, limit: int):
+    """Get ``limit`` ranked entries after ``offset``; see ``leaderboard_page_query``."""
+    return db.execute(leaderboard_page_query(distance, offset, limit)).all()
+
+
+def _records_updated_at(db: Session, distance: PRDistance):
+    return db.query(func.max(PersonalRecord.updated_at)).filter(PersonalRecord.distance == distance).scalar()
+
+
+def is_stale(db: Session, distance: PRDistance) -> bool:
+    """
+    Whether personal records have changed since the distance was last snapshotted.
+
+    Compares the record count and max(updated_at) with the snapshot's: writes
+    move the max, and deleted records (which leave no row to stamp) change
+    the count.
+    """
+    snapshot = get_snapshot(db, distance)
+    if snapshot is None:
+        return True
+    count, latest = (
+        db.query(func.count(), func.max(PersonalRecord.updated_at))
+        .filter(PersonalRecord.distance == distance)
+        .one()
+    )
+    if count != snapshot.entry_count:
+        return True
+    return latest is not None and (snapshot.records_updated_at is None or latest > snapshot.records_updated_at)
+
+
+def refresh_leaderboard(db: Session, distance: PRDistance) -> int:
+    """
+    Replace one distance's snapshot with a fresh ranking of personal_records.
+
+    The delete and re-insert happen in the caller's transaction, so readers keep
+    seeing the previous snapshot until commit and are never blocked. Concurrent
+    refreshes of the same distance are serialised with an advisory lock.
+    Returns the number of ranked entries. Does not commit.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(REFRESH_LOCK_KEY, DISTANCE_LOCK_IDS[distance])))
+    records_updated_at = _records_updated_at(db, distance)
+
+    db.query(LeaderboardEntry).filter(LeaderboardEntry.distance == distance).delete(synchronize_session=False)
+    ranked = select(
+        PersonalRecord.distance,
+        func.row_number().over(
+            order_by=(PersonalRecord.elapsed_time_seconds, PersonalRecord.achieved_on, PersonalRecord.user_id)
+        ),
+        func.rank().over(order_by=PersonalRecord.elapsed_time_seconds),
+        PersonalRecord.user_id,
+        PersonalRecord.source_activity_id,
+        PersonalRecord.elapsed_time_seconds,
+        PersonalRecord.achieved_on,
+    ).where(PersonalRecord.distance == distance)
+    count = db.execute(
+        insert(LeaderboardEntry).from_select(
+            ["distance", "position", "rank", "user_id", "source_activity_id", "elapsed_time_seconds", "achieved_on"],
+            ranked,
+        )
+    ).rowcount
+
+    stmt = pg_insert(LeaderboardSnapshot).values(
+        distance=distance, entry_count=count, records_updated_at=records_updated_at, refreshed_at=func.now()
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[LeaderboardSnapshot.distance],
+        set_={
+            "entry_count": stmt.excluded.entry_count,
+            "records_updated_at": stmt.excluded.records_updated_at,
+            "refreshed_at": stmt.excluded.refreshed_at,
+        },
+    ))
+    return count
+
+
+def refresh_leaderboards(db: Session, distances: Optional[Iterable[PRDistance]] = None,
+                         force: bool = False) -> List[PRDistance]:
+    """
+    Refresh the snapshots of stale distances (or all of ``distances`` with ``force``).
+
+    Each distance is committed separately to keep transactions short.
+    Returns the distances that were refreshed.
+    """
+    refreshed = []
+    for distance in distances or list(PRDistance):
+        if not force and not is_stale(db, distance):
+            continue
+        try:
+            refresh_leaderboard(db, distance)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        invalidate(f"leaderboard:{distance.name}")
+        refreshed.append(distance)
+    if refreshed:
+        invalidate("leaderboards")
+    return refreshed
@@ -0,0 +1,167 @@
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import Date, cast, delete, func, literal, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.models import ActivityBestEffort, PeriodBestEffort, PRDistance, RollupPeriod, User
+
+PERIOD_COLUMNS = [
+    "period", "period_start", "distance", "user_id", "activity_id", "elapsed_time_seconds", "achieved_on",
+]
+
+
+def period_start(period: RollupPeriod, day: date) -> date:
+    """First day of the week, month or year containing ``day``; matches date_trunc."""
+    if period == RollupPeriod.WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == RollupPeriod.MONTH:
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def _effort_period_start(period: RollupPeriod):
+    # Rendered inline so DISTINCT ON and ORDER BY see textually identical expressions.
+    unit = literal_column(f"'{period.value}'")
+    return cast(func.date_trunc(unit, ActivityBestEffort.activity_start_date), Date)
+
+
+def _fastest_in_period(period: RollupPeriod, *criteria):
+    """Fastest matching effort per (window, user, distance) for one period type."""
+    start = _effort_period_start(period)
+    return (
+        select(
+            literal(period, PeriodBestEffort.period.type),
+            start,
+            ActivityBestEffort.distance,
+            ActivityBestEffort.user_id,
+            ActivityBestEffort.activity_id,
+            ActivityBestEffort.elapsed_time_seconds,
+            cast(ActivityBestEffort.activity_start_date, Date),
+        )
+        .where(*criteria)
+        .distinct(start, ActivityBestEffort.user_id, ActivityBestEffort.distance)
+        .order_by(
+            start,
+            ActivityBestEffort.user_id,
+            ActivityBestEffort.distance,
+            ActivityBestEffort.elapsed_time_seconds,
+            ActivityBestEffort.activity_start_date,
+        )
+    )
+
+
+def apply_period_bests(db: Session, activity_ids: Iterable[int]) -> int:
+    """
+    Fold the best efforts of newly written activities into the period rollups.
+
+    Like the personal record update, this only reads the new efforts and only
+    overwrites a window's entry when it is beaten. Entries already held by
+    these activities are recomputed first, since a re-import may have moved
+    an activity into another window or made its efforts slower. Returns the
+    number of entries created or improved. Does not commit.
+    """
+    activity_ids = list(set(activity_ids))
+    if not activity_ids:
+        return 0
+
+    held = db.execute(
+        delete(PeriodBestEffort)
+        .where(PeriodBestEffort.activity_id.in_(activity_ids))
+        .returning(PeriodBestEffort.period, PeriodBestEffort.period_start,
+                   PeriodBestEffort.distance, PeriodBestEffort.user_id)
+    ).all()
+
+    changed = 0
+    for period in RollupPeriod:
+        windows = [(start, distance, user_id) for p, start, distance, user_id in held if p == period]
+        if windows:
+            # Refill the vacated windows from every effort still in them.
+            changed += db.execute(pg_insert(PeriodBestEffort).from_select(PERIOD_COLUMNS, _fastest_in_period(
+                period,
+                ActivityBestEffort.user_id.in_({user_id for _, _, user_id in windows}),
+                tuple_(_effort_period_start(period), ActivityBestEffort.distance, ActivityBestEffort.user_id)
+                .in_(windows),
+            ))).rowcount
+
+        stmt = pg_insert(PeriodBestEffort).from_select(
+            PERIOD_COLUMNS, _fastest_in_period(period, ActivityBestEffort.activity_id.in_(activity_ids))
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["period", "period_start", "distance", "user_id"],
+            set_={
+                "activity_id": stmt.excluded.activity_id,
+                "elapsed_time_seconds": stmt.excluded.elapsed_time_seconds,
+                "achieved_on": stmt.excluded.achieved_on,
+                "updated_at": func.now(),
+            },
+            where=PeriodBestEffort.elapsed_time_seconds > stmt.excluded.elapsed_time_seconds,
+        )
+        changed += db.execute(stmt).rowcount
+    return changed
+
+
+def rebuild_period_bests(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Repair mode: recompute the period rollups from every stored best effort.
+
+    Covers one user, or everyone when ``user_id`` is None. Returns the number
+    of entries written. Does not commit.
+    """
+    stale = db.query(PeriodBestEffort)
+    criteria = []
+    if user_id is not None:
+        stale = stale.filter(PeriodBestEffort.user_id == user_id)
+        criteria.append(ActivityBestEffort.user_id == user_id)
+    stale.delete(synchronize_session=False)
+
+    return sum(
+        db.execute(
+            pg_insert(PeriodBestEffort).from_select(PERIOD_COLUMNS, _fastest_in_period(period, *criteria))
+        ).rowcount
+        for period in RollupPeriod
+    )
+
+
+def get_period_board_version(db: Session, period: RollupPeriod, start: date,
+                             distance: PRDistance) -> Tuple[int, Optional[datetime]]:
+    """Number of athletes on one window's board and when its latest entry changed."""
+    return db.query(func.count(), func.max(PeriodBestEffort.updated_at)).filter(
+        PeriodBestEffort.period == period,
+        PeriodBestEffort.period_start == start,
+        PeriodBestEffort.distance == distance,
+    ).one()
+
+
+def get_period_leaderboard_page(db: Session, period: RollupPeriod, start: date, distance: PRDistance,
+                                offset: int, limit: int, after: Optional[Tuple[int, int]] = None):
+    """
+    Get ``limit`` entries of one window's board, fastest first.
+
+    The page starts past the (elapsed_time_seconds, user_id) sort key
+    ``after`` when given, which seeks on ix_period_best_efforts_board at any
+    depth; otherwise it skips ``offset`` entries.
+    """
+    query = (
+        db.query(
+            PeriodBestEffort.user_id,
+            User.x_username,
+            User.x_display_name,
+            User.profile_picture_url,
+            PeriodBestEffort.elapsed_time_seconds,
+            PeriodBestEffort.achieved_on,
+        )
+        .join(User, User.id == PeriodBestEffort.user_id)
+        .filter(
+            PeriodBestEffort.period == period,
+            PeriodBestEffort.period_start == start,
+            PeriodBestEffort.distance == distance,
+        )
+        .order_by(PeriodBestEffort.elapsed_time_seconds, PeriodBestEffort.user_id)
+    )
+    if after is not None:
+        query = query.filter(tuple_(PeriodBestEffort.elapsed_time_seconds, PeriodBestEffort.user_id) > tuple_(*after))
+    else:
+        query = query.offset(offset)
+    return query.limit(limit).all()
@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, Select, cast, delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.models import Activity, ActivityBestEffort, PersonalRecord, PRDistance
+
+PR_COLUMNS = ["user_id", "source_activity_id", "distance", "elapsed_time_seconds", "achieved_on"]
+
+
+def _fastest_efforts(*criteria):
+    """Fastest matching effort per (user, distance), ties going to the earliest activity."""
+    return (
+        select(
+            ActivityBestEffort.user_id,
+            ActivityBestEffort.activity_id,
+            ActivityBestEffort.distance,
+            ActivityBestEffort.elapsed_time_seconds,
+            cast(ActivityBestEffort.activity_start_date, Date),
+        )
+        .where(*criteria)
+        .distinct(ActivityBestEffort.user_id, ActivityBestEffort.distance)
+        .order_by(
+            ActivityBestEffort.user_id,
+            ActivityBestEffort.distance,
+            ActivityBestEffort.elapsed_time_seconds,
+            ActivityBestEffort.activity_start_date,
+        )
+    )
+
+
+def get_personal_records(db: Session, user_id: int) -> List[PersonalRecord]:
+    """Get all of a user's personal records."""
+    return db.query(PersonalRecord).filter(PersonalRecord.user_id == user_id).all()
+
+
+def personal_records_query(user_id: int) -> Select:
+    """Select a user's records with their activity's Strava ID, in PRDistance order."""
+    return (
+        select(
+            PersonalRecord.distance,
+            PersonalRecord.elapsed_time_seconds,
+            PersonalRecord.achieved_on,
+            Activity.strava_activity_id,
+        )
+        .join(Activity, Activity.id == PersonalRecord.source_activity_id)
+        .where(PersonalRecord.user_id == user_id)
+        .order_by(PersonalRecord.distance)
+    )
+
+
+def get_personal_records_version(db: Session, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """Number of records a user holds and when the latest one changed."""
+    return db.query(func.count(), func.max(PersonalRecord.updated_at)).filter(
+        PersonalRecord.user_id == user_id
+    ).one()
+
+
+def get_personal_record_rows(db: Session, user_id: int):
+    """Get a user's records as plain rows; see ``personal_records_query``."""
+    return db.execute(personal_records_query(user_id)).all()
+
+
+def apply_best_efforts(db: Session, activity_ids: Iterable[int]) -> List[Tuple[int, PRDistance]]:
+    """
+    Fold the best efforts of newly written activities into personal_records.
+
+    Only the new efforts are read. Each is compared against the current PR in
+    a single ``INSERT ... SELECT ... ON CONFLICT DO UPDATE WHERE`` statement, so
+    untouched records are never rewritten. Records already held by these
+    activities are recomputed first, since a re-import may have made their
+    efforts slower or dropped them. Returns the (user_id, distance) pairs whose
+    record was created, improved or recomputed. Does not commit.
+    """
+    activity_ids = list(set(activity_ids))
+    if not activity_ids:
+        return []
+
+    held = [
+        tuple(row) for row in db.execute(
+            delete(PersonalRecord)
+            .where(PersonalRecord.source_activity_id.in_(activity_ids))
+            .returning(PersonalRecord.user_id, PersonalRecord.distance)
+        )
+    ]
+    if held:
+        # Refill the vacated records from every effort still at those distances.
+        db.execute(pg_insert(PersonalRecord).from_select(PR_COLUMNS, _fastest_efforts(
+            ActivityBestEffort.user_id.in_({user_id for user_id, _ in held}),
+            tuple_(ActivityBestEffort.user_id, ActivityBestEffort.distance).in_(held),
+        )))
+
+    stmt = pg_insert(PersonalRecord).from_select(
+        PR_COLUMNS, _fastest_efforts(ActivityBestEffort.activity_id.in_(activity_ids))
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_distance_pr",
+        set_={
+            "source_activity_id": stmt.excluded.source_activity_id,
+            "elapsed_time_seconds": stmt.excluded.elapsed_time_seconds,
+            "achieved_on": stmt.excluded.achieved_on,
+            "updated_at": func.now(),
+        },
+        where=PersonalRecord.elapsed_time_seconds > stmt.excluded.elapsed_time_seconds,
+    ).returning(PersonalRecord.user_id, PersonalRecord.distance)
+    improved = list(db.execute(stmt).tuples())
+    return improved + sorted(set(held) - set(improved))
+
+
+def rebuild_personal_records(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Repair mode: recompute personal records from every stored best effort.
+
+    Scans the full history of one user, or of all users when ``user_id`` is
+    None. Use after deleting activities or correcting efforts outside of
+    ``apply_best_efforts``. Returns the number of records written. Does not
+    commit.
+    """
+    stale = db.query(PersonalRecord)
+    criteria = []
+    if user_id is not None:
+        stale = stale.filter(PersonalRecord.user_id == user_id)
+        criteria.append(ActivityBestEffort.user_id == user_id)
+    stale.delete(synchronize_session=False)
+
+    result = db.execute(pg_insert(PersonalRecord).from_select(PR_COLUMNS, _fastest_efforts(*criteria)))
+    return result.rowcount
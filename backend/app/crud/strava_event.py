@@ -0,0 +1,142 @@
+from datetime import timedelta
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import case, delete, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.models import StravaEvent
+
+KEY_COLUMNS = (StravaEvent.owner_id, StravaEvent.object_type, StravaEvent.object_id)
+
+
+def _keys(events) -> List[tuple]:
+    return [(event.owner_id, event.object_type, event.object_id) for event in events]
+
+
+async def enqueue_event(db: AsyncSession, event: Dict[str, Any], delay: timedelta) -> None:
+    """
+    Queue a webhook event, folding it into the pending row for the same object.
+
+    One primary-key upsert. A new row becomes claimable after ``delay``, and
+    events arriving in the meantime only bump its version, so a burst costs
+    one fetch. An event for a row a worker is processing pushes the row out
+    by ``delay`` again; the worker then releases rather than deletes it.
+    Does not commit.
+    """
+    stmt = pg_insert(StravaEvent).values(
+        owner_id=event["owner_id"],
+        object_type=event["object_type"],
+        object_id=event["object_id"],
+        aspect_type=event["aspect_type"],
+        updates=event.get("updates") or None,
+        version=1,
+        event_count=1,
+        attempts=0,
+        available_at=func.now() + delay,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["owner_id", "object_type", "object_id"],
+        set_={
+            # Strava never revives a deleted object, so a queued delete wins.
+            "aspect_type": case(
+                (StravaEvent.aspect_type == "delete", StravaEvent.aspect_type), else_=stmt.excluded.aspect_type
+            ),
+            "updates": stmt.excluded.updates,
+            "version": StravaEvent.version + 1,
+            "event_count": StravaEvent.event_count + 1,
+            # Pulls a row waiting out a retry backoff forward; never delays a coalescing one.
+            "available_at": case(
+                (StravaEvent.leased_until.is_not(None), stmt.excluded.available_at),
+                else_=func.least(StravaEvent.available_at, stmt.excluded.available_at),
+            ),
+        },
+    )
+    await db.execute(stmt)
+
+
+def claim_events(db: Session, limit: int, lease: timedelta):
+    """
+    Lease up to ``limit`` due events and commit, oldest first.
+
+    Rows are picked with ``FOR UPDATE SKIP LOCKED`` but only locked for this
+    short transaction; the lease keeps other workers off them afterwards.
+    Returns rows with the key, aspect_type, updates, version and attempts.
+    """
+    due = (
+        select(*KEY_COLUMNS)
+        .where(
+            StravaEvent.available_at <= func.now(),
+            or_(StravaEvent.leased_until.is_(None), StravaEvent.leased_until < func.now()),
+        )
+        .order_by(StravaEvent.available_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(StravaEvent)
+        .where(tuple_(*KEY_COLUMNS).in_(due))
+        .values(leased_until=func.now() + lease, attempts=StravaEvent.attempts + 1)
+        .returning(*KEY_COLUMNS, StravaEvent.aspect_type, StravaEvent.updates,
+                   StravaEvent.version, StravaEvent.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        events = db.execute(stmt).all()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return events
+
+
+def complete_events(db: Session, events: Sequence) -> None:
+    """
+    Remove handled events and commit.
+
+    A row whose version moved on while it was leased got new events, so it is
+    released for another pass instead of deleted.
+    """
+    if not events:
+        return
+    try:
+        db.execute(
+            delete(StravaEvent)
+            .where(tuple_(*KEY_COLUMNS, StravaEvent.version).in_(
+                [(*key, event.version) for key, event in zip(_keys(events), events)]
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(StravaEvent)
+            .where(tuple_(*KEY_COLUMNS).in_(_keys(events)))
+            .values(leased_until=None, attempts=0, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def retry_events(db: Session, events: Sequence, error: str, backoff: timedelta) -> None:
+    """Release events that failed, claimable again after ``backoff``, and commit."""
+    if not events:
+        return
+    try:
+        db.execute(
+            update(StravaEvent)
+            .where(tuple_(*KEY_COLUMNS).in_(_keys(events)))
+            .values(leased_until=None, available_at=func.now() + backoff, last_error=error[:512])
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def count_pending_events(db: Session) -> int:
+    """Events waiting to be handled, leased or not."""
+    return db.query(func.count()).select_from(StravaEvent).scalar()
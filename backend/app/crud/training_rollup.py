@@ -0,0 +1,139 @@
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, cast, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.crud.period_best_effort import period_start
+from models.models import Activity, RollupPeriod, TrainingRollup
+
+TOTAL_COLUMNS = ("total_distance_meters", "moving_time_seconds", "total_elevation_gain_meters")
+
+
+def get_activity_totals(db: Session, user_id: int, strava_activity_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """The currently stored date and totals of some of a user's activities."""
+    strava_activity_ids = list(set(strava_activity_ids))
+    if not strava_activity_ids:
+        return []
+    rows = db.query(
+        Activity.strava_activity_id, Activity.activity_start_date, *(getattr(Activity, c) for c in TOTAL_COLUMNS)
+    ).filter(Activity.user_id == user_id, Activity.strava_activity_id.in_(strava_activity_ids))
+    return [row._asdict() for row in rows]
+
+
+def _accumulate(deltas: Dict[Tuple[RollupPeriod, date], List[float]], rows: Iterable[Dict[str, Any]],
+                sign: int) -> None:
+    for row in rows:
+        day = row["activity_start_date"].date()
+        values = [sign] + [sign * (row.get(column) or 0) for column in TOTAL_COLUMNS]
+        for period in RollupPeriod:
+            bucket = deltas[(period, period_start(period, day))]
+            for i, value in enumerate(values):
+                bucket[i] += value
+
+
+def apply_activity_changes(db: Session, user_id: int, removed: Iterable[Dict[str, Any]],
+                           added: Iterable[Dict[str, Any]]) -> int:
+    """
+    Adjust a user's training rollups for replaced or deleted activities.
+
+    ``removed`` are the stored versions of re-imported or deleted activities (see
+    get_activity_totals) and ``added`` their new versions plus any new
+    activities. Their difference is summed per window in Python and applied as
+    one additive upsert, so history is never re-aggregated. Returns the number
+    of windows touched. Does not commit.
+    """
+    deltas: Dict[Tuple[RollupPeriod, date], List[float]] = defaultdict(lambda: [0, 0.0, 0, 0.0])
+    _accumulate(deltas, removed, -1)
+    _accumulate(deltas, added, 1)
+
+    values = [
+        {
+            "user_id": user_id,
+            "period": period,
+            "period_start": start,
+            "activity_count": count,
+            "total_distance_meters": distance,
+            "moving_time_seconds": int(moving_time),
+            "total_elevation_gain_meters": elevation,
+        }
+        for (period, start), (count, distance, moving_time, elevation) in deltas.items()
+        if count or distance or moving_time or elevation
+    ]
+    if not values:
+        return 0
+
+    stmt = pg_insert(TrainingRollup).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "period", "period_start"],
+        set_={
+            "activity_count": TrainingRollup.activity_count + stmt.excluded.activity_count,
+            "total_distance_meters": TrainingRollup.total_distance_meters + stmt.excluded.total_distance_meters,
+            "moving_time_seconds": TrainingRollup.moving_time_seconds + stmt.excluded.moving_time_seconds,
+            "total_elevation_gain_meters": (
+                TrainingRollup.total_elevation_gain_meters + stmt.excluded.total_elevation_gain_meters
+            ),
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+    return len(values)
+
+
+def rebuild_training_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Repair mode: recompute training rollups from every stored activity.
+
+    Covers one user, or everyone when ``user_id`` is None. Returns the number
+    of windows written. Does not commit.
+    """
+    delete = db.query(TrainingRollup)
+    criteria = []
+    if user_id is not None:
+        delete = delete.filter(TrainingRollup.user_id == user_id)
+        criteria.append(Activity.user_id == user_id)
+    delete.delete(synchronize_session=False)
+
+    written = 0
+    for period in RollupPeriod:
+        # Rendered inline so SELECT and GROUP BY see textually identical expressions.
+        unit = literal_column(f"'{period.value}'")
+        window = cast(func.date_trunc(unit, Activity.activity_start_date), Date)
+        totals = (
+            select(
+                Activity.user_id,
+                literal(period, TrainingRollup.period.type),
+                window,
+                func.count(),
+                func.coalesce(func.sum(Activity.total_distance_meters), 0),
+                func.coalesce(func.sum(Activity.moving_time_seconds), 0),
+                func.coalesce(func.sum(Activity.total_elevation_gain_meters), 0),
+            )
+            .where(*criteria)
+            .group_by(Activity.user_id, window)
+        )
+        written += db.execute(
+            pg_insert(TrainingRollup).from_select(
+                ["user_id", "period", "period_start", "activity_count", "total_distance_meters",
+                 "moving_time_seconds", "total_elevation_gain_meters"],
+                totals,
+            )
+        ).rowcount
+    return written
+
+
+def get_training_totals(db: Session, user_id: int, period: RollupPeriod, limit: int) -> List[TrainingRollup]:
+    """A user's most recent non-empty windows, newest first."""
+    return (
+        db.query(TrainingRollup)
+        .filter(
+            TrainingRollup.user_id == user_id,
+            TrainingRollup.period == period,
+            TrainingRollup.activity_count > 0,
+        )
+        .order_by(TrainingRollup.period_start.desc())
+        .limit(limit)
+        .all()
+    )
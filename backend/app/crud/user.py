@@ -1,8 +1,24 @@
-from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session, joinedload
+from typing import Optional, Dict, Any, Iterable, List, Set
 from models.models import User
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.response_cache import invalidate
 from app.schemas.user import UserCreate
 
+# Detached, read-only User rows for authentication, keyed by user id.
+user_cache: TTLCache[User] = TTLCache(settings.user_cache_max_entries, settings.user_cache_ttl_seconds)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    # ORM flushes in this process are seen here; bulk UPDATEs and other
+    # processes are only caught by the TTLs.
+    user_cache.pop(target.id)
+    invalidate(f"user:{target.id}")
+
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email address."""
@@ -14,14 +30,106 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
 
+def get_cached_user(db: Session, user_id: int) -> Optional[User]:
+    """
+    Get user by ID through the user cache.
+
+    The returned row is detached from ``db`` and shared between requests:
+    treat it as read-only and do not touch its relationships.
+    """
+    user = user_cache.get(user_id)
+    if user is None:
+        user = get_user_by_id(db, user_id)
+        if user is not None:
+            db.expunge(user)
+            user_cache.set(user_id, user)
+    return user
+
+
 def get_user_by_strava_id(db: Session, strava_id: int) -> Optional[User]:
     """Get user by Strava athlete ID."""
     return db.query(User).filter(User.strava_athlete_id == strava_id).first()
 
 
 def get_user_by_x_id(db: Session, x_user_id: str) -> Optional[User]:
-    """Get user by X.com user ID."""
-    return db.query(User).filter(User.x_user_id == x_user_id).first()
+    """Get user by X.com user ID, with their X authorization loaded in the same query."""
+    return (
+        db.query(User)
+        .options(joinedload(User.x_authorization))
+        .filter(User.x_user_id == x_user_id)
+        .first()
+    )
+
+
+class UserLoader:
+    """
+    Request-scoped batching and memoization of user lookups.
+
+    IDs passed to ``prime`` (or looked up with ``get_many``) are fetched
+    together with the next lookup in a single ``IN (...)`` query, by user ID
+    and Strava athlete ID alike. Every result, including "not found", is
+    remembered for the loader's lifetime, so share one loader per request
+    and never across requests.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._by_id: Dict[int, Optional[User]] = {}
+        self._by_strava_id: Dict[int, Optional[User]] = {}
+        self._pending_ids: Set[int] = set()
+        self._pending_strava_ids: Set[int] = set()
+
+    def prime(self, user_ids: Iterable[int] = (), strava_ids: Iterable[int] = ()) -> None:
+        """Queue IDs to be fetched with the next lookup."""
+        self._pending_ids.update(i for i in user_ids if i not in self._by_id)
+        self._pending_strava_ids.update(i for i in strava_ids if i not in self._by_strava_id)
+
+    def _load(self) -> None:
+        if not self._pending_ids and not self._pending_strava_ids:
+            return
+        ids, strava_ids = self._pending_ids, self._pending_strava_ids
+        self._pending_ids, self._pending_strava_ids = set(), set()
+        criteria = []
+        if ids:
+            criteria.append(User.id.in_(ids))
+        if strava_ids:
+            criteria.append(User.strava_athlete_id.in_(strava_ids))
+        for user in self.db.query(User).filter(or_(*criteria)):
+            self._by_id[user.id] = user
+            if user.strava_athlete_id is not None:
+                self._by_strava_id[user.strava_athlete_id] = user
+        for user_id in ids:
+            self._by_id.setdefault(user_id, None)
+        for strava_id in strava_ids:
+            self._by_strava_id.setdefault(strava_id, None)
+
+    def get(self, user_id: int) -> Optional[User]:
+        """Like ``get_user_by_id``, batched with everything primed."""
+        if user_id not in self._by_id:
+            self._pending_ids.add(user_id)
+            self._load()
+        return self._by_id[user_id]
+
+    def get_by_strava_id(self, strava_id: int) -> Optional[User]:
+        """Like ``get_user_by_strava_id``, batched with everything primed."""
+        if strava_id not in self._by_strava_id:
+            self._pending_strava_ids.add(strava_id)
+            self._load()
+        return self._by_strava_id[strava_id]
+
+    def get_many(self, user_ids: Iterable[int]) -> List[Optional[User]]:
+        """Users for ``user_ids`` in the same order, None where unknown, in at most one query."""
+        user_ids = list(user_ids)
+        self.prime(user_ids)
+        self._load()
+        return [self._by_id[user_id] for user_id in user_ids]
+
+    def get_many_by_strava_id(self, strava_ids: Iterable[int]) -> List[Optional[User]]:
+        """Users for ``strava_ids`` in the same order, None where unknown, in at most one query."""
+        strava_ids = list(strava_ids)
+        self.prime(strava_ids=strava_ids)
+        self._load()
+        return [self._by_strava_id[strava_id] for strava_id in strava_ids]
 
 
 def create_user_from_x(db: Session, x_user_data: Dict[str, Any]) -> User:
@@ -1,14 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2
-import os
 from dotenv import load_dotenv
 
-from app.api.v1 import auth, users
+from app.api import health, metrics
+from app.api.v1 import auth, leaderboards, users, webhooks
+from app.core import profiling, query_audit
+from app.core.config import settings
+from app.core.database import async_engine, engine
+from app.core.http import aclose_clients
+from app.core.metrics import MetricsMiddleware
+from app.core.serialization import ORJSONResponse
+from app.services.rank_index import rank_index
 
 load_dotenv()
 
-app = FastAPI(title="Strava Leaderboard API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Builds the rank index in the background, then keeps it in sync.
+    rank_index_task = asyncio.create_task(rank_index.keep_fresh())
+    yield
+    rank_index_task.cancel()
+    await aclose_clients()
+
+
+app = FastAPI(title="Strava Leaderboard API", version="1.0.0", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,15 +37,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if settings.query_audit_enabled:
+    query_audit.install(engine)
+    query_audit.install(async_engine.sync_engine)
+    app.add_middleware(query_audit.QueryAuditMiddleware)
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
+app.include_router(leaderboards.router, prefix="/api/v1/leaderboards", tags=["leaderboards"])
+app.include_router(webhooks.router, prefix="/api/v1/webhooks", tags=["webhooks"])
+app.include_router(health.router, tags=["health"])
+app.include_router(metrics.router, tags=["metrics"])
 
-@app.get("/health")
-def health_check():
-    try:
-        conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-        conn.close()
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
\ No newline at end of file
+if settings.profiling_enabled:
+    # Added last so it wraps everything; resolves route templates against the routes above.
+    profiling.install(engine)
+    profiling.install(async_engine.sync_engine)
+    app.add_middleware(profiling.ProfilingMiddleware, routes=app.routes)
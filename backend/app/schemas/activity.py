@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+from models.models import PRDistance
+
+
+class ActivityResponse(BaseModel):
+    strava_activity_id: int
+    name: Optional[str] = None
+    total_distance_meters: Optional[float] = None
+    moving_time_seconds: Optional[int] = None
+    total_elevation_gain_meters: Optional[float] = None
+    activity_start_date: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class BestEffortResponse(BaseModel):
+    distance: PRDistance
+    elapsed_time_seconds: int
+    activity_start_date: datetime
+    strava_activity_id: int
+
+    class Config:
+        from_attributes = True
@@ -20,6 +20,7 @@ class UserToken(BaseModel):
     """Response after successful authentication"""
     access_token: str
     token_type: str
+    expires_in: int
     user_id: int
     x_username: str
     x_display_name: Optional[str] = None
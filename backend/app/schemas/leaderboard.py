@@ -0,0 +1,39 @@
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+from models.models import PRDistance, RollupPeriod
+
+
+class LeaderboardEntryResponse(BaseModel):
+    rank: int
+    user_id: int
+    x_username: str
+    x_display_name: Optional[str] = None
+    profile_picture_url: Optional[str] = None
+    elapsed_time_seconds: int
+    achieved_on: date
+
+    class Config:
+        from_attributes = True
+
+
+class LeaderboardResponse(BaseModel):
+    distance: PRDistance
+    # Set for the week/month/year boards; absent for the all-time board.
+    period: Optional[RollupPeriod] = None
+    period_start: Optional[date] = None
+    total_entries: int
+    refreshed_at: Optional[datetime] = None
+    entries: List[LeaderboardEntryResponse]
+    # Pass as ``cursor`` to get the next page; null on the last page.
+    next_cursor: Optional[str] = None
+
+
+class LeaderboardSummary(BaseModel):
+    distance: PRDistance
+    entry_count: int
+    refreshed_at: datetime
+
+    class Config:
+        from_attributes = True
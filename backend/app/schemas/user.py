@@ -1,7 +1,9 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 
+from models.models import PRDistance, RollupPeriod
+
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -12,8 +14,13 @@ class UserCreate(UserBase):
     pass
 
 
-class UserResponse(UserBase):
+class UserResponse(BaseModel):
     id: int
+    x_username: str
+    x_display_name: Optional[str] = None
+    # Optional on the model: users signing in with X may never set them.
+    email: Optional[str] = None
+    username: Optional[str] = None
     strava_athlete_id: Optional[int] = None
     profile_picture_url: Optional[str] = None
     created_at: datetime
@@ -25,4 +32,42 @@ class UserResponse(UserBase):
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     username: Optional[str] = None
-    profile_picture_url: Optional[str] = None
\ No newline at end of file
+    profile_picture_url: Optional[str] = None
+
+
+class RankResponse(BaseModel):
+    distance: PRDistance
+    rank: int
+    total: int
+    percentile: float
+    elapsed_time_seconds: int
+
+    class Config:
+        from_attributes = True
+
+
+class PersonalRecordResponse(BaseModel):
+    distance: PRDistance
+    elapsed_time_seconds: int
+    achieved_on: date
+    strava_activity_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class UserRanksResponse(BaseModel):
+    user_id: int
+    ranks: List[RankResponse]
+
+
+class TrainingTotalsResponse(BaseModel):
+    period: RollupPeriod
+    period_start: date
+    activity_count: int
+    total_distance_meters: float
+    moving_time_seconds: int
+    total_elevation_gain_meters: float
+
+    class Config:
+        from_attributes = True
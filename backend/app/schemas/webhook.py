@@ -0,0 +1,14 @@
+from typing import Any, Dict, Literal
+
+from pydantic import BaseModel
+
+
+class StravaWebhookEvent(BaseModel):
+    """An event pushed by Strava for a subscribed athlete"""
+    object_type: Literal["activity", "athlete"]
+    object_id: int
+    aspect_type: Literal["create", "update", "delete"]
+    owner_id: int
+    subscription_id: int
+    event_time: int
+    updates: Dict[str, Any] = {}
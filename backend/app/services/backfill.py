@@ -0,0 +1,226 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.best_efforts import batch_best_efforts, parse_streams, stream_best_effort_rows
+from app.services.ingest import ingest_activities
+from app.services.stream_store import StreamStore
+from app.services.strava import StravaClient, activity_row, best_effort_rows, is_run
+from app.services.strava_rate_limit import Priority
+from models.models import BackfillStatus, StravaAuthorization, User
+
+logger = logging.getLogger(__name__)
+
+# Refresh the Strava access token if it expires within this margin.
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Streams fetched and kept in the stream store when computing best efforts from streams.
+STREAM_KEYS = ("time", "distance", "altitude", "heartrate")
+
+
+def fresh_access_token(db: Session, client: StravaClient, strava_auth: StravaAuthorization) -> str:
+    """The athlete's access token, refreshed (and committed) first if it is about to expire."""
+    if strava_auth.token_expires_at - TOKEN_REFRESH_MARGIN <= datetime.utcnow():
+        token_info = client.refresh_access_token(strava_auth.refresh_token)
+        strava_auth.access_token = token_info["access_token"]
+        strava_auth.refresh_token = token_info.get("refresh_token", strava_auth.refresh_token)
+        strava_auth.token_expires_at = datetime.utcfromtimestamp(token_info["expires_at"])
+        db.commit()
+    return strava_auth.access_token
+
+
+def stream_best_efforts(client: StravaClient, stream_store: StreamStore, access_token: str,
+                        runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compute runs' best efforts from their streams in one batch.
+
+    Streams already in the stream store are read from disk; the rest are
+    fetched from Strava and stored for later reprocessing.
+    """
+    fetched = []
+    for summary in runs:
+        stored = stream_store.get(summary["id"])
+        if stored is None:
+            payload = client.get_activity_streams(access_token, summary["id"], keys=STREAM_KEYS)
+            stream_store.put_payload(summary["id"], payload)
+            streams = parse_streams(payload)
+        else:
+            streams = (stored.distance, stored.time)
+        if streams is not None:
+            fetched.append((summary["id"], streams))
+
+    efforts: List[Dict[str, Any]] = []
+    for (strava_id, _), best in zip(fetched, batch_best_efforts([streams for _, streams in fetched])):
+        efforts.extend(stream_best_effort_rows(strava_id, best))
+    return efforts
+
+
+class BackfillError(Exception):
+    """Raised when a user's backfill cannot proceed."""
+
+
+class BackfillEngine:
+    """
+    Imports the full Strava history of QUEUED users.
+
+    Users are claimed with ``FOR UPDATE SKIP LOCKED`` so several engine processes
+    can share the queue, then processed by a bounded pool of worker threads.
+    Each user moves QUEUED -> IN_PROGRESS -> COMPLETED/FAILED, and activities
+    are bulk-upserted one Strava page at a time, so a retried user picks up
+    where the failed attempt left off without duplicating rows. A claim is a
+    lease renewed after every page; users whose lease runs out are reclaimed.
+    """
+
+    def __init__(self, client: Optional[StravaClient] = None, workers: Optional[int] = None,
+                 page_size: Optional[int] = None, session_factory: sessionmaker = SessionLocal,
+                 best_effort_source: Optional[str] = None, stream_store: Optional[StreamStore] = None):
+        self.client = client or StravaClient(priority=Priority.BACKFILL)
+        self.workers = workers or settings.backfill_workers
+        self.page_size = page_size or settings.backfill_page_size
+        self.session_factory = session_factory
+        self.best_effort_source = best_effort_source or settings.backfill_best_effort_source
+        if self.best_effort_source not in ("strava", "streams"):
+            raise ValueError(f"Unknown best effort source: {self.best_effort_source!r}")
+        self.stream_store = stream_store or StreamStore()
+        self.lease = timedelta(seconds=settings.backfill_lease_seconds)
+
+    def claim_users(self, limit: int) -> List[int]:
+        """
+        Move up to ``limit`` QUEUED users to IN_PROGRESS under a lease and return their IDs.
+
+        IN_PROGRESS users whose lease has run out were left behind by a
+        process that died (or could not record the outcome) and are claimed
+        again; re-importing is idempotent.
+        """
+        db = self.session_factory()
+        try:
+            users = (
+                db.query(User)
+                .filter(or_(
+                    User.backfill_status == BackfillStatus.QUEUED,
+                    and_(
+                        User.backfill_status == BackfillStatus.IN_PROGRESS,
+                        or_(User.backfill_lease_expires_at.is_(None), User.backfill_lease_expires_at < func.now()),
+                    ),
+                ))
+                .order_by(User.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for user in users:
+                if user.backfill_status == BackfillStatus.IN_PROGRESS:
+                    logger.warning("Reclaiming user %d from an expired backfill lease", user.id)
+                user.backfill_status = BackfillStatus.IN_PROGRESS
+                user.backfill_lease_expires_at = func.now() + self.lease
+            db.commit()
+            return [user.id for user in users]
+        finally:
+            db.close()
+
+    def run(self, stop_when_idle: bool = True, poll_interval: Optional[float] = None) -> Dict[int, BackfillStatus]:
+        """
+        Keep the worker pool saturated with claimed users.
+
+        Returns the final status of every user processed. With
+        ``stop_when_idle=False`` this polls the queue forever.
+        """
+        poll_interval = poll_interval if poll_interval is not None else settings.backfill_poll_interval_seconds
+        results: Dict[int, BackfillStatus] = {}
+        running: Dict[Future, int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as pool:
+            while True:
+                free_slots = self.workers - len(running)
+                if free_slots > 0:
+                    for user_id in self.claim_users(free_slots):
+                        running[pool.submit(self.backfill_user, user_id)] = user_id
+
+                if not running:
+                    if stop_when_idle:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(set(running), timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    user_id = running.pop(future)
+                    try:
+                        results[user_id] = future.result()
+                    except Exception:
+                        # backfill_user records its own failures; whatever slips past must not stop the pool.
+                        logger.exception("Backfill of user %d ended without a recorded status", user_id)
+
+        return results
+
+    def backfill_user(self, user_id: int) -> BackfillStatus:
+        """Import one user's history and record the terminal status."""
+        db = self.session_factory()
+        try:
+            started = time.monotonic()
+            count = self._import_history(db, user_id)
+            self._set_status(db, user_id, BackfillStatus.COMPLETED)
+            logger.info("Backfilled %d activities for user %d in %.1fs", count, user_id, time.monotonic() - started)
+            return BackfillStatus.COMPLETED
+        except Exception:
+            logger.exception("Backfill failed for user %d", user_id)
+            db.rollback()
+            try:
+                self._set_status(db, user_id, BackfillStatus.FAILED)
+            except Exception:
+                # E.g. the database is down; the user stays IN_PROGRESS until the lease runs out.
+                logger.exception("Could not mark user %d FAILED", user_id)
+                db.rollback()
+            return BackfillStatus.FAILED
+        finally:
+            db.close()
+
+    def _set_status(self, db: Session, user_id: int, status: BackfillStatus) -> None:
+        db.query(User).filter(User.id == user_id).update(
+            {User.backfill_status: status, User.backfill_lease_expires_at: None}, synchronize_session=False
+        )
+        db.commit()
+
+    def _renew_lease(self, db: Session, user_id: int) -> None:
+        db.query(User).filter(User.id == user_id).update(
+            {User.backfill_lease_expires_at: func.now() + self.lease}, synchronize_session=False
+        )
+        db.commit()
+
+    def _access_token(self, db: Session, user_id: int) -> str:
+        strava_auth = db.query(StravaAuthorization).filter(StravaAuthorization.user_id == user_id).first()
+        if strava_auth is None:
+            raise BackfillError(f"User {user_id} has no Strava authorization")
+        return fresh_access_token(db, self.client, strava_auth)
+
+    def _import_history(self, db: Session, user_id: int) -> int:
+        access_token = self._access_token(db, user_id)
+        imported = 0
+        page = 1
+        while True:
+            summaries = self.client.list_activities(access_token, page=page, per_page=self.page_size)
+            if not summaries:
+                break
+
+            activities = [activity_row(summary) for summary in summaries]
+            runs = [summary for summary in summaries if is_run(summary)]
+            if self.best_effort_source == "streams":
+                efforts = stream_best_efforts(self.client, self.stream_store, access_token, runs)
+            else:
+                efforts = []
+                for summary in runs:
+                    efforts.extend(best_effort_rows(self.client.get_activity(access_token, summary["id"])))
+
+            ingest_activities(db, user_id, activities, efforts)
+            self._renew_lease(db, user_id)
+            imported += len(activities)
+            page += 1
+
+        return imported
@@ -0,0 +1,119 @@
+"""
+Best efforts computed from raw activity streams.
+
+Given an activity's cumulative distance and elapsed time streams, the best
+effort over D meters is the fastest window that covers D. For every
+starting sample i, ``searchsorted`` finds the first sample j where the
+distance since i reaches D. The finish time is interpolated between samples
+j-1 and j, so the result does not depend on the sampling rate. Each
+distance is one vectorized pass over every window with no per-sample Python
+loop, and the minimum per distance is the best effort.
+
+Batches of activities are concatenated into one array. Each activity's
+distances are offset so that no window can reach into the next activity.
+The per-activity minima come from ``np.minimum.reduceat``.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.models import PRDistance
+
+PR_DISTANCE_METERS: Dict[PRDistance, float] = {
+    PRDistance.METER_400: 400.0,
+    PRDistance.METER_800: 800.0,
+    PRDistance.KM_1: 1000.0,
+    PRDistance.MILE_1: 1609.344,
+    PRDistance.KM_5: 5000.0,
+    PRDistance.KM_10: 10000.0,
+    PRDistance.HALF_MARATHON: 21097.5,
+    PRDistance.MARATHON: 42195.0,
+}
+
+_DISTANCES = list(PR_DISTANCE_METERS)
+_TARGETS = np.array([PR_DISTANCE_METERS[d] for d in _DISTANCES])
+
+Stream = Tuple[Sequence[float], Sequence[float]]  # (cumulative meters, elapsed seconds)
+
+
+def _clean(distance: Sequence[float], time: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    distance = np.asarray(distance, dtype=np.float64)
+    time = np.asarray(time, dtype=np.float64)
+    if distance.shape != time.shape or distance.ndim != 1:
+        raise ValueError("distance and time streams must be 1-D and the same length")
+    # GPS noise can make cumulative distance dip slightly; windows assume it never decreases.
+    return np.maximum.accumulate(distance), time
+
+
+def batch_best_efforts(streams: Sequence[Stream]) -> List[Dict[PRDistance, int]]:
+    """
+    The best effort, in whole seconds, for every PRDistance each activity covers.
+
+    Returns one dict per input stream, in order. Distances an activity never
+    covers are left out, and so are streams with fewer than two samples.
+    """
+    results: List[Dict[PRDistance, int]] = [{} for _ in streams]
+    cleaned = [(index, *_clean(*stream)) for index, stream in enumerate(streams) if len(stream[0]) >= 2]
+    if not cleaned:
+        return results
+
+    lengths = np.array([len(distance) for _, distance, _ in cleaned])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # Each activity begins past the previous one's end by more than the longest
+    # target, so a window starting in one activity cannot finish in the next.
+    spans = np.array([distance[-1] - distance[0] for _, distance, _ in cleaned])
+    offsets = np.concatenate(([0.0], np.cumsum(spans + _TARGETS[-1] + 1.0)[:-1]))
+    distance = np.concatenate([d - d[0] + offset for (_, d, _), offset in zip(cleaned, offsets)])
+    time = np.concatenate([t for _, _, t in cleaned])
+    owner = np.repeat(np.arange(len(cleaned)), lengths)
+    n = len(distance)
+
+    best = np.full((len(_TARGETS), len(cleaned)), np.inf)
+    # One vectorized pass per target keeps memory at O(samples) for large batches.
+    for row, target in enumerate(_TARGETS):
+        # For each start sample, the first sample at least ``target`` meters on.
+        goal = distance + target
+        end = np.searchsorted(distance, goal, side="left")
+        valid = end < n
+        end = np.minimum(end, n - 1)
+        valid &= owner[end] == owner
+
+        # Interpolate the time at which the goal distance was crossed.
+        before = np.maximum(end - 1, 0)
+        d0, d1 = distance[before], distance[end]
+        t0, t1 = time[before], time[end]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(d1 > d0, (goal - d0) / (d1 - d0), 1.0)
+        elapsed = np.where(valid, t0 + fraction * (t1 - t0) - time, np.inf)
+        best[row] = np.minimum.reduceat(elapsed, starts)
+
+    for column, (index, _, _) in enumerate(cleaned):
+        for row, pr_distance in enumerate(_DISTANCES):
+            seconds = best[row, column]
+            if np.isfinite(seconds):
+                results[index][pr_distance] = int(round(seconds))
+    return results
+
+
+def best_efforts(distance: Sequence[float], time: Sequence[float]) -> Dict[PRDistance, int]:
+    """The best effort for every PRDistance a single activity covers."""
+    return batch_best_efforts([(distance, time)])[0]
+
+
+def stream_best_effort_rows(strava_activity_id: int, efforts: Dict[PRDistance, int]) -> List[Dict[str, Any]]:
+    """Map computed best efforts onto ActivityBestEffort column values, like ``best_effort_rows``."""
+    return [
+        {"strava_activity_id": strava_activity_id, "distance": distance, "elapsed_time_seconds": elapsed}
+        for distance, elapsed in efforts.items()
+    ]
+
+
+def parse_streams(payload: Any) -> Optional[Stream]:
+    """Pull the distance and time streams out of a Strava streams response, if present."""
+    if isinstance(payload, list):  # key_by_type=false
+        payload = {stream.get("type"): stream for stream in payload}
+    distance = (payload.get("distance") or {}).get("data")
+    time = (payload.get("time") or {}).get("data")
+    if not distance or not time or len(distance) != len(time):
+        return None
+    return distance, time
@@ -0,0 +1,117 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.crud.activity import (
+    bulk_upsert_activities, bulk_upsert_best_efforts, delete_activities, delete_other_best_efforts,
+)
+from app.crud.period_best_effort import apply_period_bests, rebuild_period_bests
+from app.crud.personal_record import apply_best_efforts, rebuild_personal_records
+from app.crud.training_rollup import apply_activity_changes, get_activity_totals
+from models.models import PRDistance
+
+# First key of the per-user advisory lock held while writing a user's
+# activities ("IN"). Rollup deltas read the stored rows before overwriting
+# them, so two writers for one user must not interleave.
+INGEST_LOCK_KEY = 0x494E
+
+
+@dataclass
+class IngestResult:
+    """What a single ingest call wrote."""
+    activity_ids: Dict[int, int] = field(default_factory=dict)  # strava_activity_id -> activities.id
+    best_efforts: int = 0
+    improved_records: List[Tuple[int, PRDistance]] = field(default_factory=list)  # (user_id, distance)
+
+
+def _lock_user(db: Session, user_id: int) -> None:
+    db.execute(select(func.pg_advisory_xact_lock(INGEST_LOCK_KEY, user_id)))
+
+
+def ingest_activities(db: Session, user_id: int, activities: Sequence[Dict[str, Any]],
+                      best_efforts: Sequence[Dict[str, Any]] = (),
+                      replace_best_efforts: bool = False) -> IngestResult:
+    """
+    Write a batch of a user's activities and their best efforts in one transaction.
+
+    ``activities`` are Activity column values keyed by ``strava_activity_id``;
+    ``best_efforts`` reference their activity by the same key. Training
+    rollups, personal records and the weekly/monthly/yearly bests are updated
+    incrementally from the batch. Safe to call again with the same data.
+
+    With ``replace_best_efforts``, ``best_efforts`` is the complete set for
+    the batch's activities, and stored efforts missing from it are deleted.
+    """
+    activities = list({row["strava_activity_id"]: row for row in activities}.values())
+    try:
+        _lock_user(db, user_id)
+        previous = get_activity_totals(db, user_id, (row["strava_activity_id"] for row in activities))
+        stored = bulk_upsert_activities(db, user_id, activities)
+        apply_activity_changes(db, user_id, removed=previous, added=activities)
+
+        activity_ids = {strava_id: activity.id for strava_id, activity in stored.items()}
+        written = bulk_upsert_best_efforts(db, user_id, best_efforts, stored)
+        removed = 0
+        if replace_best_efforts:
+            removed = delete_other_best_efforts(db, activity_ids.values(), (
+                (stored[row["strava_activity_id"]].id, row["distance"])
+                for row in best_efforts if row["strava_activity_id"] in stored
+            ))
+        improved = []
+        if written or removed:
+            improved = apply_best_efforts(db, activity_ids.values())
+            apply_period_bests(db, activity_ids.values())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return IngestResult(activity_ids=activity_ids, best_efforts=written, improved_records=improved)
+
+
+def remove_activities(db: Session, user_id: int, strava_activity_ids: Iterable[int]) -> int:
+    """
+    Delete some of a user's activities and correct everything derived from them.
+
+    Training rollups are adjusted by deltas. Records and period bests the
+    deleted activities may have held fall back to the next-best effort, which
+    needs this user's (and only this user's) history rescanned. Returns the
+    number of activities deleted.
+    """
+    strava_activity_ids = list(set(strava_activity_ids))
+    try:
+        _lock_user(db, user_id)
+        previous = get_activity_totals(db, user_id, strava_activity_ids)
+        deleted = delete_activities(db, user_id, strava_activity_ids)
+        if deleted:
+            apply_activity_changes(db, user_id, removed=previous, added=())
+            rebuild_personal_records(db, user_id)
+            rebuild_period_bests(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(deleted)
+
+
+def replace_best_efforts(db: Session, user_id: int, best_efforts: Sequence[Dict[str, Any]]) -> int:
+    """
+    Overwrite a user's best efforts with recomputed values and rebuild their records.
+
+    Unlike ``ingest_activities``, efforts may get slower (e.g. after fixing bad
+    stream data), so personal records and period bests are rebuilt from this
+    user's history instead of updated incrementally. Returns the number of
+    best efforts written.
+    """
+    try:
+        _lock_user(db, user_id)
+        written = bulk_upsert_best_efforts(db, user_id, best_efforts)
+        if written:
+            rebuild_personal_records(db, user_id)
+            rebuild_period_bests(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return written
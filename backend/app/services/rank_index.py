@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.response_cache import invalidate
+from models.models import LeaderboardSnapshot, PeriodBestEffort, PersonalRecord, PRDistance
+
+logger = logging.getLogger(__name__)
+
+# personal_records.updated_at is the writer's transaction start time, so a
+# long transaction can commit rows older than the last watermark. Re-reading a
+# short overlap on every sync catches them; upserts are idempotent.
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+class RankPosition(NamedTuple):
+    distance: PRDistance
+    rank: int
+    total: int
+    percentile: float
+    elapsed_time_seconds: int
+
+
+class DistanceRankIndex:
+    """
+    Sorted personal record times for one distance, answering rank by binary search.
+
+    ``_times`` and ``_users`` are parallel compact int arrays ordered by time;
+    ``_by_user`` maps each user to their current time so an update can find
+    and move their slot.
+    """
+
+    def __init__(self, distance: PRDistance):
+        self.distance = distance
+        self._times = array("i")
+        self._users = array("i")
+        self._by_user: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def load(self, records: Iterable[Tuple[int, int]]) -> Set[int]:
+        """Replace the contents with (user_id, elapsed_time_seconds) pairs. Returns the users dropped."""
+        ordered = sorted(records, key=lambda record: record[1])
+        times = array("i", (elapsed for _, elapsed in ordered))
+        users = array("i", (user_id for user_id, _ in ordered))
+        by_user = {user_id: elapsed for user_id, elapsed in ordered}
+        with self._lock:
+            dropped = self._by_user.keys() - by_user.keys()
+            self._times, self._users, self._by_user = times, users, by_user
+        return dropped
+
+    def _remove_slot(self, user_id: int, elapsed: int) -> None:
+        index = bisect_left(self._times, elapsed)
+        while self._users[index] != user_id:
+            index += 1
+        del self._times[index]
+        del self._users[index]
+
+    def upsert(self, user_id: int, elapsed: int) -> bool:
+        """Set a user's time. Returns whether anything changed."""
+        with self._lock:
+            current = self._by_user.get(user_id)
+            if current == elapsed:
+                return False
+            if current is not None:
+                self._remove_slot(user_id, current)
+            index = bisect_right(self._times, elapsed)
+            self._times.insert(index, elapsed)
+            self._users.insert(index, user_id)
+            self._by_user[user_id] = elapsed
+            return True
+
+    def remove(self, user_id: int) -> bool:
+        """Drop a user from the index. Returns whether they were present."""
+        with self._lock:
+            current = self._by_user.pop(user_id, None)
+            if current is None:
+                return False
+            self._remove_slot(user_id, current)
+            return True
+
+    def position(self, user_id: int) -> Optional[RankPosition]:
+        """A user's competition rank (ties share a rank) and percentile."""
+        with self._lock:
+            elapsed = self._by_user.get(user_id)
+            if elapsed is None:
+                return None
+            total = len(self._times)
+            faster = bisect_left(self._times, elapsed)
+        return RankPosition(
+            distance=self.distance,
+            rank=faster + 1,
+            total=total,
+            # Share of athletes this user is at least as fast as.
+            percentile=round(100.0 * (total - faster) / total, 2),
+            elapsed_time_seconds=elapsed,
+        )
+
+
+class RankIndex:
+    """
+    In-process rank index for every PRDistance.
+
+    Built in bulk from personal_records at startup, then patched from rows
+    whose ``updated_at`` moved past the last sync watermark. Deleted records
+    leave no row behind, so each sync also checks the users it saw against
+    the records they still hold, and reloads any distance whose record count
+    no longer matches. ``version`` bumps whenever the contents change.
+    """
+
+    def __init__(self):
+        self.distances = {distance: DistanceRankIndex(distance) for distance in PRDistance}
+        self.version = 0
+        self.loaded = False
+        self._watermark: Optional[datetime] = None
+        self._rebuilt_at = 0.0
+        # What the cached leaderboard pages were last checked against.
+        self._snapshots: Optional[Dict[PRDistance, datetime]] = None
+        self._period_watermark: Optional[datetime] = None
+
+    def rebuild(self, db) -> None:
+        """Reload every distance from personal_records."""
+        watermark = None
+        by_distance: Dict[PRDistance, List[Tuple[int, int]]] = {distance: [] for distance in PRDistance}
+        rows = db.query(
+            PersonalRecord.distance, PersonalRecord.user_id, PersonalRecord.elapsed_time_seconds, PersonalRecord.updated_at
+        ).yield_per(10000)
+        for distance, user_id, elapsed, updated_at in rows:
+            by_distance[distance].append((user_id, elapsed))
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+
+        for distance, records in by_distance.items():
+            self.distances[distance].load(records)
+        self._watermark = watermark
+        self._rebuilt_at = time.monotonic()
+        self.loaded = True
+        self.version += 1
+
+    def sync(self, db) -> int:
+        """Apply personal records changed since the last sync. Returns the number applied."""
+        if not self.loaded or self._watermark is None:
+            self.rebuild(db)
+            return 0
+
+        changed = 0
+        watermark = self._watermark
+        seen_users, updated_users = set(), set()
+        rows = db.query(
+            PersonalRecord.distance, PersonalRecord.user_id, PersonalRecord.elapsed_time_seconds, PersonalRecord.updated_at
+        ).filter(PersonalRecord.updated_at > self._watermark - SYNC_OVERLAP)
+        for distance, user_id, elapsed, updated_at in rows:
+            changed += self.distances[distance].upsert(user_id, elapsed)
+            seen_users.add(user_id)
+            if updated_at > self._watermark:
+                updated_users.add(user_id)
+            if updated_at > watermark:
+                watermark = updated_at
+
+        # Recomputing a user's records rewrites the ones they keep, so the
+        # distances they lost are the ones missing among their rows now.
+        if seen_users:
+            held = set(db.query(PersonalRecord.user_id, PersonalRecord.distance)
+                       .filter(PersonalRecord.user_id.in_(seen_users)))
+            for distance, index in self.distances.items():
+                for user_id in seen_users:
+                    if (user_id, distance) not in held and index.remove(user_id):
+                        changed += 1
+                        updated_users.add(user_id)
+        # A user who lost every record has no rows left at all; the counts show it.
+        counts = dict(db.query(PersonalRecord.distance, func.count()).group_by(PersonalRecord.distance))
+        for distance, index in self.distances.items():
+            if counts.get(distance, 0) != len(index):
+                dropped = index.load(
+                    db.query(PersonalRecord.user_id, PersonalRecord.elapsed_time_seconds)
+                    .filter(PersonalRecord.distance == distance)
+                )
+                changed += 1
+                updated_users |= dropped
+
+        self._watermark = watermark
+        if changed:
+            self.version += 1
+        # This is where this worker learns of record changes made by any process.
+        if updated_users:
+            invalidate(*(f"records:{user_id}" for user_id in updated_users))
+        return changed
+
+    def positions(self, user_id: int) -> List[RankPosition]:
+        """A user's rank for every distance they have a record at."""
+        return [
+            position
+            for position in (index.position(user_id) for index in self.distances.values())
+            if position is not None
+        ]
+
+    def invalidate_boards(self, db) -> None:
+        """
+        Drop cached leaderboard pages whose data changed since the last check.
+
+        All-time boards change when their snapshot is refreshed, period boards
+        when a period best is written; either may happen in any process. The
+        first call only records where things stand.
+        """
+        snapshots = dict(db.query(LeaderboardSnapshot.distance, LeaderboardSnapshot.refreshed_at))
+        period_latest = dict(
+            db.query(PeriodBestEffort.distance, func.max(PeriodBestEffort.updated_at))
+            .filter(PeriodBestEffort.updated_at > self._period_watermark)
+            .group_by(PeriodBestEffort.distance)
+        ) if self._period_watermark is not None else {}
+        if self._snapshots is None:
+            self._period_watermark = db.query(func.max(PeriodBestEffort.updated_at)).scalar() or datetime.min
+        else:
+            refreshed = {d for d, refreshed_at in snapshots.items() if self._snapshots.get(d) != refreshed_at}
+            changed = refreshed | set(period_latest)
+            if changed:
+                invalidate(*(f"leaderboard:{distance.name}" for distance in changed))
+            if refreshed:
+                invalidate("leaderboards")
+            if period_latest:
+                self._period_watermark = max(period_latest.values())
+        self._snapshots = snapshots
+
+    def _refresh(self) -> None:
+        db = SessionLocal()
+        try:
+            # A periodic rebuild backstops anything the syncs missed.
+            if time.monotonic() - self._rebuilt_at > settings.rank_index_rebuild_interval_seconds:
+                self.rebuild(db)
+            else:
+                self.sync(db)
+            self.invalidate_boards(db)
+        finally:
+            db.close()
+
+    async def keep_fresh(self) -> None:
+        """Build the index, then keep syncing it until cancelled."""
+        while True:
+            try:
+                await run_in_threadpool(self._refresh)
+            except Exception:
+                logger.exception("Rank index refresh failed")
+            await asyncio.sleep(settings.rank_index_sync_interval_seconds)
+
+
+rank_index = RankIndex()
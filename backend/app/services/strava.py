@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core import http
+from app.core.config import settings
+from app.services.strava_rate_limit import Priority, RateLimiter, RateLimitExceeded, get_rate_limiter
+from models.models import PRDistance
+
+logger = logging.getLogger(__name__)
+
+# Strava's best effort names mapped onto the distances we keep records for.
+# Strava does not score an 800m effort (its nearest is "1/2 mile"), so
+# PRDistance.METER_800 never comes from this mapping.
+STRAVA_BEST_EFFORT_NAMES = {
+    "400m": PRDistance.METER_400,
+    "1k": PRDistance.KM_1,
+    "1 mile": PRDistance.MILE_1,
+    "5k": PRDistance.KM_5,
+    "10k": PRDistance.KM_10,
+    "Half-Marathon": PRDistance.HALF_MARATHON,
+    "Marathon": PRDistance.MARATHON,
+}
+
+# Only runs carry best efforts, so only these need the detail fetch.
+RUN_SPORT_TYPES = {"Run", "TrailRun", "VirtualRun"}
+
+
+class StravaAPIError(Exception):
+    """Raised when the Strava API returns an unexpected response."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Strava API error {status_code}: {message}")
+        self.status_code = status_code
+
+
+class StravaClient:
+    """
+    Minimal Strava API v3 client shared by the backfill and webhook workers.
+
+    Requests go through the pooled Strava HTTP client, which retries transport
+    failures and server errors. Every request first takes quota from the
+    shared rate limiter at the client's priority, and reports the
+    X-RateLimit-* headers of the response back to it.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, token_url: Optional[str] = None,
+                 max_rate_limit_waits: int = 3, priority: Priority = Priority.INTERACTIVE,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.base_url = (base_url or settings.strava_api_base_url).rstrip("/")
+        self.token_url = token_url or settings.strava_oauth_token_url
+        self.max_rate_limit_waits = max_rate_limit_waits
+        self.priority = priority
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+    def _request(self, method: str, url: str, **kwargs) -> Any:
+        for _ in range(self.max_rate_limit_waits + 1):
+            try:
+                self.rate_limiter.acquire(self.priority)
+            except RateLimitExceeded as e:
+                raise StravaAPIError(429, str(e)) from e
+            try:
+                # 429s are handled here through the rate limiter, not by backoff.
+                response = http.request_sync(
+                    http.STRAVA, method, url, retry_statuses=http.SERVER_ERROR_STATUSES, **kwargs
+                )
+            except httpx.HTTPError as e:
+                raise StravaAPIError(0, str(e)) from e
+
+            rate_limited = response.status_code == 429
+            self.rate_limiter.observe(response.headers, rate_limited)
+            if rate_limited:
+                continue
+            if response.status_code >= 400:
+                raise StravaAPIError(response.status_code, response.text)
+            return response.json()
+
+        raise StravaAPIError(429, "Rate limit retries exhausted")
+
+    def get(self, path: str, access_token: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET an API path on behalf of an athlete."""
+        return self._request(
+            "GET",
+            f"{self.base_url}{path}",
+            params=params,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+    def list_activities(self, access_token: str, page: int, per_page: int) -> List[Dict[str, Any]]:
+        """Get one page of the athlete's activity summaries, newest first."""
+        return self.get("/athlete/activities", access_token, params={"page": page, "per_page": per_page})
+
+    def get_activity(self, access_token: str, activity_id: int) -> Dict[str, Any]:
+        """Get the detailed representation of an activity, including best efforts."""
+        return self.get(f"/activities/{activity_id}", access_token)
+
+    def get_activity_streams(self, access_token: str, activity_id: int,
+                             keys: Sequence[str] = ("distance", "time")) -> Dict[str, Any]:
+        """Get an activity's raw streams, keyed by stream type."""
+        return self.get(
+            f"/activities/{activity_id}/streams",
+            access_token,
+            params={"keys": ",".join(keys), "key_by_type": "true"},
+        )
+
+    def refresh_access_token(self, refresh_token: str) -> Dict[str, Any]:
+        """Exchange a refresh token for a new access token."""
+        return self._request(
+            "POST",
+            self.token_url,
+            data={
+                "client_id": settings.strava_client_id,
+                "client_secret": settings.strava_client_secret,
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+            },
+        )
+
+
+def parse_strava_datetime(value: str) -> datetime:
+    """Parse Strava's ISO-8601 UTC timestamps into naive UTC datetimes."""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
+
+def activity_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Strava activity payload onto Activity column values."""
+    return {
+        "strava_activity_id": data["id"],
+        "name": (data.get("name") or "")[:255] or None,
+        "total_distance_meters": data.get("distance"),
+        "moving_time_seconds": data.get("moving_time"),
+        "total_elevation_gain_meters": data.get("total_elevation_gain"),
+        "activity_start_date": parse_strava_datetime(data["start_date"]),
+    }
+
+
+def best_effort_rows(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Map a detailed activity's best efforts onto ActivityBestEffort column values."""
+    fastest: Dict[PRDistance, int] = {}
+    for effort in data.get("best_efforts") or []:
+        distance = STRAVA_BEST_EFFORT_NAMES.get(effort.get("name"))
+        elapsed = effort.get("elapsed_time")
+        if distance is None or elapsed is None:
+            continue
+        if distance not in fastest or elapsed < fastest[distance]:
+            fastest[distance] = elapsed
+
+    return [
+        {
+            "strava_activity_id": data["id"],
+            "distance": distance,
+            "elapsed_time_seconds": elapsed,
+        }
+        for distance, elapsed in fastest.items()
+    ]
+
+
+def is_run(data: Dict[str, Any]) -> bool:
+    """Whether an activity summary is a run (and so has best efforts)."""
+    return (data.get("sport_type") or data.get("type")) in RUN_SPORT_TYPES
@@ -0,0 +1,160 @@
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.strava_event import claim_events, complete_events, retry_events
+from app.crud.user import UserLoader
+from app.services.backfill import fresh_access_token, stream_best_efforts
+from app.services.ingest import ingest_activities, remove_activities
+from app.services.stream_store import StreamStore
+from app.services.strava import StravaAPIError, StravaClient, activity_row, best_effort_rows, is_run
+from app.services.strava_rate_limit import Priority
+from models.models import StravaAuthorization
+
+logger = logging.getLogger(__name__)
+
+# Longest wait before a failed event is retried.
+MAX_RETRY_BACKOFF = timedelta(hours=1)
+
+
+def _retry_backoff(attempts: int) -> timedelta:
+    return min(timedelta(seconds=30 * 2 ** (attempts - 1)), MAX_RETRY_BACKOFF)
+
+
+class StravaEventWorker:
+    """
+    Applies queued Strava webhook events.
+
+    Each pass leases a batch of due events (see ``app.crud.strava_event``),
+    groups them by athlete and handles each athlete's events on a pool of
+    worker threads: deleted activities are removed, created and updated ones
+    are fetched once each and ingested together. Events are only removed
+    from the queue after their changes are committed, so a crashed worker's
+    lease expires and another worker redoes the (idempotent) work.
+    """
+
+    def __init__(self, client: Optional[StravaClient] = None, workers: Optional[int] = None,
+                 batch_size: Optional[int] = None, session_factory: sessionmaker = SessionLocal,
+                 best_effort_source: Optional[str] = None, stream_store: Optional[StreamStore] = None):
+        self.client = client or StravaClient(priority=Priority.WEBHOOK)
+        self.workers = workers or settings.strava_event_workers
+        self.batch_size = batch_size or settings.strava_event_batch_size
+        self.session_factory = session_factory
+        self.best_effort_source = best_effort_source or settings.backfill_best_effort_source
+        if self.best_effort_source not in ("strava", "streams"):
+            raise ValueError(f"Unknown best effort source: {self.best_effort_source!r}")
+        self.stream_store = stream_store or StreamStore()
+        self.lease = timedelta(seconds=settings.strava_event_lease_seconds)
+
+    def run(self, stop_when_idle: bool = True, poll_interval: Optional[float] = None) -> int:
+        """
+        Drain the queue; returns the number of events handled.
+
+        Events still inside their coalescing delay are not due yet, so with
+        ``stop_when_idle`` this can return while some are pending. With
+        ``stop_when_idle=False`` this polls the queue forever.
+        """
+        poll_interval = poll_interval if poll_interval is not None else settings.strava_event_poll_interval_seconds
+        handled = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="strava-events") as pool:
+            while True:
+                db = self.session_factory()
+                try:
+                    events = claim_events(db, self.batch_size, self.lease)
+                    if events:
+                        by_owner: Dict[int, List[Any]] = defaultdict(list)
+                        for event in events:
+                            by_owner[event.owner_id].append(event)
+                        users = UserLoader(db).get_many_by_strava_id(by_owner)
+                        user_ids = {owner_id: user.id if user else None for owner_id, user in zip(by_owner, users)}
+                        db.rollback()
+                finally:
+                    db.close()
+
+                if not events:
+                    if stop_when_idle:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                jobs = [pool.submit(self.handle_athlete, owner_id, user_ids[owner_id], owner_events)
+                        for owner_id, owner_events in by_owner.items()]
+                handled += sum(job.result() for job in jobs)
+        return handled
+
+    def handle_athlete(self, owner_id: int, user_id: Optional[int], events: Sequence) -> int:
+        """Apply one athlete's leased events; returns how many were handled (or dropped)."""
+        db = self.session_factory()
+        try:
+            if user_id is None:
+                logger.info("Dropping %d events for unknown athlete %d", len(events), owner_id)
+            else:
+                self._apply(db, owner_id, user_id, events)
+            complete_events(db, events)
+            return len(events)
+        except Exception as e:
+            logger.exception("Strava events failed for athlete %d", owner_id)
+            db.rollback()
+            retry, give_up = [], []
+            for event in events:
+                (give_up if event.attempts >= settings.strava_event_max_attempts else retry).append(event)
+            if give_up:
+                logger.error("Giving up on %d events for athlete %d", len(give_up), owner_id)
+                complete_events(db, give_up)
+            if retry:
+                retry_events(db, retry, str(e), _retry_backoff(max(event.attempts for event in retry)))
+            return len(give_up)
+        finally:
+            db.close()
+
+    def _apply(self, db: Session, owner_id: int, user_id: int, events: Sequence) -> None:
+        strava_auth = db.query(StravaAuthorization).filter(StravaAuthorization.user_id == user_id).first()
+        for event in events:
+            if event.object_type == "athlete" and (event.updates or {}).get("authorized") == "false":
+                # The athlete revoked our access: forget the tokens, keep the imported history.
+                if strava_auth is not None:
+                    db.delete(strava_auth)
+                    db.commit()
+                    strava_auth = None
+                logger.info("Athlete %d deauthorized the app", owner_id)
+
+        # Deletes need no Strava call, so they are applied whether or not we still have tokens.
+        deleted = {e.object_id for e in events if e.object_type == "activity" and e.aspect_type == "delete"}
+        if deleted:
+            remove_activities(db, user_id, deleted)
+
+        changed = [e.object_id for e in events if e.object_type == "activity" and e.aspect_type != "delete"]
+        if not changed:
+            return
+        if strava_auth is None:
+            logger.info("Dropping %d activity changes for athlete %d without tokens", len(changed), owner_id)
+            return
+        access_token = fresh_access_token(db, self.client, strava_auth)
+        details, gone = [], set()
+        for activity_id in changed:
+            try:
+                details.append(self.client.get_activity(access_token, activity_id))
+            except StravaAPIError as e:
+                if e.status_code != 404:
+                    raise
+                # Deleted (or made private) since the event was sent.
+                gone.add(activity_id)
+
+        if details:
+            runs = [detail for detail in details if is_run(detail)]
+            if self.best_effort_source == "streams":
+                efforts = stream_best_efforts(self.client, self.stream_store, access_token, runs)
+            else:
+                efforts = [row for detail in runs for row in best_effort_rows(detail)]
+            # Details carry every effort the activities have now, so efforts they lost are removed.
+            ingest_activities(db, user_id, [activity_row(detail) for detail in details], efforts,
+                              replace_best_efforts=True)
+        if gone:
+            remove_activities(db, user_id, gone)
@@ -0,0 +1,349 @@
+"""
+Strava API quota shared by every process that calls Strava.
+
+Strava counts an application's requests in a short window (15 minutes,
+reset on the quarter hour) and a daily one (reset at midnight UTC), and
+reports the limits and usage of both as "short,daily" in the
+X-RateLimit-Limit and X-RateLimit-Usage headers. Each call first takes one
+request from the shared count; after the response, the count is raised to
+whatever Strava reports, so requests made elsewhere are accounted for too.
+
+Calls have a priority, and each priority may only use a share of either
+window. When quota runs low, backfill is held back first while webhook and
+interactive calls still get through. Held-back callers sleep until the window
+in which they fit opens, instead of sending requests that would get 429s.
+
+The window counts are what Strava enforces, so they decide whether a call
+can be made at all; on their own they would let a window's whole quota go
+out at the end of one window and again at the start of the next. Calls
+therefore also take a token from a bucket refilled at the short limit's
+average rate and holding ``burst_seconds`` of it, and a priority may only
+take a token while the bucket holds more than the reserve the higher
+priorities are owed (the same share as for the windows). Windows are
+aligned to the epoch like Strava's, so their length must divide an hour.
+
+``memory`` keeps the count in-process and only works with a single process;
+``postgres`` shares it through one strava_rate_limits row, taken with a
+single conditional UPDATE per call.
+"""
+import enum
+import logging
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Float, case, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import STRAVA_QUOTA_WAITS
+from models.models import StravaRateLimit
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 3600
+
+
+class Priority(enum.IntEnum):
+    """Who a Strava call is for; lower values are served first when quota is short."""
+    INTERACTIVE = 0  # A user is waiting on the response.
+    WEBHOOK = 1      # Keeping data fresh after push events.
+    BACKFILL = 2     # Historical imports.
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot get quota within its priority's maximum wait."""
+
+
+class Quota(NamedTuple):
+    short_limit: int
+    short_usage: int
+    short_window_start: int
+    daily_limit: int
+    daily_usage: int
+    daily_window_start: int
+    bucket_tokens: float
+    bucket_updated_at: float
+
+    def rolled(self, short_start: int, daily_start: int) -> "Quota":
+        """This quota with the usage of windows that have ended reset."""
+        return self._replace(
+            short_usage=self.short_usage if self.short_window_start == short_start else 0,
+            short_window_start=short_start,
+            daily_usage=self.daily_usage if self.daily_window_start == daily_start else 0,
+            daily_window_start=daily_start,
+        )
+
+    def refilled(self, now: float, window_seconds: int, burst_seconds: float) -> "Quota":
+        """This quota with the bucket topped up for the time since it was last refilled."""
+        rate = self.short_limit / window_seconds
+        return self._replace(
+            bucket_tokens=min(bucket_capacity(self.short_limit, window_seconds, burst_seconds),
+                              self.bucket_tokens + max(now - self.bucket_updated_at, 0.0) * rate),
+            bucket_updated_at=max(now, self.bucket_updated_at),
+        )
+
+    def wait(self, share: float, now: float, window_seconds: int, burst_seconds: float) -> float:
+        """
+        Seconds until one more request fits in ``share`` of both windows and
+        the bucket; 0 if it fits now. Expects a rolled and refilled quota.
+        """
+        if self.daily_usage + 1 > self.daily_limit * share:
+            return self.daily_window_start + DAY_SECONDS - now
+        if self.short_usage + 1 > self.short_limit * share:
+            return self.short_window_start + window_seconds - now
+        needed = bucket_needed(bucket_capacity(self.short_limit, window_seconds, burst_seconds), share)
+        if self.bucket_tokens < needed:
+            return (needed - self.bucket_tokens) * window_seconds / self.short_limit
+        return 0.0
+
+
+def bucket_capacity(short_limit: int, window_seconds: int, burst_seconds: float) -> float:
+    """Tokens the bucket holds when full: ``burst_seconds`` of the short limit's average rate."""
+    return max(short_limit * burst_seconds / window_seconds, 1.0)
+
+
+def bucket_needed(capacity, share: float):
+    """Tokens the bucket must hold for a ``share`` priority to take one, leaving the reserve of the rest."""
+    return 1 + (capacity - 1) * (1 - share)
+
+
+def parse_rate_limit_headers(headers) -> Optional[Tuple[int, int, int, int]]:
+    """(short limit, daily limit, short usage, daily usage) from Strava's headers, or None."""
+    limit, usage = headers.get("X-RateLimit-Limit"), headers.get("X-RateLimit-Usage")
+    if not limit or not usage:
+        return None
+    try:
+        short_limit, daily_limit = (int(part) for part in limit.split(","))
+        short_usage, daily_usage = (int(part) for part in usage.split(","))
+    except ValueError:
+        return None
+    return short_limit, daily_limit, short_usage, daily_usage
+
+
+class RateLimiter:
+    """Interface for the shared Strava quota."""
+
+    def __init__(self, window_seconds: int, shares: Dict[Priority, float], max_waits: Dict[Priority, float],
+                 burst_seconds: float):
+        if 3600 % window_seconds:
+            raise ValueError(f"Short window of {window_seconds}s does not divide an hour")
+        self.window_seconds = window_seconds
+        self.burst_seconds = burst_seconds
+        self.shares = shares
+        self.max_waits = max_waits
+        # Spreads the processes that all wake up when a window opens.
+        self.jitter_seconds = min(5.0, window_seconds / 20)
+
+    def _windows(self, now: float) -> Tuple[int, int]:
+        return int(now // self.window_seconds * self.window_seconds), int(now // DAY_SECONDS * DAY_SECONDS)
+
+    def _current(self, quota: Quota, now: float) -> Quota:
+        return quota.rolled(*self._windows(now)).refilled(now, self.window_seconds, self.burst_seconds)
+
+    def try_acquire(self, priority: Priority) -> float:
+        """Take one request if ``priority`` may make it now; else the seconds until it might."""
+        raise NotImplementedError
+
+    def observe(self, headers, rate_limited: bool = False) -> None:
+        """Correct the count from a response's headers; a 429 marks the short window spent."""
+        raise NotImplementedError
+
+    def acquire(self, priority: Priority) -> None:
+        """Block until ``priority`` may make one request; RateLimitExceeded after its maximum wait."""
+        max_wait = self.max_waits.get(priority)
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(priority)
+            if not wait:
+                return
+            STRAVA_QUOTA_WAITS.inc((priority.name.lower(),))
+            if max_wait is not None and waited + wait > max_wait:
+                raise RateLimitExceeded(f"No Strava quota for {priority.name.lower()} calls for {wait:.0f}s")
+            delay = wait + random.uniform(0, self.jitter_seconds)
+            logger.info("Strava quota spent for %s calls, pausing %.0fs", priority.name.lower(), delay)
+            time.sleep(delay)
+            waited += delay
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Quota counted in this process only."""
+
+    def __init__(self, short_limit: int, daily_limit: int, **kwargs):
+        super().__init__(**kwargs)
+        self._quota = Quota(short_limit, 0, 0, daily_limit, 0, 0, 0.0, 0.0)
+        self._lock = threading.Lock()
+
+    def quota(self) -> Quota:
+        with self._lock:
+            return self._current(self._quota, time.time())
+
+    def try_acquire(self, priority: Priority) -> float:
+        now = time.time()
+        with self._lock:
+            quota = self._current(self._quota, now)
+            wait = quota.wait(self.shares[priority], now, self.window_seconds, self.burst_seconds)
+            if not wait:
+                quota = quota._replace(short_usage=quota.short_usage + 1, daily_usage=quota.daily_usage + 1,
+                                       bucket_tokens=quota.bucket_tokens - 1)
+            self._quota = quota
+        return wait
+
+    def observe(self, headers, rate_limited: bool = False) -> None:
+        reported = parse_rate_limit_headers(headers)
+        if reported is None and not rate_limited:
+            return
+        with self._lock:
+            quota = self._quota.rolled(*self._windows(time.time()))
+            if reported is not None:
+                short_limit, daily_limit, short_usage, daily_usage = reported
+                quota = quota._replace(
+                    short_limit=short_limit,
+                    short_usage=max(quota.short_usage, short_usage),
+                    daily_limit=daily_limit,
+                    daily_usage=max(quota.daily_usage, daily_usage),
+                )
+            if rate_limited and quota.short_usage < quota.short_limit and quota.daily_usage < quota.daily_limit:
+                quota = quota._replace(short_usage=quota.short_limit)
+            self._quota = quota
+
+
+class PostgresRateLimiter(RateLimiter):
+    """
+    Quota shared by all processes through one ``strava_rate_limits`` row.
+
+    Taking a request is one autocommitted UPDATE that only matches while the
+    priority's share is not used up, so concurrent callers never overshoot;
+    the row lock is held for that statement alone.
+    """
+
+    def __init__(self, engine: Engine, client_id: str, short_limit: int, daily_limit: int, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = engine
+        self.client_id = client_id
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self._row_created = False
+
+    def _ensure_row(self, conn) -> None:
+        if self._row_created:
+            return
+        conn.execute(pg_insert(StravaRateLimit).values(
+            client_id=self.client_id,
+            short_limit=self.short_limit,
+            short_usage=0,
+            short_window_start=0,
+            daily_limit=self.daily_limit,
+            daily_usage=0,
+            daily_window_start=0,
+            bucket_tokens=0.0,
+            bucket_updated_at=0.0,
+        ).on_conflict_do_nothing())
+        self._row_created = True
+
+    def _usage(self, short_start: int, daily_start: int):
+        # The stored usage, or 0 for a window that has ended.
+        return (
+            case((StravaRateLimit.short_window_start == short_start, StravaRateLimit.short_usage), else_=0),
+            case((StravaRateLimit.daily_window_start == daily_start, StravaRateLimit.daily_usage), else_=0),
+        )
+
+    def _bucket(self, now: float):
+        # The bucket's capacity and its tokens refilled up to ``now``; mirrors Quota.refilled.
+        rate = StravaRateLimit.short_limit * (1.0 / self.window_seconds)
+        capacity = func.greatest(rate * self.burst_seconds, 1.0)
+        elapsed = func.greatest(literal(now, Float) - StravaRateLimit.bucket_updated_at, 0.0)
+        return capacity, func.least(capacity, StravaRateLimit.bucket_tokens + elapsed * rate)
+
+    def quota(self) -> Quota:
+        now = time.time()
+        with self.engine.begin() as conn:
+            self._ensure_row(conn)
+            row = conn.execute(
+                select(*(getattr(StravaRateLimit, name) for name in Quota._fields))
+                .where(StravaRateLimit.client_id == self.client_id)
+            ).one()
+        return self._current(Quota(*row), now)
+
+    def try_acquire(self, priority: Priority) -> float:
+        now = time.time()
+        short_start, daily_start = self._windows(now)
+        short_usage, daily_usage = self._usage(short_start, daily_start)
+        capacity, tokens = self._bucket(now)
+        share = self.shares[priority]
+        with self.engine.begin() as conn:
+            self._ensure_row(conn)
+            taken = conn.execute(
+                update(StravaRateLimit)
+                .where(
+                    StravaRateLimit.client_id == self.client_id,
+                    short_usage + 1 <= StravaRateLimit.short_limit * share,
+                    daily_usage + 1 <= StravaRateLimit.daily_limit * share,
+                    tokens >= bucket_needed(capacity, share),
+                )
+                .values(
+                    short_usage=short_usage + 1,
+                    short_window_start=short_start,
+                    daily_usage=daily_usage + 1,
+                    daily_window_start=daily_start,
+                    bucket_tokens=tokens - 1,
+                    bucket_updated_at=func.greatest(StravaRateLimit.bucket_updated_at, now),
+                )
+                .returning(StravaRateLimit.short_usage)
+            ).first()
+        if taken is not None:
+            return 0.0
+        return self.quota().wait(share, now, self.window_seconds, self.burst_seconds)
+
+    def observe(self, headers, rate_limited: bool = False) -> None:
+        reported = parse_rate_limit_headers(headers)
+        if reported is None and not rate_limited:
+            return
+        short_start, daily_start = self._windows(time.time())
+        short_usage, daily_usage = self._usage(short_start, daily_start)
+        if reported is not None:
+            short_limit, daily_limit, reported_short, reported_daily = reported
+            if rate_limited and reported_short < short_limit and reported_daily < daily_limit:
+                reported_short = short_limit
+            values = dict(
+                short_limit=short_limit,
+                short_usage=func.greatest(short_usage, reported_short),
+                daily_limit=daily_limit,
+                daily_usage=func.greatest(daily_usage, reported_daily),
+            )
+        else:
+            values = dict(short_usage=func.greatest(short_usage, StravaRateLimit.short_limit), daily_usage=daily_usage)
+        with self.engine.begin() as conn:
+            self._ensure_row(conn)
+            conn.execute(
+                update(StravaRateLimit)
+                .where(StravaRateLimit.client_id == self.client_id)
+                .values(short_window_start=short_start, daily_window_start=daily_start, **values)
+            )
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter() -> RateLimiter:
+    """The process-wide limiter selected by ``strava_rate_limit_backend``."""
+    options = dict(
+        window_seconds=settings.strava_rate_limit_window_seconds,
+        shares={
+            Priority.INTERACTIVE: 1.0,
+            Priority.WEBHOOK: settings.strava_webhook_quota_share,
+            Priority.BACKFILL: settings.strava_backfill_quota_share,
+        },
+        max_waits={Priority.INTERACTIVE: settings.strava_interactive_max_wait_seconds},
+        burst_seconds=settings.strava_rate_limit_burst_seconds,
+        short_limit=settings.strava_short_limit,
+        daily_limit=settings.strava_daily_limit,
+    )
+    if settings.strava_rate_limit_backend == "postgres":
+        from app.core.database import engine
+
+        return PostgresRateLimiter(engine, settings.strava_client_id or "default", **options)
+    if settings.strava_rate_limit_backend == "memory":
+        return MemoryRateLimiter(**options)
+    raise ValueError(f"Unknown STRAVA_RATE_LIMIT_BACKEND: {settings.strava_rate_limit_backend!r}")
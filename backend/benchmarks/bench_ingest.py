@@ -0,0 +1,148 @@
+"""
+Compare activity/best-effort ingest throughput: per-object ORM vs bulk upsert.
+
+Runs against the database in DATABASE_URL, using a throwaway user that is
+removed afterwards. The ORM path mirrors the existing ``db.add()`` +
+``commit()`` per object style; it is slow, so it runs on a smaller sample.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ingest [--activities 3000] [--orm-activities 300]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.services.ingest import ingest_activities  # noqa: E402
+from models.models import (  # noqa: E402
+    Activity, ActivityBestEffort, PeriodBestEffort, PersonalRecord, PRDistance, TrainingRollup, User,
+)
+
+EFFORTS_PER_ACTIVITY = 8
+
+
+def synthetic_rows(count: int, seed: int):
+    rng = random.Random(seed)
+    base_id = rng.randrange(10 ** 9, 10 ** 10)
+    start = datetime(2025, 7, 1)
+    activities, efforts = [], []
+    for i in range(count):
+        strava_id = base_id + i
+        activities.append({
+            "strava_activity_id": strava_id,
+            "name": f"Run {i}",
+            "total_distance_meters": rng.uniform(3000, 42195),
+            "moving_time_seconds": rng.randint(900, 14400),
+            "total_elevation_gain_meters": rng.uniform(0, 400),
+            "activity_start_date": start - timedelta(hours=i * 20),
+        })
+        for distance in list(PRDistance)[:EFFORTS_PER_ACTIVITY]:
+            efforts.append({
+                "strava_activity_id": strava_id,
+                "distance": distance,
+                "elapsed_time_seconds": rng.randint(60, 20000),
+            })
+    return activities, efforts
+
+
+def create_bench_user(db) -> int:
+    user = User(x_user_id=f"bench-{uuid.uuid4().hex[:16]}", x_username="bench")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def delete_bench_user(db, user_id: int) -> None:
+    db.query(TrainingRollup).filter(TrainingRollup.user_id == user_id).delete()
+    db.query(PeriodBestEffort).filter(PeriodBestEffort.user_id == user_id).delete()
+    db.query(PersonalRecord).filter(PersonalRecord.user_id == user_id).delete()
+    db.query(ActivityBestEffort).filter(ActivityBestEffort.user_id == user_id).delete()
+    db.query(Activity).filter(Activity.user_id == user_id).delete()
+    db.query(User).filter(User.id == user_id).delete()
+    db.commit()
+
+
+def run_orm(db, user_id: int, activities, efforts) -> float:
+    started = time.perf_counter()
+    stored = {}
+    for row in activities:
+        activity = Activity(user_id=user_id, **row)
+        db.add(activity)
+        db.commit()
+        db.refresh(activity)
+        stored[row["strava_activity_id"]] = activity
+    for row in efforts:
+        activity = stored[row["strava_activity_id"]]
+        db.add(ActivityBestEffort(
+            activity_id=activity.id,
+            activity_start_date=activity.activity_start_date,
+            user_id=user_id,
+            distance=row["distance"],
+            elapsed_time_seconds=row["elapsed_time_seconds"],
+        ))
+        db.commit()
+    return time.perf_counter() - started
+
+
+def run_bulk(db, user_id: int, activities, efforts, batch_size: int) -> float:
+    # Group efforts up front so only ingest is timed, not slicing the synthetic data.
+    by_activity = defaultdict(list)
+    for row in efforts:
+        by_activity[row["strava_activity_id"]].append(row)
+    batches = []
+    for start in range(0, len(activities), batch_size):
+        batch = activities[start:start + batch_size]
+        batches.append((batch, [e for row in batch for e in by_activity[row["strava_activity_id"]]]))
+
+    started = time.perf_counter()
+    for batch, batch_efforts in batches:
+        ingest_activities(db, user_id, batch, batch_efforts)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_ingest")
+    parser.add_argument("--activities", type=int, default=3000)
+    parser.add_argument("--orm-activities", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=200, help="Activities per ingest call (a Strava page)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    results = {}
+    try:
+        for name, count in (("orm", args.orm_activities), ("bulk", args.activities)):
+            activities, efforts = synthetic_rows(count, args.seed)
+            rows = len(activities) + len(efforts)
+            user_id = create_bench_user(db)
+            try:
+                if name == "orm":
+                    elapsed = run_orm(db, user_id, activities, efforts)
+                else:
+                    elapsed = run_bulk(db, user_id, activities, efforts, args.batch_size)
+                    # Re-import the same data to measure the idempotent path.
+                    results["bulk_reimport"] = {
+                        "rows": rows,
+                        "seconds": round(run_bulk(db, user_id, activities, efforts, args.batch_size), 4),
+                    }
+                    results["bulk_reimport"]["rows_per_second"] = round(rows / results["bulk_reimport"]["seconds"])
+            finally:
+                delete_bench_user(db, user_id)
+            results[name] = {"rows": rows, "seconds": round(elapsed, 4), "rows_per_second": round(rows / elapsed)}
+    finally:
+        db.close()
+
+    results["speedup"] = round(results["bulk"]["rows_per_second"] / results["orm"]["rows_per_second"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Seeded synthetic dataset for benchmarks.
+
+Generates N users with M runs each, and a best effort for every PRDistance
+each run covers. Rows are streamed into PostgreSQL with COPY, so millions
+of rows load in minutes. Derived tables (personal records, period bests,
+training rollups, leaderboards) are then rebuilt set-based.
+
+Each athlete gets an ability (a 5k time). Their best efforts at other
+distances follow Riegel's formula, ``t2 = t1 * (d2 / d1) ** 1.06``, with
+per-run noise, so leaderboards have realistic spreads and ties. The same
+seed always produces the same rows.
+
+Generated users are tagged by their ``x_user_id`` prefix so ``--reset``
+removes them without touching anything else. Run against an otherwise idle
+database: id ranges are reserved by advancing the sequences.
+
+Usage (from the backend directory):
+    python -m benchmarks.datagen --users 10000 --activities-per-user 200 [--seed 42] [--reset]
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text  # noqa: E402
+
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.crud.leaderboard import refresh_leaderboards  # noqa: E402
+from app.crud.period_best_effort import rebuild_period_bests  # noqa: E402
+from app.crud.personal_record import rebuild_personal_records  # noqa: E402
+from app.crud.training_rollup import rebuild_training_rollups  # noqa: E402
+from app.services.best_efforts import PR_DISTANCE_METERS  # noqa: E402
+
+USER_PREFIX = "bench-gen-"
+# Fixed so a seed always yields the same dates; period benchmarks query windows before it.
+END_DATE = datetime(2026, 1, 1)
+RIEGEL_EXPONENT = 1.06
+
+# Users generated per COPY batch.
+USER_BATCH = 500
+
+
+def riegel(seconds: float, meters: float, target_meters: float) -> float:
+    """Predicted time over ``target_meters`` from a performance over ``meters``."""
+    return seconds * (target_meters / meters) ** RIEGEL_EXPONENT
+
+
+def _run_distance(rng: random.Random) -> float:
+    roll = rng.random()
+    if roll < 0.70:
+        return rng.uniform(3000, 12000)   # easy and tempo runs
+    if roll < 0.92:
+        return rng.uniform(12000, 25000)  # long runs
+    if roll < 0.98:
+        return rng.choice((5000, 10000, 21097.5)) * rng.uniform(1.0, 1.02)  # races
+    return rng.uniform(42195, 44000)      # marathons
+
+
+def _reserve_ids(conn, table: str, count: int) -> int:
+    """Advance ``table``'s id sequence by ``count`` and return the first reserved id."""
+    last = conn.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"nextval(pg_get_serial_sequence('{table}', 'id')) + :n - 1)"
+        ),
+        {"n": count},
+    ).scalar()
+    return last - count + 1
+
+
+def _copy(raw, table: str, columns: List[str], rows: List[tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    with raw.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def generate(users: int, activities_per_user: int, seed: int, days: int) -> Dict[str, int]:
+    """Load the dataset; returns row counts per table."""
+    rng = random.Random(seed)
+    counts = {"users": 0, "activities": 0, "activity_best_efforts": 0}
+    start_date = END_DATE - timedelta(days=days)
+
+    with engine.connect() as conn:
+        raw = conn.connection.dbapi_connection
+        for batch_start in range(0, users, USER_BATCH):
+            batch = range(batch_start, min(users, batch_start + USER_BATCH))
+            first_user = _reserve_ids(conn, "users", len(batch))
+            first_activity = _reserve_ids(conn, "activities", len(batch) * activities_per_user)
+
+            user_rows, activity_rows, effort_rows = [], [], []
+            activity_id = first_activity
+            for offset, index in enumerate(batch):
+                user_id = first_user + offset
+                user_rows.append((user_id, f"{USER_PREFIX}{seed}-{index}", f"bench{index}", f"Bench Runner {index}",
+                                  "COMPLETED"))
+                # Ability: 5k time in seconds, roughly 15 to 45 minutes.
+                five_k = min(2700.0, max(900.0, rng.gauss(1650, 330)))
+                for n in range(activities_per_user):
+                    meters = _run_distance(rng)
+                    started = start_date + timedelta(seconds=rng.uniform(0, days * 86400))
+                    effort = rng.uniform(1.0, 1.25)  # 1.0 is a race-pace day
+                    moving_time = int(riegel(five_k, 5000, meters) * effort * rng.uniform(1.0, 1.15))
+                    activity_rows.append((
+                        activity_id, user_id, 10 ** 12 + index * 10 ** 6 + n, f"Run {n}",
+                        round(meters, 1), moving_time, round(rng.uniform(0, meters / 50), 1),
+                        started.isoformat(sep=" ", timespec="seconds"),
+                    ))
+                    for distance, target in PR_DISTANCE_METERS.items():
+                        if target > meters:
+                            continue
+                        elapsed = int(riegel(five_k, 5000, target) * effort * rng.uniform(0.98, 1.06))
+                        effort_rows.append((activity_id, user_id, distance.name, elapsed,
+                                            started.isoformat(sep=" ", timespec="seconds")))
+                    activity_id += 1
+
+            _copy(raw, "users", ["id", "x_user_id", "x_username", "x_display_name", "backfill_status"], user_rows)
+            _copy(raw, "activities", ["id", "user_id", "strava_activity_id", "name", "total_distance_meters",
+                                      "moving_time_seconds", "total_elevation_gain_meters", "activity_start_date"],
+                  activity_rows)
+            _copy(raw, "activity_best_efforts",
+                  ["activity_id", "user_id", "distance", "elapsed_time_seconds", "activity_start_date"], effort_rows)
+            conn.commit()
+            counts["users"] += len(user_rows)
+            counts["activities"] += len(activity_rows)
+            counts["activity_best_efforts"] += len(effort_rows)
+    return counts
+
+
+def rebuild_derived() -> Dict[str, int]:
+    """Recompute every derived table from the raw rows and refresh statistics."""
+    db = SessionLocal()
+    try:
+        counts = {
+            "personal_records": rebuild_personal_records(db),
+            "period_best_efforts": rebuild_period_bests(db),
+            "training_rollups": rebuild_training_rollups(db),
+        }
+        db.commit()
+        refresh_leaderboards(db, force=True)
+    finally:
+        db.close()
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    return counts
+
+
+def reset() -> int:
+    """Delete every generated user and everything that references them."""
+    generated = f"SELECT id FROM users WHERE x_user_id LIKE '{USER_PREFIX}%'"
+    with engine.begin() as conn:
+        for table in ("leaderboard_entries", "training_rollups", "period_best_efforts", "personal_records",
+                      "activity_best_efforts", "activities"):
+            conn.execute(text(f"DELETE FROM {table} WHERE user_id IN ({generated})"))
+        return conn.execute(text(f"DELETE FROM users WHERE x_user_id LIKE '{USER_PREFIX}%'")).rowcount
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.datagen")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--activities-per-user", type=int, default=100)
+    parser.add_argument("--days", type=int, default=3 * 365, help="History length before END_DATE")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Remove previously generated users first")
+    args = parser.parse_args()
+
+    result = {"seed": args.seed}
+    if args.reset:
+        result["deleted_users"] = reset()
+    started = time.perf_counter()
+    result["rows"] = generate(args.users, args.activities_per_user, args.seed, args.days)
+    result["load_seconds"] = round(time.perf_counter() - started, 2)
+    started = time.perf_counter()
+    result["derived_rows"] = rebuild_derived()
+    result["derive_seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
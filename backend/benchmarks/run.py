@@ -0,0 +1,276 @@
+"""
+Repeatable benchmark scenarios for the API and database layer.
+
+Expects a dataset loaded with ``python -m benchmarks.datagen``; inputs (user
+ids, offsets, windows) are drawn from it with a fixed seed, so two runs over
+the same dataset do the same work. Results are printed (or written with
+--output) as JSON, with timing percentiles per scenario and the git commit.
+``--compare`` diffs against an earlier result file and exits non-zero when a
+scenario's median regressed by more than --threshold.
+
+Usage (from the backend directory):
+    python -m benchmarks.run [--scenario NAME ...] [--iterations 200] [--output results.json]
+                             [--compare baseline.json] [--threshold 0.10]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.crud.leaderboard import get_leaderboard_page, refresh_leaderboard  # noqa: E402
+from app.crud.period_best_effort import get_period_leaderboard_page, period_start  # noqa: E402
+from app.crud.personal_record import rebuild_personal_records  # noqa: E402
+from app.crud.user import get_user_by_id, get_user_by_x_id  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.ingest import ingest_activities  # noqa: E402
+from benchmarks.bench_ingest import create_bench_user, delete_bench_user, synthetic_rows  # noqa: E402
+from benchmarks.datagen import END_DATE, USER_PREFIX  # noqa: E402
+from models.models import LeaderboardSnapshot, PRDistance, RollupPeriod, User  # noqa: E402
+
+SCENARIOS: Dict[str, Callable] = {}
+
+
+def scenario(name: str):
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+def timed(fn: Callable[[], object], iterations: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples: List[float], ops_per_sample: int = 1) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "iterations": len(ordered),
+        "mean_ms": round(1000 * statistics.fmean(ordered), 4),
+        "p50_ms": round(1000 * ordered[len(ordered) // 2], 4),
+        "p95_ms": round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "max_ms": round(1000 * ordered[-1], 4),
+        "ops_per_second": round(ops_per_sample * len(ordered) / sum(ordered), 1),
+    }
+
+
+class Context:
+    """Dataset facts the scenarios draw their inputs from."""
+
+    def __init__(self, db, seed: int):
+        self.db = db
+        self.rng = random.Random(seed)
+        rows = db.query(User.id, User.x_user_id).filter(User.x_user_id.like(f"{USER_PREFIX}%")).all()
+        if not rows:
+            sys.exit("No generated users found; run `python -m benchmarks.datagen` first.")
+        self.user_ids = [row.id for row in rows]
+        self.x_user_ids = [row.x_user_id for row in rows]
+        self.board_sizes = {
+            snapshot.distance: snapshot.entry_count for snapshot in db.query(LeaderboardSnapshot)
+        }
+        self.client = TestClient(app)
+
+    def user_id(self) -> int:
+        return self.rng.choice(self.user_ids)
+
+    def offset(self, distance: PRDistance, limit: int) -> int:
+        return self.rng.randrange(max(1, self.board_sizes.get(distance, 0) - limit))
+
+
+@scenario("crud.get_user_by_id")
+def _get_user_by_id(ctx: Context, iterations: int):
+    def run():
+        get_user_by_id(ctx.db, ctx.user_id())
+        ctx.db.rollback()
+    return summarize(timed(run, iterations, warmup=10))
+
+
+@scenario("crud.get_user_by_x_id")
+def _get_user_by_x_id(ctx: Context, iterations: int):
+    def run():
+        get_user_by_x_id(ctx.db, ctx.rng.choice(ctx.x_user_ids))
+        ctx.db.rollback()
+    return summarize(timed(run, iterations, warmup=10))
+
+
+@scenario("api.read_user")
+def _api_read_user(ctx: Context, iterations: int):
+    def run():
+        response = ctx.client.get(f"/api/v1/users/{ctx.user_id()}")
+        assert response.status_code == 200, response.status_code
+    return summarize(timed(run, iterations, warmup=10))
+
+
+@scenario("api.read_users_batch")
+def _api_read_users_batch(ctx: Context, iterations: int):
+    # The avatars and names for one 100-row leaderboard page, in a single request.
+    def run():
+        ids = ",".join(str(ctx.user_id()) for _ in range(100))
+        response = ctx.client.get("/api/v1/users", params={"ids": ids})
+        assert response.status_code == 200, response.status_code
+    return summarize(timed(run, iterations, warmup=10), ops_per_sample=100)
+
+
+@scenario("crud.leaderboard_page")
+def _leaderboard_page(ctx: Context, iterations: int):
+    def run():
+        get_leaderboard_page(ctx.db, PRDistance.KM_5, offset=ctx.offset(PRDistance.KM_5, 50), limit=50)
+        ctx.db.rollback()
+    return summarize(timed(run, iterations, warmup=10))
+
+
+@scenario("api.leaderboard_page")
+def _api_leaderboard_page(ctx: Context, iterations: int):
+    def run():
+        offset = ctx.offset(PRDistance.KM_5, 50)
+        response = ctx.client.get(f"/api/v1/leaderboards/{PRDistance.KM_5.value}", params={"offset": offset})
+        assert response.status_code == 200, response.status_code
+    return summarize(timed(run, iterations, warmup=10))
+
+
+@scenario("crud.period_leaderboard_page")
+def _period_leaderboard_page(ctx: Context, iterations: int):
+    start = period_start(RollupPeriod.MONTH, END_DATE.date().replace(month=6, year=END_DATE.year - 1))
+
+    def run():
+        get_period_leaderboard_page(ctx.db, RollupPeriod.MONTH, start, PRDistance.KM_5,
+                                    offset=ctx.rng.randrange(200), limit=50)
+        ctx.db.rollback()
+    return summarize(timed(run, iterations, warmup=10))
+
+
+@scenario("crud.rebuild_personal_records_user")
+def _rebuild_user_prs(ctx: Context, iterations: int):
+    def run():
+        rebuild_personal_records(ctx.db, ctx.user_id())
+        ctx.db.rollback()
+    return summarize(timed(run, iterations, warmup=3))
+
+
+@scenario("crud.rebuild_personal_records_all")
+def _rebuild_all_prs(ctx: Context, iterations: int):
+    def run():
+        rebuild_personal_records(ctx.db)
+        ctx.db.rollback()
+    return summarize(timed(run, max(1, iterations // 100), warmup=0))
+
+
+@scenario("crud.refresh_leaderboard")
+def _refresh_leaderboard(ctx: Context, iterations: int):
+    def run():
+        refresh_leaderboard(ctx.db, PRDistance.KM_5)
+        ctx.db.rollback()
+    return summarize(timed(run, max(1, iterations // 20), warmup=1))
+
+
+@scenario("ingest.bulk")
+def _ingest(ctx: Context, iterations: int):
+    # One Strava page (200 runs with 8 efforts each) per sample, into a throwaway user.
+    activities, efforts = synthetic_rows(200 * max(1, iterations // 20), seed=ctx.rng.randrange(10 ** 6))
+    pages = []
+    for start in range(0, len(activities), 200):
+        batch = activities[start:start + 200]
+        ids = {row["strava_activity_id"] for row in batch}
+        pages.append((batch, [e for e in efforts if e["strava_activity_id"] in ids]))
+    remaining = iter(pages)
+    user_id = create_bench_user(ctx.db)
+    try:
+        samples = timed(lambda: ingest_activities(ctx.db, user_id, *next(remaining)), len(pages), warmup=0)
+    finally:
+        delete_bench_user(ctx.db, user_id)
+    result = summarize(samples, ops_per_sample=200 * 9)
+    result["rows_per_sample"] = 200 * 9
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Scenarios whose median got slower than the baseline by more than ``threshold``."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("p50_ms"):
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1
+        result["p50_change"] = round(change, 4)
+        if change > threshold:
+            regressions.append(f"{name}: p50 {before['p50_ms']}ms -> {result['p50_ms']}ms ({change:+.1%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Default: all")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p50 slowdown for --compare")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        ctx = Context(db, args.seed)
+        results = {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "seed": args.seed,
+            "dataset": {
+                "users": len(ctx.user_ids),
+                "activities": db.execute(text("SELECT count(*) FROM activities")).scalar(),
+                "activity_best_efforts": db.execute(text("SELECT count(*) FROM activity_best_efforts")).scalar(),
+                "server_version": db.execute(text("SHOW server_version")).scalar(),
+            },
+            "scenarios": {},
+        }
+        db.rollback()
+        for name in args.scenario or sorted(SCENARIOS):
+            results["scenarios"][name] = SCENARIOS[name](ctx, args.iterations)
+    finally:
+        db.close()
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        results["regressions"] = regressions
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if regressions:
+        sys.exit("Regressions:\n" + "\n".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Local stand-in for the Strava API, for exercising the backfill engine.
+
+Serves the handful of endpoints the backend calls (activity lists, details,
+streams and token refresh), with deterministic data derived from the bearer
+token, so any access token stored in strava_authorizations works. Requests
+are counted against short and daily quotas like Strava's, reported in the
+same X-RateLimit-* headers and answered with 429s once spent.
+
+Point the backend at it with:
+
+    STRAVA_API_BASE_URL=http://127.0.0.1:8089/api/v3
+    STRAVA_OAUTH_TOKEN_URL=http://127.0.0.1:8089/oauth/token
+
+Usage (from the backend directory):
+    python -m devtools.stub_strava [--port 8089] [--activities 300] [--latency-ms 50]
+                                   [--short-limit 600] [--daily-limit 30000] [--window-seconds 900]
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BEST_EFFORT_DISTANCES = [
+    ("400m", 400),
+    ("1/2 mile", 805),
+    ("1k", 1000),
+    ("1 mile", 1609),
+    ("2 mile", 3219),
+    ("5k", 5000),
+    ("10k", 10000),
+    ("15k", 15000),
+    ("10 mile", 16093),
+    ("20k", 20000),
+    ("Half-Marathon", 21097),
+    ("30k", 30000),
+    ("Marathon", 42195),
+]
+
+ACTIVITY_PATH = re.compile(r"^/api/v3/activities/(\d+)$")
+STREAMS_PATH = re.compile(r"^/api/v3/activities/(\d+)/streams$")
+
+
+class StubStrava:
+    """Deterministic fake athlete histories keyed by access token."""
+
+    def __init__(self, activities_per_athlete: int, short_limit: int = 600, daily_limit: int = 30000,
+                 window_seconds: int = 900):
+        self.activities_per_athlete = activities_per_athlete
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.window_seconds = window_seconds
+        self.short_usage = 0
+        self.daily_usage = 0
+        self._window = self._day = None
+        self._lock = threading.Lock()
+
+    def count_request(self) -> bool:
+        """Count a request like Strava does; False if it is over a quota and gets a 429."""
+        now = time.time()
+        with self._lock:
+            window, day = int(now // self.window_seconds), int(now // 86400)
+            if window != self._window:
+                self._window, self.short_usage = window, 0
+            if day != self._day:
+                self._day, self.daily_usage = day, 0
+            self.short_usage += 1
+            self.daily_usage += 1
+            return self.short_usage <= self.short_limit and self.daily_usage <= self.daily_limit
+
+    def rate_limit_headers(self):
+        return {
+            "X-RateLimit-Limit": f"{self.short_limit},{self.daily_limit}",
+            "X-RateLimit-Usage": f"{self.short_usage},{self.daily_usage}",
+        }
+
+    def athlete_seed(self, token: str) -> int:
+        return zlib.crc32(token.encode("utf-8"))
+
+    def activity(self, athlete_seed: int, index: int) -> dict:
+        rng = random.Random(athlete_seed * 100003 + index)
+        is_run = rng.random() < 0.8
+        distance = rng.uniform(3000, 25000) if is_run else rng.uniform(10000, 80000)
+        pace = rng.uniform(240, 420) if is_run else rng.uniform(100, 180)  # seconds per km
+        start = datetime(2025, 7, 1) - timedelta(days=index, hours=rng.randint(0, 12))
+        # IDs are unique per athlete and index so re-imports are idempotent.
+        return {
+            "id": athlete_seed % 1000000 * 100000 + index,
+            "name": "Morning Run" if is_run else "Afternoon Ride",
+            "type": "Run" if is_run else "Ride",
+            "sport_type": "Run" if is_run else "Ride",
+            "distance": round(distance, 1),
+            "moving_time": int(distance / 1000 * pace),
+            "elapsed_time": int(distance / 1000 * pace * 1.05),
+            "total_elevation_gain": round(rng.uniform(0, 300), 1),
+            "start_date": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "_pace": pace,
+        }
+
+    def activity_detail(self, athlete_seed: int, index: int) -> dict:
+        activity = self.activity(athlete_seed, index)
+        pace = activity.pop("_pace")
+        if activity["type"] == "Run":
+            activity["best_efforts"] = [
+                {"name": name, "distance": meters, "elapsed_time": int(meters / 1000 * pace * 0.97)}
+                for name, meters in BEST_EFFORT_DISTANCES
+                if meters <= activity["distance"]
+            ]
+        return activity
+
+    def activity_streams(self, athlete_seed: int, index: int) -> dict:
+        """1 Hz time/distance/altitude/heartrate streams whose pace drifts around the activity's average."""
+        activity = self.activity(athlete_seed, index)
+        rng = random.Random(athlete_seed * 100003 + index + 1)
+        speed = 1000 / activity["_pace"]
+        distance, time_data, altitude, heartrate, covered, elapsed = [], [], [], [], 0.0, 0
+        height, pulse = rng.uniform(0, 500), rng.uniform(130, 160)
+        while covered < activity["distance"]:
+            distance.append(round(covered, 1))
+            time_data.append(elapsed)
+            altitude.append(round(height, 1))
+            heartrate.append(round(pulse))
+            height = max(0.0, height + rng.uniform(-0.5, 0.5))
+            pulse = min(200.0, max(100.0, pulse + rng.uniform(-1, 1)))
+            covered += speed * rng.uniform(0.85, 1.15)
+            elapsed += 1
+        meta = {"series_type": "distance", "original_size": len(distance), "resolution": "high"}
+        return {
+            "distance": {"data": distance, **meta},
+            "time": {"data": time_data, **meta},
+            "altitude": {"data": altitude, **meta},
+            "heartrate": {"data": heartrate, **meta},
+        }
+
+
+def make_handler(stub: StubStrava, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in stub.rate_limit_headers().items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _token(self):
+            auth = self.headers.get("Authorization", "")
+            return auth[len("Bearer "):] if auth.startswith("Bearer ") else None
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            if not stub.count_request():
+                return self._send(429, {"message": "Rate Limit Exceeded"})
+            token = self._token()
+            if token is None:
+                return self._send(401, {"message": "Authorization Error"})
+
+            url = urlparse(self.path)
+            seed = stub.athlete_seed(token)
+            if url.path == "/api/v3/athlete/activities":
+                query = parse_qs(url.query)
+                page = int(query.get("page", ["1"])[0])
+                per_page = int(query.get("per_page", ["30"])[0])
+                start = (page - 1) * per_page
+                end = min(start + per_page, stub.activities_per_athlete)
+                summaries = [stub.activity(seed, i) for i in range(start, end)]
+                for summary in summaries:
+                    summary.pop("_pace")
+                return self._send(200, summaries)
+
+            match = STREAMS_PATH.match(url.path)
+            if match:
+                index = int(match.group(1)) - seed % 1000000 * 100000
+                if not 0 <= index < stub.activities_per_athlete:
+                    return self._send(404, {"message": "Record Not Found"})
+                return self._send(200, stub.activity_streams(seed, index))
+
+            match = ACTIVITY_PATH.match(url.path)
+            if match:
+                activity_id = int(match.group(1))
+                index = activity_id - seed % 1000000 * 100000
+                if not 0 <= index < stub.activities_per_athlete:
+                    return self._send(404, {"message": "Record Not Found"})
+                return self._send(200, stub.activity_detail(seed, index))
+
+            return self._send(404, {"message": "Record Not Found"})
+
+        def do_POST(self):
+            if not stub.count_request():
+                return self._send(429, {"message": "Rate Limit Exceeded"})
+            if urlparse(self.path).path == "/oauth/token":
+                length = int(self.headers.get("Content-Length", "0"))
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                refresh_token = form.get("refresh_token", ["stub-refresh"])[0]
+                # Reuse the refresh token as the access token so a refreshed
+                # athlete keeps seeing the same history.
+                return self._send(200, {
+                    "token_type": "Bearer",
+                    "access_token": refresh_token,
+                    "refresh_token": refresh_token,
+                    "expires_at": int(time.time()) + 6 * 3600,
+                    "expires_in": 6 * 3600,
+                })
+            return self._send(404, {"message": "Record Not Found"})
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m devtools.stub_strava")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--activities", type=int, default=300, help="Activities per athlete")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial latency per GET")
+    parser.add_argument("--short-limit", type=int, default=600, help="Requests per short window before 429s")
+    parser.add_argument("--daily-limit", type=int, default=30000, help="Requests per UTC day before 429s")
+    parser.add_argument("--window-seconds", type=int, default=900,
+                        help="Short window length; match STRAVA_RATE_LIMIT_WINDOW_SECONDS")
+    args = parser.parse_args()
+
+    stub = StubStrava(args.activities, args.short_limit, args.daily_limit, args.window_seconds)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub, args.latency_ms / 1000))
+    print(f"Stub Strava listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
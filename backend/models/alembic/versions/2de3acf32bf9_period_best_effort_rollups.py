@@ -0,0 +1,72 @@
+"""period best effort rollups
+
+Revision ID: 2de3acf32bf9
+Revises: 6974f17481f7
+Create Date: 2026-10-16 11:20:05.337190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2de3acf32bf9'
+down_revision: Union[str, None] = '6974f17481f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+prdistance = postgresql.ENUM(
+    'METER_400', 'METER_800', 'KM_1', 'MILE_1', 'KM_5', 'KM_10', 'HALF_MARATHON', 'MARATHON',
+    name='prdistance', create_type=False,
+)
+
+
+def upgrade() -> None:
+    # Denormalize the activity date onto its efforts.
+    op.add_column('activity_best_efforts', sa.Column('activity_start_date', sa.DateTime(), nullable=True))
+    op.execute("""
+        UPDATE activity_best_efforts e
+        SET activity_start_date = a.activity_start_date
+        FROM activities a
+        WHERE a.id = e.activity_id
+    """)
+    op.alter_column('activity_best_efforts', 'activity_start_date', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_activity_best_efforts_distance_date', 'activity_best_efforts', ['distance', 'activity_start_date'], unique=False)
+
+    op.create_table('period_best_efforts',
+    sa.Column('period', sa.Enum('WEEK', 'MONTH', 'YEAR', name='rollupperiod'), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('distance', prdistance, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('elapsed_time_seconds', sa.Integer(), nullable=False),
+    sa.Column('achieved_on', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('period', 'period_start', 'distance', 'user_id')
+    )
+    op.create_index('ix_period_best_efforts_board', 'period_best_efforts', ['period', 'period_start', 'distance', 'elapsed_time_seconds', 'user_id'], unique=False)
+
+    # Seed the rollups from existing history.
+    for period, unit in (('WEEK', 'week'), ('MONTH', 'month'), ('YEAR', 'year')):
+        op.execute(f"""
+            INSERT INTO period_best_efforts
+                (period, period_start, distance, user_id, activity_id, elapsed_time_seconds, achieved_on)
+            SELECT DISTINCT ON (date_trunc('{unit}', activity_start_date)::date, user_id, distance)
+                '{period}', date_trunc('{unit}', activity_start_date)::date, distance, user_id,
+                activity_id, elapsed_time_seconds, activity_start_date::date
+            FROM activity_best_efforts
+            ORDER BY date_trunc('{unit}', activity_start_date)::date, user_id, distance,
+                elapsed_time_seconds, activity_start_date
+        """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_period_best_efforts_board', table_name='period_best_efforts')
+    op.drop_table('period_best_efforts')
+    sa.Enum(name='rollupperiod').drop(op.get_bind(), checkfirst=True)
+    op.drop_index('ix_activity_best_efforts_distance_date', table_name='activity_best_efforts')
+    op.drop_column('activity_best_efforts', 'activity_start_date')
@@ -0,0 +1,28 @@
+"""keyset pagination indexes
+
+Revision ID: 395956bfe41f
+Revises: 788fa1f050ec
+Create Date: 2026-10-16 21:48:09.305117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '395956bfe41f'
+down_revision: Union[str, None] = '788fa1f050ec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_activities_user_start_date', 'activities', ['user_id', 'activity_start_date', 'id'], unique=False)
+    op.create_index('ix_activity_best_efforts_user_distance_time', 'activity_best_efforts', ['user_id', 'distance', 'elapsed_time_seconds', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activity_best_efforts_user_distance_time', table_name='activity_best_efforts')
+    op.drop_index('ix_activities_user_start_date', table_name='activities')
@@ -0,0 +1,28 @@
+"""strava rate limit bucket
+
+Revision ID: 3bbfd95eacb3
+Revises: a9b945c271c9
+Create Date: 2026-10-17 14:08:52.316402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3bbfd95eacb3'
+down_revision: Union[str, None] = 'a9b945c271c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('strava_rate_limits', sa.Column('bucket_tokens', sa.Float(), server_default='0', nullable=False))
+    op.add_column('strava_rate_limits', sa.Column('bucket_updated_at', sa.Float(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('strava_rate_limits', 'bucket_updated_at')
+    op.drop_column('strava_rate_limits', 'bucket_tokens')
@@ -0,0 +1,57 @@
+"""leaderboard snapshots
+
+Revision ID: 6974f17481f7
+Revises: dc0a630da510
+Create Date: 2026-10-16 10:03:27.918452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6974f17481f7'
+down_revision: Union[str, None] = 'dc0a630da510'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The prdistance type already exists; reuse it rather than re-creating it.
+prdistance = postgresql.ENUM(
+    'METER_400', 'METER_800', 'KM_1', 'MILE_1', 'KM_5', 'KM_10', 'HALF_MARATHON', 'MARATHON',
+    name='prdistance', create_type=False,
+)
+
+
+def upgrade() -> None:
+    op.create_index('ix_personal_records_distance_time', 'personal_records', ['distance', 'elapsed_time_seconds'], unique=False)
+    op.create_index('ix_personal_records_distance_updated', 'personal_records', ['distance', 'updated_at'], unique=False)
+    op.create_table('leaderboard_entries',
+    sa.Column('distance', prdistance, nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('source_activity_id', sa.Integer(), nullable=False),
+    sa.Column('elapsed_time_seconds', sa.Integer(), nullable=False),
+    sa.Column('achieved_on', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['source_activity_id'], ['activities.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('distance', 'position'),
+    sa.UniqueConstraint('distance', 'user_id', name='uq_leaderboard_distance_user')
+    )
+    op.create_table('leaderboard_snapshots',
+    sa.Column('distance', prdistance, nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('records_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('distance')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('leaderboard_snapshots')
+    op.drop_table('leaderboard_entries')
+    op.drop_index('ix_personal_records_distance_updated', table_name='personal_records')
+    op.drop_index('ix_personal_records_distance_time', table_name='personal_records')
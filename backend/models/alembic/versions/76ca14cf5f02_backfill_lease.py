@@ -0,0 +1,26 @@
+"""backfill lease
+
+Revision ID: 76ca14cf5f02
+Revises: b10a82139c69
+Create Date: 2026-10-17 09:04:31.572210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '76ca14cf5f02'
+down_revision: Union[str, None] = 'b10a82139c69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('backfill_lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'backfill_lease_expires_at')
@@ -0,0 +1,26 @@
+"""period best efforts updated_at
+
+Revision ID: 788fa1f050ec
+Revises: f676e626787c
+Create Date: 2026-10-16 20:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '788fa1f050ec'
+down_revision: Union[str, None] = 'f676e626787c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('period_best_efforts', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('period_best_efforts', 'updated_at')
@@ -0,0 +1,42 @@
+"""strava events
+
+Revision ID: 986fdb8c8b0c
+Revises: 395956bfe41f
+Create Date: 2026-10-16 22:31:54.120644
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '986fdb8c8b0c'
+down_revision: Union[str, None] = '395956bfe41f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('strava_events',
+    sa.Column('owner_id', sa.BigInteger(), nullable=False),
+    sa.Column('object_type', sa.String(length=16), nullable=False),
+    sa.Column('object_id', sa.BigInteger(), nullable=False),
+    sa.Column('aspect_type', sa.String(length=16), nullable=False),
+    sa.Column('updates', sa.JSON(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('event_count', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=512), nullable=True),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('leased_until', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('owner_id', 'object_type', 'object_id')
+    )
+    op.create_index('ix_strava_events_available_at', 'strava_events', ['available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_strava_events_available_at', table_name='strava_events')
+    op.drop_table('strava_events')
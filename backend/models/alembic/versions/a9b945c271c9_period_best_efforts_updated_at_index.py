@@ -0,0 +1,26 @@
+"""period best efforts updated_at index
+
+Revision ID: a9b945c271c9
+Revises: 76ca14cf5f02
+Create Date: 2026-10-17 09:41:18.204937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9b945c271c9'
+down_revision: Union[str, None] = '76ca14cf5f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_period_best_efforts_updated_at', 'period_best_efforts', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_period_best_efforts_updated_at', table_name='period_best_efforts')
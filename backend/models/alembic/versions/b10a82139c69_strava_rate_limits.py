@@ -0,0 +1,36 @@
+"""strava rate limits
+
+Revision ID: b10a82139c69
+Revises: 986fdb8c8b0c
+Create Date: 2026-10-16 23:12:07.845310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b10a82139c69'
+down_revision: Union[str, None] = '986fdb8c8b0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('strava_rate_limits',
+    sa.Column('client_id', sa.String(length=64), nullable=False),
+    sa.Column('short_limit', sa.Integer(), nullable=False),
+    sa.Column('short_usage', sa.Integer(), nullable=False),
+    sa.Column('short_window_start', sa.BigInteger(), nullable=False),
+    sa.Column('daily_limit', sa.Integer(), nullable=False),
+    sa.Column('daily_usage', sa.Integer(), nullable=False),
+    sa.Column('daily_window_start', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('strava_rate_limits')
@@ -0,0 +1,34 @@
+"""unique best effort per activity and distance
+
+Revision ID: dc0a630da510
+Revises: 8a1a9afb61b8
+Create Date: 2026-10-16 09:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dc0a630da510'
+down_revision: Union[str, None] = '8a1a9afb61b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the fastest effort where an activity has duplicates for a distance.
+    op.execute("""
+        DELETE FROM activity_best_efforts e
+        USING activity_best_efforts keep
+        WHERE e.activity_id = keep.activity_id
+          AND e.distance = keep.distance
+          AND (e.elapsed_time_seconds, e.id) > (keep.elapsed_time_seconds, keep.id)
+    """)
+    op.create_unique_constraint('uq_activity_distance_effort', 'activity_best_efforts', ['activity_id', 'distance'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_activity_distance_effort', 'activity_best_efforts', type_='unique')
@@ -0,0 +1,53 @@
+"""training rollups
+
+Revision ID: e281063e238d
+Revises: 2de3acf32bf9
+Create Date: 2026-10-16 12:41:52.160934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e281063e238d'
+down_revision: Union[str, None] = '2de3acf32bf9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+rollupperiod = postgresql.ENUM('WEEK', 'MONTH', 'YEAR', name='rollupperiod', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table('training_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', rollupperiod, nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('activity_count', sa.Integer(), nullable=False),
+    sa.Column('total_distance_meters', sa.Float(), nullable=False),
+    sa.Column('moving_time_seconds', sa.BigInteger(), nullable=False),
+    sa.Column('total_elevation_gain_meters', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'period_start')
+    )
+
+    # Seed the rollups from existing activities.
+    for period, unit in (('WEEK', 'week'), ('MONTH', 'month'), ('YEAR', 'year')):
+        op.execute(f"""
+            INSERT INTO training_rollups
+                (user_id, period, period_start, activity_count, total_distance_meters,
+                 moving_time_seconds, total_elevation_gain_meters)
+            SELECT user_id, '{period}', date_trunc('{unit}', activity_start_date)::date, count(*),
+                coalesce(sum(total_distance_meters), 0), coalesce(sum(moving_time_seconds), 0),
+                coalesce(sum(total_elevation_gain_meters), 0)
+            FROM activities
+            GROUP BY user_id, date_trunc('{unit}', activity_start_date)::date
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('training_rollups')
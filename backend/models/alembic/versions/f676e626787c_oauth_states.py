@@ -0,0 +1,34 @@
+"""oauth states
+
+Revision ID: f676e626787c
+Revises: e281063e238d
+Create Date: 2026-10-16 13:05:17.402881
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f676e626787c'
+down_revision: Union[str, None] = 'e281063e238d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('oauth_states',
+    sa.Column('state', sa.String(length=128), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('state'),
+    prefixes=['UNLOGGED']
+    )
+    op.create_index(op.f('ix_oauth_states_expires_at'), 'oauth_states', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_oauth_states_expires_at'), table_name='oauth_states')
+    op.drop_table('oauth_states')
@@ -11,6 +11,8 @@ from sqlalchemy import (
     Date,
     Enum as SQLAlchemyEnum,
     ForeignKey,
+    Index,
+    JSON,
     UniqueConstraint,
     func,
 )
@@ -43,6 +45,12 @@ class PRDistance(enum.Enum):
     HALF_MARATHON = "Half Marathon"
     MARATHON = "Marathon"
 
+class RollupPeriod(enum.Enum):
+    """Calendar windows that time-bucketed rollups are kept for."""
+    WEEK = "week"      # ISO weeks, starting Monday.
+    MONTH = "month"
+    YEAR = "year"
+
 
 # --- Table Model Definitions ---
 
@@ -70,6 +78,8 @@ class User(Base):
     
     profile_picture_url = Column(String(512))
     backfill_status = Column(SQLAlchemyEnum(BackfillStatus), default=BackfillStatus.PENDING, nullable=False)
+    # While IN_PROGRESS: when the claiming backfill engine's lease runs out unless renewed.
+    backfill_lease_expires_at = Column(DateTime(timezone=True))
     
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -133,7 +143,11 @@ class Activity(Base):
     total_elevation_gain_meters = Column(Float)
     activity_start_date = Column(DateTime, nullable=False)
 
-    __table_args__ = (UniqueConstraint("user_id", "strava_activity_id", name="uq_user_strava_activity"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "strava_activity_id", name="uq_user_strava_activity"),
+        # Keyset pages of a user's activities by date.
+        Index("ix_activities_user_start_date", "user_id", "activity_start_date", "id"),
+    )
 
     user = relationship("User", back_populates="activities")
     best_efforts = relationship("ActivityBestEffort", back_populates="activity", cascade="all, delete-orphan")
@@ -154,6 +168,16 @@ class ActivityBestEffort(Base):
     
     distance = Column(SQLAlchemyEnum(PRDistance), nullable=False)
     elapsed_time_seconds = Column(Integer, nullable=False)
+    # Denormalized from activities so efforts can be filtered by date without a join.
+    activity_start_date = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # One effort per distance per activity; lets re-imports upsert in place.
+        UniqueConstraint("activity_id", "distance", name="uq_activity_distance_effort"),
+        Index("ix_activity_best_efforts_distance_date", "distance", "activity_start_date"),
+        # Keyset pages of a user's efforts at one distance, fastest first.
+        Index("ix_activity_best_efforts_user_distance_time", "user_id", "distance", "elapsed_time_seconds", "id"),
+    )
 
     activity = relationship("Activity", back_populates="best_efforts")
     # MODIFICATION: Added the corresponding relationship for the new user_id column.
@@ -178,7 +202,168 @@ class PersonalRecord(Base):
     
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
-    __table_args__ = (UniqueConstraint("user_id", "distance", name="uq_user_distance_pr"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "distance", name="uq_user_distance_pr"),
+        # Ordered scan for leaderboard refreshes and rank lookups.
+        Index("ix_personal_records_distance_time", "distance", "elapsed_time_seconds"),
+        # Lets the refresher cheaply find distances changed since the last snapshot.
+        Index("ix_personal_records_distance_updated", "distance", "updated_at"),
+    )
 
     user = relationship("User", back_populates="personal_records")
-    source_activity = relationship("Activity", back_populates="source_for_prs")
\ No newline at end of file
+    source_activity = relationship("Activity", back_populates="source_for_prs")
+
+
+class LeaderboardEntry(Base):
+    """
+    A precomputed, ranked snapshot of personal_records for one distance.
+    Rebuilt per distance by the leaderboard refresher; never written by requests.
+    """
+    __tablename__ = "leaderboard_entries"
+
+    distance = Column(SQLAlchemyEnum(PRDistance), primary_key=True)
+    # 1-based row number in the snapshot; pages are read by seeking on it.
+    position = Column(Integer, primary_key=True)
+    # Competition rank: users with equal times share a rank.
+    rank = Column(Integer, nullable=False)
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source_activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
+    elapsed_time_seconds = Column(Integer, nullable=False)
+    achieved_on = Column(Date, nullable=False)
+
+    __table_args__ = (UniqueConstraint("distance", "user_id", name="uq_leaderboard_distance_user"),)
+
+    user = relationship("User")
+
+
+class LeaderboardSnapshot(Base):
+    """Bookkeeping for the current leaderboard_entries snapshot of each distance."""
+    __tablename__ = "leaderboard_snapshots"
+
+    distance = Column(SQLAlchemyEnum(PRDistance), primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    # max(personal_records.updated_at) for the distance when the snapshot was taken.
+    records_updated_at = Column(DateTime)
+    refreshed_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class PeriodBestEffort(Base):
+    """
+    Rollup of each user's fastest effort per distance within a calendar week,
+    month and year. Maintained incrementally on ingest; backs the windowed
+    leaderboards.
+    """
+    __tablename__ = "period_best_efforts"
+
+    period = Column(SQLAlchemyEnum(RollupPeriod), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    distance = Column(SQLAlchemyEnum(PRDistance), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
+    elapsed_time_seconds = Column(Integer, nullable=False)
+    achieved_on = Column(Date, nullable=False)
+
+    # Version stamp for a board's ETag.
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Ordered scan of one window's board.
+        Index("ix_period_best_efforts_board", "period", "period_start", "distance", "elapsed_time_seconds", "user_id"),
+        # Lets API workers cheaply find boards changed since they last looked.
+        Index("ix_period_best_efforts_updated_at", "updated_at"),
+    )
+
+    user = relationship("User")
+
+
+class TrainingRollup(Base):
+    """
+    Per-user activity totals for each calendar week, month and year.
+    Adjusted by deltas whenever activities are imported, re-imported or deleted.
+    """
+    __tablename__ = "training_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(SQLAlchemyEnum(RollupPeriod), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+
+    activity_count = Column(Integer, nullable=False, default=0)
+    total_distance_meters = Column(Float, nullable=False, default=0)
+    moving_time_seconds = Column(BigInteger, nullable=False, default=0)
+    total_elevation_gain_meters = Column(Float, nullable=False, default=0)
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    user = relationship("User")
+
+
+class StravaEvent(Base):
+    """
+    Pending Strava webhook work, one row per athlete and object.
+
+    Events for an object that is already queued are folded into its row (the
+    latest aspect wins, except that a delete sticks), so a burst of edits to
+    one activity becomes a single fetch. Workers lease rows instead of holding
+    row locks, so the webhook's upsert never waits on a slow fetch; ``version``
+    tells a finishing worker whether more events arrived meanwhile.
+    """
+    __tablename__ = "strava_events"
+
+    owner_id = Column(BigInteger, primary_key=True)  # Strava athlete ID
+    object_type = Column(String(16), primary_key=True)  # "activity" or "athlete"
+    object_id = Column(BigInteger, primary_key=True)
+
+    aspect_type = Column(String(16), nullable=False)  # "create", "update" or "delete"
+    updates = Column(JSON)
+    version = Column(Integer, nullable=False, default=1)
+    event_count = Column(Integer, nullable=False, default=1)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(512))
+
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Not claimed before this; pushed out by the coalescing delay and retry backoff.
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    # Set while a worker holds the row; an expired lease makes it claimable again.
+    leased_until = Column(DateTime(timezone=True))
+
+    __table_args__ = (Index("ix_strava_events_available_at", "available_at"),)
+
+
+class StravaRateLimit(Base):
+    """
+    Strava API quota usage shared by every process that calls Strava, one row per API application.
+    Counted up as requests are made and corrected from the X-RateLimit-* headers of each response.
+    """
+    __tablename__ = "strava_rate_limits"
+
+    client_id = Column(String(64), primary_key=True)
+
+    short_limit = Column(Integer, nullable=False)
+    short_usage = Column(Integer, nullable=False, default=0)
+    # Unix time the short (15-minute) window being counted started.
+    short_window_start = Column(BigInteger, nullable=False, default=0)
+    daily_limit = Column(Integer, nullable=False)
+    daily_usage = Column(Integer, nullable=False, default=0)
+    # Unix time of the UTC midnight the daily count started.
+    daily_window_start = Column(BigInteger, nullable=False, default=0)
+    # Token bucket pacing calls within the windows, and the Unix time it was last refilled.
+    bucket_tokens = Column(Float, nullable=False, default=0, server_default="0")
+    bucket_updated_at = Column(Float, nullable=False, default=0, server_default="0")
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class OAuthState(Base):
+    """
+    Pending OAuth logins (state -> PKCE verifier), shared by all API workers.
+    Unlogged: the rows are short-lived and not worth WAL writes or crash recovery.
+    """
+    __tablename__ = "oauth_states"
+
+    state = Column(String(128), primary_key=True)
+    data = Column(JSON, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
@@ -0,0 +1,52 @@
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from models.models import Base, User
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    """Sign tokens with a fixed key instead of the random per-process development one."""
+    monkeypatch.setattr(settings, "secret_key", "test-secret")
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """
+    Engine for TEST_DATABASE_URL, a throwaway PostgreSQL database whose tables
+    are dropped and recreated; tests needing it are skipped when it is not set.
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(pg_engine):
+    """A session whose commits are rolled back after the test."""
+    with pg_engine.connect() as connection:
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            yield session
+        finally:
+            session.close()
+            transaction.rollback()
+
+
+@pytest.fixture
+def user_id(db) -> int:
+    user = User(x_user_id=f"test-{uuid.uuid4().hex[:16]}", x_username="test")
+    db.add(user)
+    db.commit()
+    return user.id
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from app.services.best_efforts import batch_best_efforts, best_efforts, parse_streams, stream_best_effort_rows
+from models.models import PRDistance
+
+
+def steady(seconds: int, meters_per_second: float):
+    """A 1 Hz (distance, time) stream at constant pace."""
+    time = np.arange(seconds + 1, dtype=float)
+    return time * meters_per_second, time
+
+
+def run(*segments):
+    """Join (seconds, m/s) segments into one continuous stream."""
+    distance, time = [0.0], [0.0]
+    for seconds, speed in segments:
+        d, t = steady(seconds, speed)
+        distance.extend(distance[-1] + d[1:])
+        time.extend(time[-1] + t[1:])
+    return distance, time
+
+
+def test_fast_5km_segment_between_slow_ones():
+    distance, time = run((600, 2.5), (1175, 5000 / 1175), (600, 2.5))
+    efforts = best_efforts(distance, time)
+    assert efforts[PRDistance.KM_5] == 1175
+    assert efforts[PRDistance.KM_1] == 235
+    assert efforts[PRDistance.METER_400] == 94
+    assert PRDistance.KM_10 not in efforts
+
+
+def test_finish_is_interpolated_between_samples():
+    # 3 m/s sampled every 10 s: 400 m is crossed between samples, at 133.3 s.
+    time = np.arange(0, 301, 10, dtype=float)
+    assert best_efforts(time * 3, time)[PRDistance.METER_400] == 133
+
+
+def test_distance_dips_are_ignored():
+    distance, time = run((500, 4.0))
+    distance[100] -= 30  # GPS noise; the dipped sample is held at the previous distance
+    assert best_efforts(distance, time)[PRDistance.KM_1] == pytest.approx(250, abs=1)
+
+
+def test_batch_keeps_activities_apart():
+    slow = run((400, 2.0))
+    fast = run((300, 4.0))
+    # Together they cover 2 km, but neither covers a mile on its own.
+    results = batch_best_efforts([slow, ([0.0], [0.0]), fast])
+    assert results[0] == {PRDistance.METER_400: 200, PRDistance.METER_800: 400}
+    assert results[1] == {}
+    assert results[2] == {PRDistance.METER_400: 100, PRDistance.METER_800: 200, PRDistance.KM_1: 250}
+
+
+def test_mismatched_streams_are_rejected():
+    with pytest.raises(ValueError):
+        best_efforts([0.0, 1.0, 2.0], [0.0, 1.0])
+
+
+def test_parse_streams():
+    keyed = {"distance": {"data": [0.0, 5.0]}, "time": {"data": [0, 1]}}
+    assert parse_streams(keyed) == ([0.0, 5.0], [0, 1])
+    assert parse_streams([{"type": "distance", "data": [0.0, 5.0]}, {"type": "time", "data": [0, 1]}]) \
+        == ([0.0, 5.0], [0, 1])
+    assert parse_streams({"distance": {"data": [0.0, 5.0]}}) is None
+    assert parse_streams({"distance": {"data": [0.0, 5.0]}, "time": {"data": [0]}}) is None
+
+
+def test_stream_best_effort_rows():
+    assert stream_best_effort_rows(7, {PRDistance.KM_5: 1175}) == [
+        {"strava_activity_id": 7, "distance": PRDistance.KM_5, "elapsed_time_seconds": 1175},
+    ]
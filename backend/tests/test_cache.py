@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+from app.core import cache
+from app.core.cache import SingleFlightCache, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test advances by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_ttl_cache_expires(clock):
+    ttl = TTLCache(maxsize=10, ttl_seconds=5)
+    ttl.set("a", 1)
+    clock[0] += 4.9
+    assert ttl.get("a") == 1
+    clock[0] += 0.1
+    assert ttl.get("a") is None
+    assert len(ttl) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    ttl = TTLCache(maxsize=2, ttl_seconds=5)
+    ttl.set("a", 1)
+    ttl.set("b", 2)
+    ttl.get("a")
+    ttl.set("c", 3)
+    assert ttl.get("b") is None
+    assert (ttl.get("a"), ttl.get("c")) == (1, 3)
+    assert ttl.pop("a") == 1
+    assert ttl.pop("a") is None
+
+
+def test_single_flight_expires_and_evicts(clock):
+    flights = SingleFlightCache("test_expiry", maxsize=2, ttl_seconds=5)
+    flights.set("a", 1, tags=["x"])
+    flights.set("b", 2)
+    flights.set("c", 3)
+    assert flights.get("a") is None
+    clock[0] += 5
+    assert flights.get("b") is None
+    assert flights.invalidate("x") == 0
+
+
+def test_invalidate_drops_tagged_entries():
+    flights = SingleFlightCache("test_tags", maxsize=10, ttl_seconds=60)
+    flights.set("a", 1, tags=["x", "y"])
+    flights.set("b", 2, tags=["y"])
+    flights.set("c", 3, tags=["z"])
+    assert flights.invalidate("x") == 1
+    assert flights.get("a") is None
+    assert flights.invalidate("y", "z") == 2
+    assert len(flights) == 0
+
+
+def test_load_coalesces_concurrent_misses():
+    flights = SingleFlightCache("test_threads", maxsize=10, ttl_seconds=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.load("k", loader))) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+    assert flights.get("k") == "value"
+
+
+def test_load_failure_reaches_waiters_and_is_not_cached():
+    flights = SingleFlightCache("test_failure", maxsize=10, ttl_seconds=60)
+
+    def loader():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flights.load("k", loader)
+    assert flights.load("k", lambda: "value") == "value"
+
+
+def test_load_overlapping_invalidation_is_not_cached():
+    flights = SingleFlightCache("test_overlap", maxsize=10, ttl_seconds=60)
+
+    def loader():
+        flights.invalidate("board")
+        return "old"
+
+    assert flights.load("k", loader, tags=["board"]) == "old"
+    assert flights.get("k") is None
+
+
+def test_aload_coalesces_concurrent_misses():
+    flights = SingleFlightCache("test_async", maxsize=10, ttl_seconds=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(flights.aload("k", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert calls == [1]
+    assert flights.get("k") == "value"
+
+
+def test_aload_retries_after_the_loading_task_is_cancelled():
+    flights = SingleFlightCache("test_cancel", maxsize=10, ttl_seconds=60)
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "value"
+
+    async def main():
+        leader = asyncio.create_task(flights.aload("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.aload("k", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "value"
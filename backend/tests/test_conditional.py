@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from fastapi import Request, Response
+
+from app.core.conditional import Validators, attach, not_modified
+
+
+def request(method: str = "GET", **headers: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": method,
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+VALIDATORS = Validators.of(3, datetime(2026, 3, 1, 7, 30), last_modified=datetime(2026, 3, 1, 7, 30, 15, 500000))
+
+
+def test_etag_identifies_the_version():
+    assert VALIDATORS.etag.startswith('W/"')
+    assert Validators.of(3, datetime(2026, 3, 1, 7, 30)).etag == VALIDATORS.etag
+    assert Validators.of(4, datetime(2026, 3, 1, 7, 30)).etag != VALIDATORS.etag
+
+
+def test_matching_etag_is_not_modified():
+    response = not_modified(request(if_none_match=VALIDATORS.etag), VALIDATORS)
+    assert response.status_code == 304
+    assert response.headers["etag"] == VALIDATORS.etag
+
+
+def test_etag_matching_is_weak_and_accepts_lists():
+    strong = VALIDATORS.etag[2:]
+    assert not_modified(request(if_none_match=strong), VALIDATORS) is not None
+    assert not_modified(request(if_none_match=f'W/"other", {strong}'), VALIDATORS) is not None
+    assert not_modified(request(if_none_match="*"), VALIDATORS) is not None
+
+
+def test_different_etag_is_modified():
+    assert not_modified(request(if_none_match='W/"other"'), VALIDATORS) is None
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = dict(if_none_match='W/"other"', if_modified_since="Sun, 01 Mar 2026 08:00:00 GMT")
+    assert not_modified(request(**headers), VALIDATORS) is None
+
+
+def test_if_modified_since():
+    assert not_modified(request(if_modified_since="Sun, 01 Mar 2026 07:30:15 GMT"), VALIDATORS) is not None
+    assert not_modified(request(if_modified_since="Sun, 01 Mar 2026 07:30:14 GMT"), VALIDATORS) is None
+    assert not_modified(request(if_modified_since="yesterday"), VALIDATORS) is None
+
+
+def test_only_safe_methods_get_304():
+    assert not_modified(request("POST", if_none_match=VALIDATORS.etag), VALIDATORS) is None
+
+
+def test_attach():
+    response = attach(Response(), VALIDATORS)
+    assert response.headers["etag"] == VALIDATORS.etag
+    assert response.headers["last-modified"] == "Sun, 01 Mar 2026 07:30:15 GMT"
+    assert response.headers["cache-control"] == "no-cache"
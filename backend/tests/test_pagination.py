@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor, split_page
+
+
+def test_cursor_round_trip():
+    key = (datetime(2026, 3, 1, 7, 30, 15, 250000), date(2026, 3, 1), 42)
+    cursor = encode_cursor("activities", *key)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "activities", (datetime, date, int)) == key
+
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor("prs", 42),  # another listing
+    encode_cursor("activities", 42, 43),  # wrong length
+    encode_cursor("activities", "42"),
+    encode_cursor("activities", True),
+    encode_cursor("activities", 4.2),
+    "not a cursor!",
+    "",
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor, "activities", (int,))
+    assert raised.value.status_code == 400
+
+
+def test_invalid_date_in_cursor():
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor("activities", "yesterday"), "activities", (date,))
+
+
+def test_split_page():
+    assert split_page([1, 2, 3], 3, str) == ([1, 2, 3], None)
+    assert split_page([1, 2, 3, 4], 3, str) == ([1, 2, 3], "3")
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from app.services.ingest import ingest_activities
+from models.models import PersonalRecord, PRDistance
+
+
+def activity(strava_id: int, day: int):
+    return {
+        "strava_activity_id": strava_id,
+        "name": f"Run {strava_id}",
+        "total_distance_meters": 10000.0,
+        "moving_time_seconds": 3000,
+        "total_elevation_gain_meters": 50.0,
+        "activity_start_date": datetime(2026, 3, day, 7, 0),
+    }
+
+
+def effort(strava_id: int, distance: PRDistance, seconds: int):
+    return {"strava_activity_id": strava_id, "distance": distance, "elapsed_time_seconds": seconds}
+
+
+def records(db, user_id: int):
+    return dict(
+        db.query(PersonalRecord.distance, PersonalRecord.elapsed_time_seconds)
+        .filter(PersonalRecord.user_id == user_id)
+    )
+
+
+def test_records_only_improve_from_other_activities(db, user_id):
+    ingest_activities(db, user_id, [activity(1, 1)], [effort(1, PRDistance.KM_5, 1200)])
+    result = ingest_activities(db, user_id, [activity(2, 2)], [effort(2, PRDistance.KM_5, 1300)])
+    assert result.improved_records == []
+    assert records(db, user_id) == {PRDistance.KM_5: 1200}
+
+    result = ingest_activities(db, user_id, [activity(3, 3)], [effort(3, PRDistance.KM_5, 1100)])
+    assert result.improved_records == [(user_id, PRDistance.KM_5)]
+    assert records(db, user_id) == {PRDistance.KM_5: 1100}
+
+
+def test_slower_reimport_falls_back_to_next_best(db, user_id):
+    ingest_activities(
+        db, user_id, [activity(1, 1), activity(2, 2)],
+        [effort(1, PRDistance.KM_5, 1200), effort(2, PRDistance.KM_5, 1300), effort(2, PRDistance.KM_1, 230)],
+    )
+    assert records(db, user_id) == {PRDistance.KM_5: 1200, PRDistance.KM_1: 230}
+
+    result = ingest_activities(db, user_id, [activity(1, 1)], [effort(1, PRDistance.KM_5, 1400)])
+    assert result.improved_records == [(user_id, PRDistance.KM_5)]
+    assert records(db, user_id) == {PRDistance.KM_5: 1300, PRDistance.KM_1: 230}
+
+
+def test_slower_reimport_of_the_only_effort_keeps_it(db, user_id):
+    ingest_activities(db, user_id, [activity(1, 1)], [effort(1, PRDistance.KM_5, 1200)])
+    ingest_activities(db, user_id, [activity(1, 1)], [effort(1, PRDistance.KM_5, 1250)])
+    assert records(db, user_id) == {PRDistance.KM_5: 1250}
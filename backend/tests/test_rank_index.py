@@ -0,0 +1,82 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services.rank_index import RankIndex
+from models.models import PersonalRecord, PRDistance
+
+START = datetime(2026, 3, 1, 7, 0)
+
+
+@pytest.fixture
+def db():
+    # Plain queries only, so SQLite stands in for PostgreSQL.
+    engine = create_engine("sqlite://")
+    PersonalRecord.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def put(db, user_id: int, distance: PRDistance, seconds: int, minutes: int) -> None:
+    record = db.query(PersonalRecord).filter_by(user_id=user_id, distance=distance).one_or_none()
+    if record is None:
+        record = PersonalRecord(user_id=user_id, distance=distance, source_activity_id=1)
+        db.add(record)
+    record.elapsed_time_seconds = seconds
+    record.achieved_on = date(2026, 3, 1)
+    record.updated_at = START + timedelta(minutes=minutes)
+    db.commit()
+
+
+def drop(db, user_id: int, distance: PRDistance) -> None:
+    db.query(PersonalRecord).filter_by(user_id=user_id, distance=distance).delete()
+    db.commit()
+
+
+def ranks(index: RankIndex, user_id: int):
+    return {p.distance: (p.rank, p.total) for p in index.positions(user_id)}
+
+
+@pytest.fixture
+def index(db) -> RankIndex:
+    put(db, 1, PRDistance.KM_5, 1200, 0)
+    put(db, 1, PRDistance.KM_1, 230, 0)
+    put(db, 2, PRDistance.KM_5, 1300, 0)
+    put(db, 3, PRDistance.KM_5, 1400, 0)
+    index = RankIndex()
+    index.rebuild(db)
+    return index
+
+
+def test_sync_applies_improvements(db, index):
+    put(db, 3, PRDistance.KM_5, 1100, 10)
+    assert index.sync(db)
+    assert ranks(index, 3) == {PRDistance.KM_5: (1, 3)}
+    assert ranks(index, 1) == {PRDistance.KM_5: (2, 3), PRDistance.KM_1: (1, 1)}
+
+
+def test_sync_drops_records_a_recompute_removed(db, index):
+    # Recomputing user 1's records rewrote the one they keep and dropped the other.
+    drop(db, 1, PRDistance.KM_5)
+    put(db, 1, PRDistance.KM_1, 230, 10)
+    version = index.version
+    index.sync(db)
+    assert index.version > version
+    assert ranks(index, 1) == {PRDistance.KM_1: (1, 1)}
+    assert ranks(index, 2) == {PRDistance.KM_5: (1, 2)}
+
+
+def test_sync_drops_a_user_who_lost_every_record(db, index):
+    drop(db, 3, PRDistance.KM_5)
+    index.sync(db)
+    assert ranks(index, 3) == {}
+    assert ranks(index, 2) == {PRDistance.KM_5: (2, 2)}
+
+
+def test_sync_keeps_records_that_did_not_change(db, index):
+    put(db, 1, PRDistance.KM_1, 220, 10)
+    index.sync(db)
+    assert ranks(index, 1) == {PRDistance.KM_5: (1, 3), PRDistance.KM_1: (1, 1)}
+    assert index.sync(db) == 0
@@ -0,0 +1,67 @@
+import pytest
+
+from app.core import security
+from app.core.security import (
+    create_profile_token, create_session_token, verify_profile_token, verify_session_token,
+)
+
+MALFORMED = [
+    "",
+    ".",
+    "..",
+    "42",
+    "42.abc.sig",
+    "-1.99999999999.sig",
+    "42.99999999999",
+    "٤٢.99999999999.sig",  # non-ASCII digits
+    "42.99999999999.sïg",  # non-ASCII signature
+    "42.99999999999.sig\x00",
+]
+
+
+def test_session_token_round_trip():
+    assert verify_session_token(create_session_token(42, ttl_seconds=60)) == 42
+
+
+def test_expired_session_token():
+    assert verify_session_token(create_session_token(42, ttl_seconds=-1)) is None
+
+
+def test_tampered_session_token():
+    user_id, expires_at, signature = create_session_token(42, ttl_seconds=60).split(".")
+    assert verify_session_token(f"43.{expires_at}.{signature}") is None
+    assert verify_session_token(f"{user_id}.{int(expires_at) + 1}.{signature}") is None
+    assert verify_session_token(f"{user_id}.{expires_at}.{signature[:-1]}") is None
+
+
+def test_session_token_from_another_key(monkeypatch):
+    token = create_session_token(42, ttl_seconds=60)
+    monkeypatch.setattr(security.settings, "secret_key", "other-secret")
+    assert verify_session_token(token) is None
+
+
+@pytest.mark.parametrize("token", MALFORMED)
+def test_malformed_session_token(token):
+    assert verify_session_token(token) is None
+
+
+def test_profile_token():
+    assert verify_profile_token(create_profile_token(ttl_seconds=60))
+    assert not verify_profile_token(create_profile_token(ttl_seconds=-1))
+
+
+def test_session_token_is_not_a_profile_token():
+    assert not verify_profile_token(create_session_token(42, ttl_seconds=60))
+    assert verify_session_token(create_profile_token(ttl_seconds=60)) is None
+
+
+@pytest.mark.parametrize("token", MALFORMED + ["profile.ï.sig", "profile..sig"])
+def test_malformed_profile_token(token):
+    assert not verify_profile_token(token)
+
+
+def test_production_requires_secret_key(monkeypatch):
+    monkeypatch.setattr(security.settings, "secret_key", "")
+    monkeypatch.setattr(security.settings, "environment", "production")
+    with pytest.raises(RuntimeError):
+        create_session_token(42)
@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.crud.strava_event import claim_events, complete_events, enqueue_event
+from app.services.ingest import ingest_activities
+from app.services.strava import StravaAPIError
+from app.services.strava_events import StravaEventWorker
+from models.models import Activity, ActivityBestEffort, PersonalRecord, PRDistance, StravaAuthorization, StravaEvent
+
+OWNER_ID = 9001
+LEASE = timedelta(minutes=5)
+
+
+class FakeStrava:
+    """Serves activity details; ids it does not know are 404s."""
+
+    def __init__(self, details):
+        self.details = {detail["id"]: detail for detail in details}
+
+    def get_activity(self, access_token, activity_id):
+        if activity_id not in self.details:
+            raise StravaAPIError(404, "Record Not Found")
+        return self.details[activity_id]
+
+
+def detail(strava_id: int, sport_type: str = "Run", **efforts: int):
+    return {
+        "id": strava_id,
+        "name": f"Run {strava_id}",
+        "distance": 4000.0,
+        "moving_time": 1000,
+        "total_elevation_gain": 10.0,
+        "start_date": "2026-03-01T07:00:00Z",
+        "sport_type": sport_type,
+        "best_efforts": [{"name": name, "elapsed_time": seconds} for name, seconds in efforts.items()],
+    }
+
+
+def event(object_id: int, aspect_type: str, object_type: str = "activity", updates=None):
+    return SimpleNamespace(owner_id=OWNER_ID, object_type=object_type, object_id=object_id,
+                           aspect_type=aspect_type, updates=updates)
+
+
+def worker(*details) -> StravaEventWorker:
+    return StravaEventWorker(client=FakeStrava(details), best_effort_source="strava", stream_store=object())
+
+
+def import_run(db, user_id: int, strava_id: int = 1):
+    ingest_activities(
+        db, user_id,
+        [{"strava_activity_id": strava_id, "name": "Run", "total_distance_meters": 10000.0,
+          "moving_time_seconds": 2500, "total_elevation_gain_meters": 10.0,
+          "activity_start_date": datetime(2026, 3, 1, 7, 0)}],
+        [{"strava_activity_id": strava_id, "distance": distance, "elapsed_time_seconds": seconds}
+         for distance, seconds in ((PRDistance.KM_1, 230), (PRDistance.KM_5, 1200), (PRDistance.KM_10, 2500))],
+    )
+
+
+def authorize(db, user_id: int) -> None:
+    db.add(StravaAuthorization(user_id=user_id, access_token="access", refresh_token="refresh",
+                               token_expires_at=datetime.utcnow() + timedelta(hours=6)))
+    db.commit()
+
+
+def efforts(db, user_id: int):
+    return dict(db.query(ActivityBestEffort.distance, ActivityBestEffort.elapsed_time_seconds)
+                .filter(ActivityBestEffort.user_id == user_id))
+
+
+def records(db, user_id: int):
+    return dict(db.query(PersonalRecord.distance, PersonalRecord.elapsed_time_seconds)
+                .filter(PersonalRecord.user_id == user_id))
+
+
+def test_delete_without_tokens_removes_the_activity(db, user_id):
+    import_run(db, user_id)
+    worker()._apply(db, OWNER_ID, user_id, [event(1, "delete")])
+    assert db.query(Activity).filter(Activity.user_id == user_id).count() == 0
+    assert records(db, user_id) == {}
+
+
+def test_deauthorize_then_delete_in_one_batch(db, user_id):
+    import_run(db, user_id)
+    authorize(db, user_id)
+    worker()._apply(db, OWNER_ID, user_id, [
+        event(OWNER_ID, "update", object_type="athlete", updates={"authorized": "false"}),
+        event(1, "delete"),
+    ])
+    assert db.query(StravaAuthorization).filter(StravaAuthorization.user_id == user_id).count() == 0
+    assert db.query(Activity).filter(Activity.user_id == user_id).count() == 0
+
+
+def test_cropped_activity_loses_efforts_it_no_longer_covers(db, user_id):
+    import_run(db, user_id)
+    authorize(db, user_id)
+    worker(detail(1, **{"1k": 240}))._apply(db, OWNER_ID, user_id, [event(1, "update")])
+    assert efforts(db, user_id) == {PRDistance.KM_1: 240}
+    assert records(db, user_id) == {PRDistance.KM_1: 240}
+
+
+def test_activity_that_is_no_longer_a_run_loses_its_efforts(db, user_id):
+    import_run(db, user_id)
+    authorize(db, user_id)
+    worker(detail(1, sport_type="Ride"))._apply(db, OWNER_ID, user_id, [event(1, "update")])
+    assert db.query(Activity).filter(Activity.user_id == user_id).count() == 1
+    assert efforts(db, user_id) == {}
+    assert records(db, user_id) == {}
+
+
+def test_update_for_a_vanished_activity_removes_it(db, user_id):
+    import_run(db, user_id)
+    authorize(db, user_id)
+    worker()._apply(db, OWNER_ID, user_id, [event(1, "update")])
+    assert db.query(Activity).filter(Activity.user_id == user_id).count() == 0
+
+
+class SyncSession:
+    """Runs enqueue_event's awaited statements on a regular Session."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def execute(self, stmt):
+        return self.db.execute(stmt)
+
+
+def enqueue(db, object_id: int, aspect_type: str, delay: timedelta = timedelta(0)) -> None:
+    raw = {"owner_id": OWNER_ID, "object_type": "activity", "object_id": object_id, "aspect_type": aspect_type}
+    asyncio.run(enqueue_event(SyncSession(db), raw, delay))
+    db.commit()
+
+
+def queued(db):
+    return db.query(StravaEvent).filter(StravaEvent.owner_id == OWNER_ID).populate_existing().all()
+
+
+def test_events_for_one_object_coalesce(db):
+    enqueue(db, 1, "create")
+    enqueue(db, 1, "update")
+    enqueue(db, 2, "update")
+    rows = {row.object_id: row for row in queued(db)}
+    assert len(rows) == 2
+    assert (rows[1].aspect_type, rows[1].version, rows[1].event_count) == ("update", 2, 2)
+
+
+def test_queued_delete_wins(db):
+    enqueue(db, 1, "delete")
+    enqueue(db, 1, "update")
+    (row,) = queued(db)
+    assert row.aspect_type == "delete"
+
+
+def test_completion_keeps_events_that_arrived_while_leased(db):
+    enqueue(db, 1, "create")
+    enqueue(db, 2, "create")
+    claimed = [e for e in claim_events(db, 100, LEASE) if e.owner_id == OWNER_ID]
+    assert {e.object_id for e in claimed} == {1, 2}
+    assert not [e for e in claim_events(db, 100, LEASE) if e.owner_id == OWNER_ID]
+
+    enqueue(db, 2, "update")
+    complete_events(db, claimed)
+    (row,) = queued(db)
+    assert (row.object_id, row.version, row.leased_until, row.attempts) == (2, 2, None, 0)
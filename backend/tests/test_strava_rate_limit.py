@@ -0,0 +1,109 @@
+import types
+
+import pytest
+
+from app.services import strava_rate_limit
+from app.services.strava_rate_limit import MemoryRateLimiter, Priority, RateLimitExceeded
+
+WINDOW = 900
+SHARES = {Priority.INTERACTIVE: 1.0, Priority.WEBHOOK: 0.9, Priority.BACKFILL: 0.6}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock the test advances by hand; sleeping advances it too."""
+    now = [1_800_000_000.0]  # A quarter hour, and so the start of a short window.
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(strava_rate_limit, "time", types.SimpleNamespace(time=lambda: now[0], sleep=sleep))
+    return now
+
+
+def limiter(short_limit=200, daily_limit=2000, burst_seconds=60.0, **kwargs) -> MemoryRateLimiter:
+    return MemoryRateLimiter(short_limit=short_limit, daily_limit=daily_limit, window_seconds=WINDOW,
+                             shares=SHARES, max_waits=kwargs.pop("max_waits", {}), burst_seconds=burst_seconds)
+
+
+def take_all(quota: MemoryRateLimiter, priority: Priority) -> int:
+    taken = 0
+    while not quota.try_acquire(priority):
+        taken += 1
+    return taken
+
+
+def test_bucket_limits_bursts_and_keeps_a_reserve(clock):
+    quota = limiter()  # 200 per 900 s: the bucket holds 13.3 tokens.
+    backfill = take_all(quota, Priority.BACKFILL)
+    # Backfill leaves 40% of the bucket to webhook and interactive calls, webhooks leave 10%.
+    assert backfill == 8
+    assert take_all(quota, Priority.WEBHOOK) == 4
+    assert take_all(quota, Priority.INTERACTIVE) == 1
+
+
+def test_waits_until_the_bucket_refills(clock):
+    quota = limiter()
+    assert take_all(quota, Priority.INTERACTIVE) == 13
+    # A third of a token is left; a token refills every 4.5 s.
+    wait = quota.try_acquire(Priority.INTERACTIVE)
+    assert wait == pytest.approx(3.0)
+    clock[0] += wait
+    assert quota.try_acquire(Priority.INTERACTIVE) == 0
+    assert quota.try_acquire(Priority.INTERACTIVE) == pytest.approx(WINDOW / 200)
+
+
+def test_shares_of_the_short_window(clock):
+    # A bucket as large as the window leaves only the window counts in play.
+    quota = limiter(short_limit=100, burst_seconds=WINDOW)
+    assert take_all(quota, Priority.BACKFILL) == 60
+    assert take_all(quota, Priority.WEBHOOK) == 30
+    assert take_all(quota, Priority.INTERACTIVE) == 10
+    # Spent windows wait for the next quarter hour.
+    assert quota.try_acquire(Priority.INTERACTIVE) == pytest.approx(WINDOW)
+
+
+def test_daily_share(clock):
+    quota = limiter(short_limit=100, daily_limit=10, burst_seconds=WINDOW)
+    assert take_all(quota, Priority.BACKFILL) == 6
+    assert quota.try_acquire(Priority.BACKFILL) == pytest.approx(86400 - clock[0] % 86400)
+
+
+def test_no_double_burst_across_a_window_boundary(clock):
+    quota = limiter()
+    clock[0] += WINDOW - 60
+    sent = 0
+    for _ in range(1200):  # Two minutes either side of the boundary.
+        if not quota.try_acquire(Priority.INTERACTIVE):
+            sent += 1
+        clock[0] += 0.1
+    # A full bucket plus two minutes of refill, nowhere near two windows' quota.
+    assert sent <= 200 * 60 / WINDOW + 200 * 120 / WINDOW + 1
+
+
+def test_observe_raises_usage_to_what_strava_reports(clock):
+    quota = limiter(short_limit=100, burst_seconds=WINDOW)
+    quota.observe({"X-RateLimit-Limit": "100,1000", "X-RateLimit-Usage": "95,500"})
+    assert (quota.quota().short_usage, quota.quota().daily_usage) == (95, 500)
+    assert quota.try_acquire(Priority.WEBHOOK) > 0
+    assert take_all(quota, Priority.INTERACTIVE) == 5
+
+
+def test_429_marks_the_short_window_spent(clock):
+    quota = limiter(short_limit=100, burst_seconds=WINDOW)
+    quota.observe({}, rate_limited=True)
+    assert quota.try_acquire(Priority.INTERACTIVE) == pytest.approx(WINDOW)
+
+
+def test_acquire_gives_up_after_the_maximum_wait(clock):
+    quota = limiter(max_waits={Priority.INTERACTIVE: 1.0})
+    take_all(quota, Priority.INTERACTIVE)
+    with pytest.raises(RateLimitExceeded):
+        quota.acquire(Priority.INTERACTIVE)
+    quota.acquire(Priority.BACKFILL)  # Waits (on the fake clock) instead.
+
+
+def test_window_must_divide_an_hour():
+    with pytest.raises(ValueError):
+        MemoryRateLimiter(short_limit=100, daily_limit=1000, window_seconds=700, shares=SHARES,
+                          max_waits={}, burst_seconds=60)